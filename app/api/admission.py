@@ -0,0 +1,134 @@
+"""
+Memory admission for detection requests.
+
+Before any decoding, a request's extraction memory is estimated from the
+clip header (duration, sample rate, channels) and the analysis budget that
+will apply to it, then reserved from a process-wide in-flight budget
+(MEMORY_BUDGET_MB). A request that could never fit, or whose clip is longer
+than MAX_AUDIO_SECONDS, is answered with 413; one that fits but finds the
+budget taken waits up to ADMISSION_TIMEOUT_SECONDS for running requests to
+finish, then gets 503 with Retry-After.
+
+The estimate is linear in the analysed samples: peak traced memory of
+extract_features() measured ~148 bytes per 22050 Hz sample with the HPSS
+tonnetz (~98 with the fast one), plus the float32 decode buffer at the
+native rate. Clips whose header libsndfile cannot read are costed from
+their encoded size at a low bitrate, capped by the analysis budget.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import soundfile as sf
+from fastapi import HTTPException
+
+from app.audio.decoder import open_source, is_encoded
+from app.core.config import settings
+
+TARGET_SR = 22050
+# Peak extraction memory per analysed sample at TARGET_SR (measured 148, rounded up)
+EXTRACTION_BYTES_PER_SAMPLE = 160
+# Assumptions for clips without a readable header
+UNKNOWN_BITRATE = 16000
+UNKNOWN_SAMPLE_RATE = 48000
+UNKNOWN_CHANNELS = 2
+
+
+def memory_budget_bytes() -> int:
+    """settings.MEMORY_BUDGET_MB in bytes; 0 means half of the host's physical memory."""
+    if settings.MEMORY_BUDGET_MB > 0:
+        return int(settings.MEMORY_BUDGET_MB * 2 ** 20)
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // 2
+    except (AttributeError, ValueError, OSError):
+        return 2048 * 2 ** 20
+
+
+def _encoded_size(source) -> int:
+    if is_encoded(source):
+        return memoryview(source).nbytes
+    return os.path.getsize(source)
+
+
+def estimate_cost(source, timeline: bool = False):
+    """
+    (bytes, duration) for extracting `source`: the memory the request will
+    hold at its peak and the clip duration from its header (None if
+    unreadable).
+    """
+    try:
+        info = sf.info(open_source(source))
+        duration, sr_native, channels = info.duration, info.samplerate, info.channels
+    except Exception:
+        duration = None
+        sr_native, channels = UNKNOWN_SAMPLE_RATE, UNKNOWN_CHANNELS
+    # Decoding stops at the analysis budget, so that bounds what is held
+    cap = settings.TIMELINE_MAX_SECONDS if timeline else settings.MAX_ANALYSIS_SECONDS
+    seconds = duration if duration is not None else _encoded_size(source) * 8 / UNKNOWN_BITRATE
+    if cap and cap > 0:
+        seconds = min(seconds, cap)
+    cost = seconds * (TARGET_SR * EXTRACTION_BYTES_PER_SAMPLE + sr_native * channels * 4)
+    return int(cost), duration
+
+
+def _too_large(message: str):
+    return HTTPException(status_code=413, detail={"status": "error", "message": message})
+
+
+class MemoryBudget:
+    """Bytes reserved by the requests in flight; reservations wait for room up to a timeout."""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.in_flight = 0
+        self.waiting = 0
+        self._room = threading.Condition()
+
+    @contextmanager
+    def reserve(self, cost: int, timeout: float):
+        if cost > self.total:
+            raise _too_large(f"Audio needs about {cost / 2 ** 20:.0f} MB to analyse; "
+                             f"the server allows {self.total / 2 ** 20:.0f} MB")
+        deadline = time.monotonic() + timeout
+        with self._room:
+            self.waiting += 1
+            try:
+                while self.in_flight + cost > self.total:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise HTTPException(status_code=503, headers={"Retry-After": str(max(1, int(timeout)))},
+                                            detail={"status": "error",
+                                                    "message": "Server is busy with other audio; retry shortly"})
+                    self._room.wait(remaining)
+            finally:
+                self.waiting -= 1
+            self.in_flight += cost
+        try:
+            yield
+        finally:
+            with self._room:
+                self.in_flight -= cost
+                self._room.notify_all()
+
+    def stats(self) -> dict:
+        with self._room:
+            return {"budgetMb": round(self.total / 2 ** 20, 1), "inFlightMb": round(self.in_flight / 2 ** 20, 1),
+                    "waiting": self.waiting}
+
+
+memory_budget = MemoryBudget(memory_budget_bytes())
+
+
+@contextmanager
+def admit(source, timeline: bool = False):
+    """
+    Holds the request's share of the memory budget around its extraction.
+    Raises HTTPException 413 (clip too long or too large to ever fit) or
+    503 (budget still taken after ADMISSION_TIMEOUT_SECONDS).
+    """
+    cost, duration = estimate_cost(source, timeline)
+    if settings.MAX_AUDIO_SECONDS > 0 and duration is not None and duration > settings.MAX_AUDIO_SECONDS:
+        raise _too_large(f"Audio is {duration:.0f}s long; the limit is {settings.MAX_AUDIO_SECONDS:g}s")
+    with memory_budget.reserve(cost, settings.ADMISSION_TIMEOUT_SECONDS):
+        yield
@@ -0,0 +1,550 @@
+"""
+Streaming ingestion of the detection request bodies.
+
+Parsing the body as a whole holds every upload about three times: the raw
+body, the multi-MB `audioBase64` str inside the parsed document, and the
+decoded bytes. Here the body is consumed chunk by chunk as it arrives: the
+small fields (language, audioFormat, audioUrl, timeline, ...) are copied
+into a skeleton document that is parsed and validated as usual, while the
+`audioBase64` string value is base64-decoded on the fly into one buffer
+preallocated from Content-Length. The base64 text never exists in full.
+
+/voice-detection/upload takes the audio without base64: as the "file" part
+of a multipart/form-data body (parsed incrementally with python-multipart)
+or as a raw audio/* body, with the other fields in the form or the query
+string. The audio bytes are copied once, into the same kind of buffer.
+
+Every body (and an audioUrl download) is held to MAX_UPLOAD_MB of audio:
+a Content-Length over the limit is answered with 413 before anything is
+read or allocated, and so is a body that passes it while streaming.
+
+Bodies may be sent with Content-Encoding gzip or zstd (zstd needs the
+optional `zstandard` package; without it such bodies get 415, like any
+other unknown encoding). They are inflated as they stream, in bounded
+steps, and the limit applies to the inflated bytes: a decompression bomb
+is cut off with 413 once it passes the same cap as a plain body.
+"""
+import binascii
+import json
+import re
+import zlib
+
+from fastapi import HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from multipart.multipart import MultipartParser, parse_options_header
+from pydantic import ValidationError
+
+from app.audio.formats import normalize_format
+from app.core.config import settings
+from app.schemas import VoiceAnalysisRequest
+
+try:
+    import zstandard
+except ImportError:  # optional: zstd-encoded bodies are refused with 415 without it
+    zstandard = None
+_INFLATE_ERRORS = (zlib.error,) if zstandard is None else (zlib.error, zstandard.ZstdError)
+
+AUDIO_FIELD = b"audioBase64"
+# Multipart part carrying the audio file; request fields other parts / the query string may set
+UPLOAD_FIELD = "file"
+UPLOAD_FIELDS = ("language", "audioFormat", "timeline")
+# Largest non-file multipart part accepted (they are short text fields)
+MAX_FIELD_BYTES = 64 * 1024
+# Largest JSON document accepted around the audioBase64 value (the other fields are short)
+MAX_DOCUMENT_BYTES = 64 * 1024
+# Largest buffer preallocated from a client's Content-Length; bigger bodies grow it as they arrive
+MAX_PREALLOCATE_BYTES = 16 * 2 ** 20
+# Room for the JSON / multipart framing and the small fields around the audio
+BODY_OVERHEAD = 64 * 1024
+# Most output one inflate step may produce, so a bomb is caught before it is held
+INFLATE_STEP = 64 * 1024
+# zstd input consumed per step (an RLE block turns 4 bytes into 128 KB: at most 8 MB out)
+ZSTD_STEP = 256
+
+_QUOTE, _BACKSLASH, _COLON = b'"'[0], b"\\"[0], b":"[0]
+_OPEN, _CLOSE, _WHITESPACE = b"{[", b"}]", b" \t\r\n"
+# Bytes the scanner stops at inside a string / between tokens; runs of anything else are copied whole
+_STRING_STOP = re.compile(rb'["\\]')
+_TOKEN_STOP = re.compile(rb'["{}\[\]:,]')
+# Everything base64.b64decode() would discard before decoding
+_BASE64_ALPHABET = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/="
+_NON_ALPHABET = bytes(set(range(256)) - set(_BASE64_ALPHABET))
+# JSON escapes that may appear inside a base64 string value
+_ESCAPES = {b"\\/": b"/", b"\\n": b"", b"\\r": b""}
+
+
+class ByteSink:
+    """
+    Collects bytes fed in arbitrary pieces into one buffer preallocated from
+    a size hint. The hint comes from the client, so it is trusted only up to
+    MAX_PREALLOCATE_BYTES; past that the buffer grows with the data.
+    """
+
+    def __init__(self, size_hint: int = 0):
+        self.buffer = bytearray(min(max(size_hint, 0), MAX_PREALLOCATE_BYTES))
+        self.length = 0
+
+    def feed(self, data):
+        self._write(data)
+
+    def finish(self) -> memoryview:
+        """Returns a view of the bytes received (the buffer is not copied)."""
+        return memoryview(self.buffer)[:self.length]
+
+    def _write(self, data):
+        end = self.length + len(data)
+        if end > len(self.buffer):
+            self.buffer.extend(bytes(end - len(self.buffer)))
+        self.buffer[self.length:end] = data
+        self.length = end
+
+
+class Base64Sink(ByteSink):
+    """
+    Decodes a base64 text fed in arbitrary pieces into a growing buffer.
+    Same result as base64.b64decode() on the concatenated text.
+    """
+
+    def __init__(self, size_hint: int = 0):
+        super().__init__(size_hint)
+        self._carry = b""
+        self._escape = b""
+
+    def feed(self, text: bytes):
+        text = self._escape + text
+        # A trailing backslash may start an escape split across chunks
+        self._escape = b"\\" if text.endswith(b"\\") else b""
+        if self._escape:
+            text = text[:-1]
+        if b"\\" in text:
+            for escape, value in _ESCAPES.items():
+                text = text.replace(escape, value)
+            if b"\\" in text:
+                raise ValueError("unexpected escape sequence in base64 data")
+        text = self._carry + text.translate(None, _NON_ALPHABET)
+        usable = len(text) // 4 * 4
+        self._carry = text[usable:]
+        if usable:
+            self._write(binascii.a2b_base64(text[:usable]))
+
+    def finish(self) -> memoryview:
+        """Decodes the remainder; returns a view of the decoded bytes."""
+        if self._escape:
+            raise ValueError("unterminated escape sequence in base64 data")
+        if self._carry:
+            # Raises "Incorrect padding" like b64decode for a truncated tail
+            self._write(binascii.a2b_base64(self._carry))
+            self._carry = b""
+        return super().finish()
+
+
+class VoiceRequestParser:
+    """
+    Incremental scanner of the request document. Tracks strings and nesting
+    just enough to recognise the top-level "audioBase64" key; its string
+    value is routed to a Base64Sink and replaced by null in the skeleton.
+    Runs between quotes and structural characters are copied whole, and the
+    skeleton is held to MAX_DOCUMENT_BYTES (413 past it).
+    """
+
+    def __init__(self, size_hint: int = 0):
+        self.skeleton = bytearray()
+        self.audio = None
+        self._size_hint = size_hint
+        self._in_audio = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string = None
+        self._audio_value_next = False
+
+    def feed(self, chunk: bytes):
+        i, n = 0, len(chunk)
+        while i < n:
+            if self._in_audio:
+                end = chunk.find(b'"', i)
+                if end < 0:
+                    self.audio.feed(chunk[i:])
+                    return
+                self.audio.feed(chunk[i:end])
+                self._in_audio = False
+                self.skeleton += b"null"
+                i = end + 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._append(chunk[i:i + 1])
+                    self._escape = False
+                    i += 1
+                    continue
+                match = _STRING_STOP.search(chunk, i)
+                if match is None:
+                    self._append(chunk[i:])
+                    return
+                end = match.start()
+                self._append(chunk[i:end + 1])
+                i = end + 1
+                if chunk[end] == _BACKSLASH:
+                    self._escape = True
+                else:
+                    self._in_string = False
+                    self._last_string = bytes(self.skeleton[self._string_start:-1])
+                continue
+
+            match = _TOKEN_STOP.search(chunk, i)
+            end = n if match is None else match.start()
+            if end > i:
+                # Whitespace, numbers and literals between the structural characters
+                text = chunk[i:end]
+                self._append(text)
+                if text.strip(_WHITESPACE):
+                    self._audio_value_next = False
+                    self._last_string = None
+                i = end
+                continue
+
+            c = chunk[i]
+            i += 1
+            if c == _QUOTE and self._audio_value_next:
+                # Opening quote of the audio value: stream it, leave null in its place
+                self._audio_value_next = False
+                self._in_audio = True
+                self.audio = Base64Sink(self._size_hint)
+                continue
+
+            self._append(chunk[i - 1:i])
+            if c == _QUOTE:
+                self._in_string = True
+                self._string_start = len(self.skeleton)
+                continue
+            # A key is the last string before its colon; any other token clears it
+            self._audio_value_next = c == _COLON and self._depth == 1 and self._last_string == AUDIO_FIELD
+            self._last_string = None
+            if c in _OPEN:
+                self._depth += 1
+            elif c in _CLOSE:
+                self._depth -= 1
+
+    def _append(self, data: bytes):
+        self.skeleton += data
+        if len(self.skeleton) > MAX_DOCUMENT_BYTES:
+            raise HTTPException(status_code=413, detail={"status": "error", "message": (
+                f"Request fields other than audioBase64 exceed {MAX_DOCUMENT_BYTES // 1024} KB")})
+
+    def finish(self):
+        """Returns (fields, audio): the parsed document and the decoded audio (None if absent)."""
+        if self._in_audio:
+            raise json.JSONDecodeError("Unterminated string", "", len(self.skeleton))
+        fields = json.loads(bytes(self.skeleton))
+        audio = self.audio.finish() if self.audio is not None else None
+        return fields, audio
+
+
+class MultipartUploadParser:
+    """
+    Incremental multipart/form-data reader: the UPLOAD_FIELD part streams
+    into a ByteSink, every other part is kept as a short text field.
+    """
+
+    def __init__(self, boundary: bytes, size_hint: int = 0):
+        self.fields = {}
+        self.audio = None
+        self.audio_type = None
+        self._size_hint = size_hint
+        self._headers = {}
+        self._header = [b"", b""]
+        self._name = None
+        self._value = None
+        self._parser = MultipartParser(boundary, {
+            "on_part_begin": self._part_begin,
+            "on_header_field": lambda data, start, end: self._append_header(0, data[start:end]),
+            "on_header_value": lambda data, start, end: self._append_header(1, data[start:end]),
+            "on_header_end": self._header_end,
+            "on_headers_finished": self._headers_finished,
+            "on_part_data": self._part_data,
+            "on_part_end": self._part_end,
+        })
+
+    def feed(self, chunk: bytes):
+        self._parser.write(chunk)
+
+    def finish(self):
+        """Returns (fields, audio, audio content type); audio is None without a file part."""
+        self._parser.finalize()
+        return self.fields, self.audio.finish() if self.audio is not None else None, self.audio_type
+
+    def _part_begin(self):
+        self._headers = {}
+        self._name, self._value = None, None
+
+    def _append_header(self, index: int, data: bytes):
+        self._header[index] += data
+
+    def _header_end(self):
+        self._headers[self._header[0].strip().lower()] = self._header[1].strip()
+        self._header = [b"", b""]
+
+    def _headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._name = options.get(b"name", b"").decode("utf-8", errors="replace")
+        if self._name == UPLOAD_FIELD:
+            self.audio = ByteSink(self._size_hint)
+            self.audio_type = self._headers.get(b"content-type", b"").decode("latin-1") or None
+        else:
+            self._value = bytearray()
+
+    def _part_data(self, data, start: int, end: int):
+        if self._value is None:
+            self.audio.feed(memoryview(data)[start:end])
+            return
+        self._value += data[start:end]
+        if len(self._value) > MAX_FIELD_BYTES:
+            raise ValueError(f"form field '{self._name}' is longer than {MAX_FIELD_BYTES} bytes")
+
+    def _part_end(self):
+        if self._value is not None and self._name:
+            self.fields[self._name] = self._value.decode("utf-8", errors="replace")
+
+
+class GzipInflater:
+    """Inflates a gzip body fed in arbitrary pieces, INFLATE_STEP bytes of output at a time."""
+
+    def __init__(self):
+        self._inflate = zlib.decompressobj(wbits=31)
+        # Set between members: only NUL padding seen since the last one ended
+        self._between = False
+
+    def feed(self, data: bytes):
+        """Yields the inflated pieces of `data`."""
+        while True:
+            if self._between:
+                # Zero padding after a member is ignored, as gzip.decompress() does
+                data = data.lstrip(b"\0")
+                if not data:
+                    return
+                self._inflate, self._between = zlib.decompressobj(wbits=31), False
+            # An empty call collects output held back by the step limit
+            piece = self._inflate.decompress(data, INFLATE_STEP)
+            if self._inflate.eof:
+                # End of a member: the bytes after it (unused_data; unconsumed_tail holds
+                # the same bytes) are padding or the next member, as `gzip` concatenates them
+                data, self._between = self._inflate.unused_data, True
+            else:
+                data = self._inflate.unconsumed_tail
+            if piece:
+                yield piece
+            elif not data:
+                return
+
+    def finish(self):
+        if not self._between and not self._inflate.eof:
+            raise zlib.error("truncated gzip stream")
+
+
+class ZstdInflater:
+    """Decompresses a zstd body fed in arbitrary pieces, ZSTD_STEP bytes of input at a time."""
+
+    def __init__(self):
+        self._inflate = zstandard.ZstdDecompressor().decompressobj()
+
+    def feed(self, data: bytes):
+        data = memoryview(data)
+        for start in range(0, len(data), ZSTD_STEP):
+            step = data[start:start + ZSTD_STEP]
+            while step:
+                if self._inflate.eof:
+                    # A body may hold several frames (zstd writes one per input when concatenated)
+                    self._inflate = zstandard.ZstdDecompressor().decompressobj()
+                piece = self._inflate.decompress(step)
+                step = self._inflate.unused_data if self._inflate.eof else b""
+                if piece:
+                    yield piece
+
+    def finish(self):
+        if not self._inflate.eof:
+            raise zlib.error("truncated zstd stream")
+
+
+def _inflaters(request: Request) -> list:
+    """
+    Inflaters for the request's Content-Encoding, outermost first; 415 for
+    an encoding the server cannot decode.
+    """
+    inflaters = []
+    for coding in reversed(request.headers.get("content-encoding", "").split(",")):
+        coding = coding.strip().lower()
+        if coding in ("", "identity"):
+            continue
+        if coding in ("gzip", "x-gzip"):
+            inflaters.append(GzipInflater())
+        elif coding == "zstd" and zstandard is not None:
+            inflaters.append(ZstdInflater())
+        else:
+            raise HTTPException(status_code=415, headers={"Accept-Encoding": _accepted_encodings()},
+                                detail={"status": "error", "message": (
+                                    f"Unsupported Content-Encoding '{coding}': send the body plain or as "
+                                    f"{_accepted_encodings()}")})
+    return inflaters
+
+
+def _accepted_encodings() -> str:
+    return "gzip, zstd" if zstandard is not None else "gzip"
+
+
+def _inflate(chunk: bytes, inflaters: list):
+    """Yields `chunk` passed through each inflater in turn."""
+    if not inflaters:
+        yield chunk
+        return
+    for piece in inflaters[0].feed(chunk):
+        yield from _inflate(piece, inflaters[1:])
+
+
+def _invalid_body(message: str, error_type: str = "json_invalid"):
+    return RequestValidationError([{"type": error_type, "loc": ("body",), "msg": message, "input": {}}])
+
+
+def max_audio_bytes() -> int:
+    """settings.MAX_UPLOAD_MB in bytes (None = no limit)."""
+    return int(settings.MAX_UPLOAD_MB * 2 ** 20) if settings.MAX_UPLOAD_MB > 0 else None
+
+
+def _too_large():
+    return HTTPException(status_code=413, detail={
+        "status": "error", "message": f"Audio exceeds the {settings.MAX_UPLOAD_MB:g} MB upload limit"})
+
+
+def _limited_stream(request: Request, ratio: float = 1.0):
+    """
+    request.stream() held to MAX_UPLOAD_MB of audio (the body may be `ratio`
+    times that plus BODY_OVERHEAD), inflated if it has a Content-Encoding.
+    The declared Content-Length and the encoding are checked now, before the
+    caller sizes any buffer; the (inflated) bytes are checked as they arrive.
+    """
+    audio_limit = max_audio_bytes()
+    limit = None if audio_limit is None else int(audio_limit * ratio) + BODY_OVERHEAD
+    try:
+        declared = int(request.headers.get("content-length", 0))
+    except ValueError:
+        declared = 0
+    if limit is not None and declared > limit:
+        raise _too_large()
+    inflaters = _inflaters(request)
+
+    async def chunks():
+        received = 0
+        try:
+            async for chunk in request.stream():
+                for piece in _inflate(chunk, inflaters):
+                    received += len(piece)
+                    if limit is not None and received > limit:
+                        raise _too_large()
+                    yield piece
+            for inflater in inflaters:
+                inflater.finish()
+        except _INFLATE_ERRORS as e:
+            raise HTTPException(status_code=400, detail={
+                "status": "error", "message": f"Invalid {request.headers.get('content-encoding')} body: {str(e)}"})
+    return chunks()
+
+
+def read_url_audio(response) -> memoryview:
+    """Body of a streamed requests.Response into one buffer, held to MAX_UPLOAD_MB (413 past it)."""
+    limit = max_audio_bytes()
+    try:
+        declared = int(response.headers.get("content-length", 0))
+    except ValueError:
+        declared = 0
+    if limit is not None and declared > limit:
+        raise _too_large()
+    sink = ByteSink(declared)
+    for chunk in response.iter_content(chunk_size=64 * 1024):
+        sink.feed(chunk)
+        if limit is not None and sink.length > limit:
+            raise _too_large()
+    return sink.finish()
+
+
+def _size_hint(request: Request, ratio: float = 1.0) -> int:
+    if request.headers.get("content-encoding", "identity").strip().lower() != "identity":
+        return 0  # Content-Length is the compressed size; the buffer grows as the body inflates
+    try:
+        return int(int(request.headers.get("content-length", 0)) * ratio) + 3
+    except ValueError:
+        return 0
+
+
+async def read_voice_request(request: Request):
+    """
+    Reads the detection request body as it streams in. Returns
+    (VoiceAnalysisRequest, audio) where audio is the decoded audioBase64
+    (a memoryview, None for audioUrl requests). Malformed documents raise the
+    same RequestValidationError as FastAPI's own body parsing; malformed
+    base64 raises the 400 HTTPException of decoder.decode_base64.
+    """
+    chunks = _limited_stream(request, 4 / 3)
+    parser = VoiceRequestParser(_size_hint(request, 3 / 4))
+    try:
+        async for chunk in chunks:
+            parser.feed(chunk)
+        fields, audio = parser.finish()
+    except (ValueError, binascii.Error) as e:
+        if isinstance(e, (json.JSONDecodeError, UnicodeDecodeError)):
+            raise _invalid_body("JSON decode error")
+        raise HTTPException(status_code=400, detail={"status": "error", "message": f"Invalid value for 'audioBase64': {str(e)}"})
+    if not isinstance(fields, dict):
+        raise _invalid_body("Input should be a valid dictionary or object to extract fields from", "model_attributes_type")
+
+    try:
+        body = VoiceAnalysisRequest.model_validate(fields, context={"audio_streamed": bool(audio)})
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    return body, audio
+
+
+async def read_upload_request(request: Request):
+    """
+    Reads a /voice-detection/upload body as it streams in: multipart/form-data
+    with the audio in the UPLOAD_FIELD part, or a raw audio/* (or
+    application/octet-stream) body. The UPLOAD_FIELDS come from the query
+    string, overridden by form fields; audioFormat defaults to the audio's
+    Content-Type. Returns (VoiceAnalysisRequest, audio) like
+    read_voice_request(); other content types are answered with 415.
+    """
+    media_type, options = parse_options_header(request.headers.get("content-type", ""))
+    media_type = media_type.decode("latin-1").lower()
+    fields = {name: request.query_params[name] for name in UPLOAD_FIELDS if name in request.query_params}
+    try:
+        if media_type == "multipart/form-data":
+            if not options.get(b"boundary"):
+                raise ValueError("multipart body without a boundary")
+            chunks = _limited_stream(request)
+            parser = MultipartUploadParser(options[b"boundary"], _size_hint(request))
+            async for chunk in chunks:
+                parser.feed(chunk)
+            form, audio, audio_type = parser.finish()
+            fields.update({name: value for name, value in form.items() if name in UPLOAD_FIELDS})
+        elif media_type.startswith("audio/") or media_type == "application/octet-stream":
+            chunks = _limited_stream(request)
+            sink = ByteSink(_size_hint(request))
+            async for chunk in chunks:
+                sink.feed(chunk)
+            audio, audio_type = sink.finish(), media_type
+        else:
+            raise HTTPException(status_code=415, detail={"status": "error", "message": (
+                f"Unsupported Content-Type '{media_type}': send multipart/form-data with a "
+                f"'{UPLOAD_FIELD}' part or a raw audio/* body")})
+    except ValueError as e:
+        raise _invalid_body(f"Malformed upload: {str(e)}")
+    if not audio:
+        raise _invalid_body(f"No audio: send a non-empty '{UPLOAD_FIELD}' part or audio/* body", "missing")
+    if "audioFormat" not in fields and audio_type and audio_type.startswith("audio/"):
+        fields["audioFormat"] = normalize_format(audio_type.split(";")[0])
+
+    try:
+        body = VoiceAnalysisRequest.model_validate(fields, context={"audio_streamed": True})
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    return body, audio
@@ -1,60 +1,141 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 from app.schemas import VoiceAnalysisRequest, VoiceAnalysisResponse, VoiceClassification
 from app.core.security import get_api_key
-from app.audio.decoder import decode_audio, cleanup_temp_dir
+from app.api.ingest import read_voice_request, read_upload_request, read_url_audio, UPLOAD_FIELD
+from app.api.admission import admit, memory_budget
+from app.audio.decoder import decode_base64
+from app.audio.formats import decode_metrics
+from app.audio.decode_pool import pool_stats
+from app.audio.local_input import resolve_local_path, mapped_audio
 from app.audio.core_features import extract_features
+from app.audio.timeline import extract_timeline
+from app.audio.vad import NoSpeechError
+from app.audio.registry import mask_groups
 from app.ml.model import model_loader
-from app.ml.explanation import generate_explanation
+from app.ml.explanation import generate_explanation, EXPLANATION_GROUPS
 from app.core.config import settings
+from contextlib import nullcontext
 import requests
-import base64
 
 router = APIRouter()
 
-@router.post("/voice-detection")
-async def detect_voice(request: VoiceAnalysisRequest, api_key: str = Depends(get_api_key)):
+# The body is read by app.api.ingest, so the schema is declared for the docs only
+VOICE_REQUEST_BODY = {"requestBody": {"required": True, "content": {
+    "application/json": {"schema": VoiceAnalysisRequest.model_json_schema()}}}}
+
+@router.post("/voice-detection", openapi_extra=VOICE_REQUEST_BODY)
+async def detect_voice(http_request: Request, api_key: str = Depends(get_api_key)):
     """
     Analyzes the provided audio to detect if it is AI-generated or Human.
     Returns classification with confidence score optimized for hackathon scoring.
+    
+    The JSON body is consumed as it streams in: audioBase64 is decoded
+    chunk by chunk and never held as one string (app/api/ingest.py).
+    """
+    request, audio_bytes = await read_voice_request(http_request)
+    # Off the event loop: requests waiting for the memory budget must not block the others
+    return await run_in_threadpool(run_detection, request, audio_bytes)
+
+# Documented the same way; the body is read by app.api.ingest.read_upload_request
+_UPLOAD_FIELD_SCHEMAS = {name: VoiceAnalysisRequest.model_json_schema()["properties"][name]
+                         for name in ("language", "audioFormat", "timeline")}
+UPLOAD_REQUEST_BODY = {
+    "parameters": [{"name": name, "in": "query", "required": False, "schema": schema}
+                   for name, schema in _UPLOAD_FIELD_SCHEMAS.items()],
+    "requestBody": {"required": True, "content": {
+        "multipart/form-data": {"schema": {"type": "object", "required": [UPLOAD_FIELD], "properties": {
+            UPLOAD_FIELD: {"type": "string", "format": "binary"}, **_UPLOAD_FIELD_SCHEMAS}}},
+        "audio/*": {"schema": {"type": "string", "format": "binary"}}}}}
+
+@router.post("/voice-detection/upload", openapi_extra=UPLOAD_REQUEST_BODY)
+async def detect_voice_upload(http_request: Request, api_key: str = Depends(get_api_key)):
+    """
+    Same analysis and response as /voice-detection for audio sent as a file:
+    the "file" part of a multipart/form-data body or a raw audio/* body,
+    streamed into memory without a base64 step. language, audioFormat and
+    timeline are form fields or query parameters.
+    """
+    request, audio_bytes = await read_upload_request(http_request)
+    return await run_in_threadpool(run_detection, request, audio_bytes)
+
+def run_detection(request: VoiceAnalysisRequest, audio_bytes=None):
+    """
+    Classifies one clip: audio_bytes is the encoded file, or None to decode
+    request.audioBase64 / download request.audioUrl / read request.audioPath.
+    Returns the JSONResponse.
     """
-    temp_file_path = None
-    temp_dir = None
     try:
+        local_path = None
         # 0. Handle URL input if base64 is missing
-        if not request.audioBase64 and request.audioUrl:
+        if audio_bytes is None and not request.audioBase64 and request.audioUrl:
             try:
-                # Download audio from URL
-                response = requests.get(request.audioUrl, timeout=30)
-                if response.status_code == 200:
-                    request.audioBase64 = base64.b64encode(response.content).decode('utf-8')
-                else:
-                    return JSONResponse(
-                        status_code=400,
-                        content={"status": "error", "message": f"Failed to download audio from URL: Status {response.status_code}"}
-                    )
+                # Download audio from URL (streamed, held to MAX_UPLOAD_MB)
+                with requests.get(request.audioUrl, timeout=30, stream=True) as response:
+                    if response.status_code == 200:
+                        audio_bytes = read_url_audio(response)
+                    else:
+                        return JSONResponse(
+                            status_code=400,
+                            content={"status": "error", "message": f"Failed to download audio from URL: Status {response.status_code}"}
+                        )
+            except HTTPException:
+                raise
             except Exception as e:
                 return JSONResponse(
                     status_code=400,
                     content={"status": "error", "message": f"Error downloading audio from URL: {str(e)}"}
                 )
+        elif audio_bytes is None and not request.audioBase64 and request.audioPath:
+            # Co-located callers: a file under LOCAL_AUDIO_ROOT, read in place
+            try:
+                local_path = resolve_local_path(request.audioPath)
+            except PermissionError as e:
+                return JSONResponse(status_code=403, content={"status": "error", "message": str(e)})
+            except FileNotFoundError as e:
+                return JSONResponse(status_code=404, content={"status": "error", "message": str(e)})
 
-        # 1. Decode Audio
-        temp_file_path, temp_dir = decode_audio(request.audioBase64)
+        # 1. Decode Audio (the encoded bytes stay in memory, no temp file)
+        if audio_bytes is None and local_path is None:
+            audio_bytes = decode_base64(request.audioBase64)
         
-        # 2. Extract Features
-        try:
-            features = extract_features(temp_file_path)
-        except Exception as e:
-            return JSONResponse(
-                status_code=400,
-                content={"status": "error", "message": f"Audio processing failed: {str(e)}"}
-            )
+        # 2. Extract Features (the model's groups plus those the explanation reads)
+        feature_options = dict(model_loader.feature_options)
+        model_groups = feature_options.get("groups")
+        if model_groups is not None:
+            feature_options["groups"] = set(model_groups) | EXPLANATION_GROUPS
+        with mapped_audio(local_path) if local_path else nullcontext(audio_bytes) as source, \
+                admit(source, request.timeline):
+            # Memory reserved from the in-flight budget (413 / 503 before decoding otherwise)
+            try:
+                if request.timeline:
+                    # Clip vector and window vectors from one analysis pass
+                    features, window_starts, window_features = extract_timeline(
+                        source, window_groups=model_groups, audio_format=request.audioFormat, **feature_options)
+                else:
+                    features = extract_features(source, audio_format=request.audioFormat, **feature_options)
+            except NoSpeechError as e:
+                return JSONResponse(
+                    status_code=400,
+                    content={"status": "error", "message": str(e)}
+                )
+            except Exception as e:
+                return JSONResponse(
+                    status_code=400,
+                    content={"status": "error", "message": f"Audio processing failed: {str(e)}"}
+                )
             
         # 3. Predict
         try:
-            # Score is probability of being AI (class 1)
-            ai_probability = model_loader.predict(features)
+            # Score is probability of being AI (class 1). The model sees its own
+            # groups only, zeros elsewhere as in training; the explanation groups
+            # extracted next to them are read from the full vector below
+            model_features = features if model_groups is None else mask_groups(features, model_groups)
+            ai_probability = model_loader.predict(model_features)
+            if request.timeline:
+                # All windows in one batched model call
+                window_probabilities = model_loader.predict_batch(window_features)
         except RuntimeError as e:
             return JSONResponse(
                 status_code=500,
@@ -86,22 +167,36 @@ async def detect_voice(request: VoiceAnalysisRequest, api_key: str = Depends(get
         # 5. Generate explanation
         explanation = generate_explanation(features, ai_probability, threshold)
         
-        return JSONResponse(
-            status_code=200,
-            content={
-                "status": "success",
-                "classification": classification,
-                "confidenceScore": round(answer_confidence, 4),
-                "explanation": explanation
+        content = {
+            "status": "success",
+            "classification": classification,
+            "confidenceScore": round(answer_confidence, 4),
+            "explanation": explanation
+        }
+        if request.timeline:
+            content["timeline"] = {
+                "windowSeconds": settings.TIMELINE_WINDOW_SECONDS,
+                "hopSeconds": settings.TIMELINE_HOP_SECONDS,
+                "start": [round(float(t), 2) for t in window_starts],
+                "aiProbability": [round(float(p), 4) for p in window_probabilities]
             }
-        )
         
+        return JSONResponse(status_code=200, content=content)
+        
+    except HTTPException:
+        # Already carries its status and error body (e.g. malformed base64)
+        raise
     except Exception as e:
         return JSONResponse(
             status_code=500,
             content={"status": "error", "message": f"Internal error: {str(e)}"}
         )
-    finally:
-        # Cleanup - safe for Windows
-        if temp_dir:
-            cleanup_temp_dir(temp_dir)
+
+@router.get("/metrics")
+async def metrics(api_key: str = Depends(get_api_key)):
+    """Decode latency per sniffed audio format and backend (app/audio/formats.py), memory budget, decoder pool."""
+    content = {"status": "success", "decode": decode_metrics.snapshot(), "memory": memory_budget.stats()}
+    workers = pool_stats()
+    if workers is not None:
+        content["decoderPool"] = workers
+    return content
@@ -1,15 +1,252 @@
 import librosa
 import numpy as np
-import scipy.stats
-import os
-import tempfile
+from functools import cached_property
+from app.audio.spectrogram import Spectrogram, N_FFT
+from app.audio.pitch import pitch_statistics
+from app.audio.tonnetz import fast_tonnetz
+from app.audio.time_domain import clip_zcr_rms, rms_silence_ratio
+from app.audio.registry import FEATURE_GROUPS, GROUP_SLICES, N_FEATURES
+from app.audio.streaming import extract_features_streaming
+from app.audio.decoder import load_audio
+from app.audio.fft_backend import extraction_slot
+from app.audio.vad import gate_speech, NoSpeechError
+from app.core.config import settings
 
-def extract_features(file_path: str):
+
+class FeatureContext:
+    """
+    Intermediate arrays for one decoded signal, each computed on first access.
+    Feature groups (app.audio.registry) read from these properties, so asking
+    for a subset of groups only computes the intermediates they depend on.
+
+    tuning fixes the chroma tuning offset (in bins) instead of estimating it
+    from this signal, e.g. when the signal is one segment of a longer clip.
+    """
+
+    spectrogram_class = Spectrogram
+
+    def __init__(self, y: np.ndarray, sr: int, shared_spectrogram: bool = None,
+                 pitch_engine: str = None, tonnetz_mode: str = None, spec: Spectrogram = None,
+                 tuning: float = None):
+        self.y = y
+        self.sr = sr
+        self.tuning = tuning
+        self.shared_spectrogram = settings.SHARED_SPECTROGRAM if shared_spectrogram is None else shared_spectrogram
+        self.pitch_engine = pitch_engine or settings.PITCH_ENGINE
+        self.tonnetz_mode = tonnetz_mode or settings.TONNETZ_MODE
+        if spec is not None:
+            # Precomputed (e.g. batched) spectrogram implies shared mode
+            self.shared_spectrogram = True
+            self.spec = spec
+        else:
+            self.spec = self.spectrogram_class(y, sr) if self.shared_spectrogram else None
+
+    def _src(self, name: str) -> dict:
+        # Spectral inputs: precomputed arrays in shared mode, raw signal otherwise
+        return {"S": getattr(self.spec, name)} if self.spec else {"y": self.y}
+
+    @cached_property
+    def mfcc(self):
+        return librosa.feature.mfcc(sr=self.sr, n_mfcc=13, **self._src("mel_db"))
+
+    @cached_property
+    def delta_mfcc(self):
+        return librosa.feature.delta(self.mfcc)
+
+    @cached_property
+    def freqs(self):
+        # Bin frequencies in the signal's precision; librosa's default float64
+        # grid would promote the (freq, frames) products to float64
+        return librosa.fft_frequencies(sr=self.sr, n_fft=N_FFT).astype(self.y.dtype)
+
+    @cached_property
+    def centroid(self):
+        return librosa.feature.spectral_centroid(sr=self.sr, freq=self.freqs, **self._src("magnitude"))
+
+    @cached_property
+    def rolloff(self):
+        return librosa.feature.spectral_rolloff(sr=self.sr, **self._src("magnitude"))
+
+    @cached_property
+    def flatness(self):
+        return librosa.feature.spectral_flatness(**self._src("magnitude"))
+
+    @cached_property
+    def bandwidth(self):
+        return librosa.feature.spectral_bandwidth(sr=self.sr, freq=self.freqs, centroid=self.centroid,
+                                                  **self._src("magnitude"))
+
+    @cached_property
+    def contrast(self):
+        return librosa.feature.spectral_contrast(sr=self.sr, **self._src("magnitude"))
+
+    @cached_property
+    def chroma(self):
+        return librosa.feature.chroma_stft(sr=self.sr, tuning=self.tuning, **self._src("power"))
+
+    @cached_property
+    def pitch(self):
+        """(pitch_mean, pitch_std)"""
+        if self.pitch_engine == "voiceband":
+            magnitude = self.spec.magnitude if self.spec else np.abs(librosa.stft(self.y))
+            return pitch_statistics(magnitude, self.sr)
+
+        pitches, magnitudes = librosa.piptrack(sr=self.sr, **self._src("magnitude"))
+        pitches_indices = magnitudes > np.median(magnitudes)
+        pitch_values = pitches[pitches_indices]
+        pitch_values = pitch_values[pitch_values > 0]
+
+        if len(pitch_values) > 0:
+            return np.mean(pitch_values), np.std(pitch_values)
+        return 0, 0
+
+    @cached_property
+    def time_domain(self):
+        """(zcr, rms) frame traces from one pass of the fused kernel in app.audio.time_domain."""
+        return clip_zcr_rms(self.y)
+
+    @cached_property
+    def zcr(self):
+        # Same frames as librosa.feature.zero_crossing_rate(y)
+        return self.time_domain[0][np.newaxis, :]
+
+    @cached_property
+    def rmse(self):
+        # Same frames as librosa.feature.rms(y=y)
+        return self.time_domain[1][np.newaxis, :]
+
+    @cached_property
+    def silence_ratio(self):
+        return rms_silence_ratio(self.rmse[0])
+
+    @cached_property
+    def onset_env(self):
+        return librosa.onset.onset_strength(sr=self.sr, **self._src("mel_db"))
+
+    @cached_property
+    def tonnetz(self):
+        """(6, n_frames) tonnetz matrix of the configured tonnetz_mode."""
+        if self.tonnetz_mode == "fast":
+            return fast_tonnetz(self.chroma)
+        if self.spec is not None:
+            # Same HPSS as librosa.effects.harmonic, on the shared STFT
+            stft_harm = librosa.decompose.hpss(self.spec.stft)[0]
+            harmonic = librosa.istft(stft_harm, hop_length=self.spec.hop_length,
+                                     n_fft=self.spec.n_fft, length=len(self.y))
+        else:
+            harmonic = librosa.effects.harmonic(self.y)
+        return librosa.feature.tonnetz(y=harmonic, sr=self.sr)
+
+    @cached_property
+    def tonnetz_mean(self):
+        try:
+            return np.mean(self.tonnetz, axis=1)
+        except Exception:
+            return np.zeros(6)
+
+
+def validate_signal(y: np.ndarray, sr: int):
+    """Raises ValueError for signals the feature extractor cannot analyse."""
+    if len(y) == 0:
+        raise ValueError("Audio file is empty.")
+
+    duration_sec = len(y) / sr
+    if duration_sec < 0.5:
+        raise ValueError(f"Audio too short ({duration_sec:.2f}s). Minimum 0.5 seconds required.")
+
+
+def assemble_features(ctx: FeatureContext, groups=None) -> np.ndarray:
+    """
+    Builds the feature vector from the registry layout, computing only the
+    requested groups (None = all). Skipped groups stay 0.
+    """
+    features = np.zeros(N_FEATURES)
+    for group in FEATURE_GROUPS:
+        if groups is None or group.name in groups:
+            features[GROUP_SLICES[group.name]] = group.compute(ctx)
+    return features
+
+
+FEATURE_ENGINES = ("librosa", "numpy")
+
+
+def context_class(engine: str = None):
+    """FeatureContext implementation of a feature engine (default: settings.FEATURE_ENGINE)."""
+    engine = engine or settings.FEATURE_ENGINE
+    if engine == "numpy":
+        # Imported on first use: the engine builds on FeatureContext
+        from app.audio.numpy_engine import NumpyFeatureContext
+        return NumpyFeatureContext
+    if engine != "librosa":
+        raise ValueError(f"Unknown feature engine '{engine}'. Expected one of {FEATURE_ENGINES}.")
+    return FeatureContext
+
+
+def extract_features(file_path, shared_spectrogram: bool = None, pitch_engine: str = None,
+                     tonnetz_mode: str = None, groups=None, streaming: bool = None, engine: str = None,
+                     resample_quality: str = None, vad: bool = None, segmented: bool = None,
+                     audio_format: str = None):
     """
     Extracts comprehensive acoustic features from an audio file using librosa.
-    Returns a 1D numpy array of features.
-    
-    Feature vector breakdown (~83 features):
+    file_path is a path or the encoded file's bytes (decoded in memory, see
+    decoder.load_audio). Returns a 1D numpy array of features.
+
+    With shared_spectrogram (default: settings.SHARED_SPECTROGRAM) the complex
+    STFT is computed once and every spectral feature, the log-mel spectrogram
+    and the HPSS input are derived from it instead of each librosa call running
+    its own STFT. The vector keeps the same order and matches the per-call
+    computation to within rtol=1e-5 / atol=1e-6 (float32 round-off only).
+    Against the pre-FFT-backend baseline the same holds with FFT_BACKEND=numpy
+    (<= 1e-7); with the default scipy backend every index but the HPSS tonnetz
+    (86-91) stays within 1e-10, and the tonnetz moves by up to ~7e-4 relative
+    (its CQT tuning estimate is sensitive to FFT round-off; see the tolerance
+    in training/parity.py).
+
+    pitch_engine (default: settings.PITCH_ENGINE) selects how indices 78/79
+    are computed: "voiceband" uses app.audio.pitch (vectorized, voice band
+    only, same values as piptrack) and "piptrack" the original full-matrix call.
+
+    tonnetz_mode (default: settings.TONNETZ_MODE) selects indices 86-91:
+    "hpss" runs librosa.effects.harmonic + CQT tonnetz, "fast" derives them
+    from the STFT chroma (app.audio.tonnetz). Models declare the mode they
+    were trained with in their metadata file.
+
+    groups restricts extraction to the named feature groups of
+    app.audio.registry (None = all); only the intermediates those groups need
+    are computed and the other slices of the vector are left at 0.
+
+    engine (default: settings.FEATURE_ENGINE) selects the implementation:
+    "librosa" is the reference, "numpy" the librosa-free engine in
+    app.audio.numpy_engine (precomputed filterbanks, same vector to float32
+    round-off; the HPSS tonnetz still runs through librosa).
+
+    resample_quality (default: settings.RESAMPLE_QUALITY) is the resampling
+    tier used to bring the clip to 22050 Hz (see decoder.load_audio); like
+    tonnetz_mode it is recorded in the model metadata.
+
+    audio_format is the declared container (the request's audioFormat); the
+    decoder sniffs the bytes and only falls back to it for content it does
+    not recognise (see decoder.load_audio).
+
+    vad (default: settings.VAD_ENABLED) runs the voice-activity gate of
+    app.audio.vad on the decoded signal: leading/trailing silence is dropped,
+    long pauses are capped and a clip without speech raises NoSpeechError
+    (a ValueError) before any spectral work. It is recorded in the model
+    metadata as well.
+
+    segmented (default: settings.SEGMENTED_EXTRACTION) splits clips longer
+    than two SEGMENT_SECONDS into frame segments extracted on a thread pool
+    and merges their statistics (app.audio.segmented); same vector to float
+    round-off, lower latency for long recordings on multi-core machines.
+
+    streaming (default: settings.STREAMING_EXTRACTION) reads the file in
+    blocks through app.audio.streaming instead of decoding it whole; memory
+    stays flat with clip length. That path only computes the voiceband pitch
+    and the fast tonnetz and cannot run the voice-activity gate: a
+    pitch_engine, tonnetz_mode or vad (explicit or from the settings) asking
+    otherwise raises ValueError rather than silently changing the vector.
+
+    Feature vector breakdown (layout defined in app.audio.registry):
       - MFCC Mean (13) + Std (13) = 26
       - Delta MFCC Mean (13) + Std (13) = 26
       - Spectral Centroid Mean + Std = 2
@@ -26,138 +263,42 @@ def extract_features(file_path: str):
       - Tonnetz Mean (6) = 6
       Total = ~92 features
     """
-    try:
-        # Load audio directly with librosa (supports MP3 via audioread/soundfile)
+    # Counted as running while it shares the FFT thread budget (app.audio.fft_backend)
+    with extraction_slot():
         try:
-            y, sr = librosa.load(file_path, sr=22050, mono=True)
+            if streaming is None:
+                streaming = settings.STREAMING_EXTRACTION
+            if streaming:
+                return extract_features_streaming(file_path, quality=resample_quality, groups=groups,
+                                                  pitch_engine=pitch_engine, tonnetz_mode=tonnetz_mode,
+                                                  vad=vad, audio_format=audio_format)
+
+            # Load audio with librosa (supports MP3 via audioread/soundfile), within
+            # the analysis budget (settings.MAX_ANALYSIS_SECONDS)
+            try:
+                y, sr = load_audio(file_path, sr=22050, quality=resample_quality, audio_format=audio_format)
+            except Exception as e:
+                raise ValueError(f"Cannot decode audio file: {str(e)}")
+
+            # Voice-activity gate: spectral features only see the speech portion
+            if settings.VAD_ENABLED if vad is None else vad:
+                y = gate_speech(y, sr)
+
+            # Validate audio
+            validate_signal(y, sr)
+
+            if settings.SEGMENTED_EXTRACTION if segmented is None else segmented:
+                # Imported on first use: the segmented extractor builds on this module
+                from app.audio.segmented import extract_features_segmented
+                return extract_features_segmented(y, sr, engine=engine, pitch_engine=pitch_engine,
+                                                  tonnetz_mode=tonnetz_mode, groups=groups)
+
+            ctx = context_class(engine)(y, sr, shared_spectrogram=shared_spectrogram,
+                                        pitch_engine=pitch_engine, tonnetz_mode=tonnetz_mode)
+            return assemble_features(ctx, groups)
+
+        except NoSpeechError:
+            raise
         except Exception as e:
-            raise ValueError(f"Cannot decode audio file: {str(e)}")
-        
-        # Force data into memory
-        y = np.array(y, copy=True)
-        
-        # Validate audio
-        if len(y) == 0:
-            raise ValueError("Audio file is empty.")
-        
-        duration_sec = len(y) / sr
-        if duration_sec < 0.5:
-            raise ValueError(f"Audio too short ({duration_sec:.2f}s). Minimum 0.5 seconds required.")
-        
-        # ===================== CORE FEATURES =====================
-        
-        # 1. MFCCs (Mean + Std) - 13 coefficients
-        mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
-        mfcc_mean = np.mean(mfcc, axis=1)       # 13
-        mfcc_std = np.std(mfcc, axis=1)          # 13
-        
-        # 2. Delta MFCCs (1st order) - temporal dynamics
-        delta_mfcc = librosa.feature.delta(mfcc)
-        delta_mfcc_mean = np.mean(delta_mfcc, axis=1)   # 13
-        delta_mfcc_std = np.std(delta_mfcc, axis=1)      # 13
-        
-        # 3. Spectral Centroid
-        centroid = librosa.feature.spectral_centroid(y=y, sr=sr)
-        centroid_mean = np.mean(centroid)         # 1
-        centroid_std = np.std(centroid)            # 1
-        
-        # 4. Spectral Rolloff
-        rolloff = librosa.feature.spectral_rolloff(y=y, sr=sr)
-        rolloff_mean = np.mean(rolloff)           # 1
-        rolloff_std = np.std(rolloff)             # 1
-        
-        # 5. Spectral Flatness
-        flatness = librosa.feature.spectral_flatness(y=y)
-        flatness_mean = np.mean(flatness)         # 1
-        
-        # 6. Spectral Bandwidth
-        bandwidth = librosa.feature.spectral_bandwidth(y=y, sr=sr)
-        bandwidth_mean = np.mean(bandwidth)       # 1
-        bandwidth_std = np.std(bandwidth)         # 1
-        
-        # 7. Spectral Contrast (7 bands)
-        contrast = librosa.feature.spectral_contrast(y=y, sr=sr)
-        contrast_mean = np.mean(contrast, axis=1) # 7
-        
-        # 8. Chroma STFT (12 bins)
-        chroma = librosa.feature.chroma_stft(y=y, sr=sr)
-        chroma_mean = np.mean(chroma, axis=1)     # 12
-        
-        # ===================== PROSODIC FEATURES =====================
-        
-        # 9. Pitch (F0) Analysis using piptrack
-        pitches, magnitudes = librosa.piptrack(y=y, sr=sr)
-        pitches_indices = magnitudes > np.median(magnitudes)
-        pitch_values = pitches[pitches_indices]
-        pitch_values = pitch_values[pitch_values > 0]
-        
-        if len(pitch_values) > 0:
-            pitch_mean = np.mean(pitch_values)    # 1
-            pitch_std = np.std(pitch_values)      # 1
-        else:
-            pitch_mean = 0
-            pitch_std = 0
-            
-        # 10. Zero Crossing Rate (Jitter proxy)
-        zcr = librosa.feature.zero_crossing_rate(y)
-        zcr_mean = np.mean(zcr)                   # 1
-        zcr_var = np.var(zcr)                     # 1
-        
-        # 11. RMSE (Energy/Amplitude - Shimmer proxy)
-        rmse = librosa.feature.rms(y=y)
-        rmse_mean = np.mean(rmse)                 # 1
-        rmse_var = np.var(rmse)                   # 1
-        
-        # 12. Silence Ratio
-        rmse_db = librosa.amplitude_to_db(rmse, ref=np.max)
-        silence_threshold_db = -40
-        silence_frames = np.sum(rmse_db < silence_threshold_db)
-        total_frames = len(rmse_db[0])
-        silence_ratio = silence_frames / total_frames if total_frames > 0 else 0  # 1
-        
-        # 13. Spectral Smoothness
-        onset_env = librosa.onset.onset_strength(y=y, sr=sr)
-        spectral_smoothness = np.mean(np.diff(onset_env))  # 1
-        
-        # ===================== ADVANCED FEATURES =====================
-        
-        # 14. Tonnetz (tonal centroid features) - 6 dimensions
-        try:
-            harmonic = librosa.effects.harmonic(y)
-            tonnetz = librosa.feature.tonnetz(y=harmonic, sr=sr)
-            tonnetz_mean = np.mean(tonnetz, axis=1)  # 6
-        except Exception:
-            tonnetz_mean = np.zeros(6)
-        
-        # Concatenate all features
-        features = np.hstack([
-            mfcc_mean,           # 13
-            mfcc_std,            # 13
-            delta_mfcc_mean,     # 13
-            delta_mfcc_std,      # 13
-            centroid_mean,       # 1
-            centroid_std,        # 1
-            rolloff_mean,        # 1
-            rolloff_std,         # 1
-            flatness_mean,       # 1
-            bandwidth_mean,      # 1
-            bandwidth_std,       # 1
-            contrast_mean,       # 7
-            chroma_mean,         # 12
-            pitch_mean,          # 1
-            pitch_std,           # 1
-            zcr_mean,            # 1
-            zcr_var,             # 1
-            rmse_mean,           # 1
-            rmse_var,            # 1
-            silence_ratio,       # 1
-            spectral_smoothness, # 1
-            tonnetz_mean,        # 6
-        ])
-        # Total: 13+13+13+13+1+1+1+1+1+1+1+7+12+1+1+1+1+1+1+1+1+6 = 92
-        
-        return features
-        
-    except Exception as e:
-        print(f"Error extracting features: {type(e).__name__}: {e}")
-        raise ValueError(str(e) if str(e) else f"Audio processing error: {type(e).__name__}")
+            print(f"Error extracting features: {type(e).__name__}: {e}")
+            raise ValueError(str(e) if str(e) else f"Audio processing error: {type(e).__name__}")
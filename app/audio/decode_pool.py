@@ -0,0 +1,230 @@
+"""
+Long-lived decoder worker processes shared by all requests.
+
+ffmpeg cannot be kept running across inputs (one process reads one
+container), so the persistent workers are Python processes that decode in
+process: libsndfile (with mpg123 for MP3) reads WAV / FLAC / OGG / MP3
+without any subprocess, and only containers it does not know still go
+through ffmpeg, spawned by the worker. Each worker is started once with
+the "spawn" method (librosa, soundfile and soxr imported and warm), then
+serves decode requests over a pipe: the encoded bytes (or a path) go in,
+PCM at the target rate comes back as raw samples read straight into the
+result array.
+
+Decoding outside the API process also contains decoder crashes: a
+segfault or a hang in a native decoder on a hostile file kills or stalls
+one worker, not the server. A worker that dies is restarted and the
+request fails with a ValueError; one that exceeds DECODER_TIMEOUT_SECONDS
+is killed and restarted. A monitor thread pings the idle workers every
+DECODER_HEALTH_SECONDS and replaces those that do not answer.
+"""
+import multiprocessing
+import queue
+import threading
+
+import numpy as np
+
+from app.core.config import settings
+
+# Seconds a fresh worker may take to import its libraries and report ready
+BOOT_TIMEOUT = 120
+PING_TIMEOUT = 10
+
+
+def _worker_main(conn):
+    """Worker process: decode requests until the pipe closes."""
+    # Heavy imports happen here, once per worker
+    from app.audio.decoder import _decode
+    conn.send("ready")
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            return
+        if message == "ping":
+            conn.send("pong")
+            continue
+        options = dict(message)
+        source = conn.recv_bytes() if options.pop("encoded") else options.pop("path")
+        try:
+            y, backend = _decode(source, **options)
+            y = np.ascontiguousarray(y)
+        except Exception as e:
+            conn.send(("error", str(e) if str(e) else type(e).__name__))
+            continue
+        conn.send(("ok", y.dtype.str, len(y), backend))
+        conn.send_bytes(memoryview(y).cast("B"))
+
+
+class DecoderWorkerError(ValueError):
+    """A worker crashed or timed out on a decode (the worker has been replaced)."""
+
+
+class _Worker:
+    """One worker process and the parent's end of its pipe."""
+
+    def __init__(self, context, index: int):
+        self.context = context
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.ready = False
+
+    def start(self):
+        parent, child = self.context.Pipe()
+        self.process = self.context.Process(target=_worker_main, args=(child,), name=f"decoder-{self.index}",
+                                            daemon=True)
+        self.process.start()
+        child.close()
+        self.conn, self.ready = parent, False
+
+    def stop(self):
+        if self.conn is not None:
+            self.conn.close()
+        if self.process is not None:
+            if self.process.is_alive():
+                self.process.kill()
+            self.process.join(5)
+
+    def _receive(self, timeout: float):
+        if not self.conn.poll(timeout):
+            raise TimeoutError
+        return self.conn.recv()
+
+    def wait_ready(self):
+        if not self.ready:
+            if self._receive(BOOT_TIMEOUT) != "ready":
+                raise RuntimeError("unexpected message from a booting decoder worker")
+            self.ready = True
+
+    def ping(self) -> bool:
+        try:
+            self.wait_ready()
+            self.conn.send("ping")
+            return self._receive(PING_TIMEOUT) == "pong"
+        except (TimeoutError, EOFError, OSError, RuntimeError):
+            return False
+
+    def decode(self, source, options: dict, timeout: float):
+        """(y, backend) for one request; TimeoutError / EOFError / OSError mean the worker is unusable."""
+        self.wait_ready()
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self.conn.send({**options, "encoded": True})
+            self.conn.send_bytes(memoryview(source).cast("B"))
+        else:
+            self.conn.send({**options, "encoded": False, "path": source})
+        reply = self._receive(timeout)
+        if reply[0] == "error":
+            raise ValueError(reply[1])
+        _, dtype, length, backend = reply
+        y = np.empty(length, dtype=np.dtype(dtype))
+        if length:
+            self.conn.recv_bytes_into(memoryview(y).cast("B"))
+        else:
+            self.conn.recv_bytes()
+        return y, backend
+
+
+class DecoderPool:
+    """Fixed set of decoder workers handed out to one request at a time."""
+
+    def __init__(self, size: int, timeout: float = None, health_seconds: float = None):
+        self.timeout = timeout or settings.DECODER_TIMEOUT_SECONDS
+        self.health_seconds = health_seconds or settings.DECODER_HEALTH_SECONDS
+        self.restarts = 0
+        self.crashes = 0
+        self.timeouts = 0
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        context = multiprocessing.get_context("spawn")
+        self._workers = [_Worker(context, i) for i in range(size)]
+        self._idle = queue.Queue()
+        for worker in self._workers:
+            worker.start()
+            self._idle.put(worker)
+        self._monitor = threading.Thread(target=self._watch, name="decoder-health", daemon=True)
+        self._monitor.start()
+
+    def _restart(self, worker: _Worker):
+        worker.stop()
+        worker.start()
+        with self._lock:
+            self.restarts += 1
+
+    def decode(self, source, audio_format, sr, max_seconds, strategy, dtype, quality):
+        """decoder._decode() in a worker: (y, backend), ValueError on undecodable input or a worker failure."""
+        options = {"audio_format": audio_format, "sr": sr, "max_seconds": max_seconds, "strategy": strategy,
+                   "dtype": np.dtype(dtype).str, "quality": quality}
+        worker = self._idle.get()
+        try:
+            if not worker.process.is_alive():
+                self._restart(worker)
+            try:
+                return worker.decode(source, options, self.timeout)
+            except TimeoutError:
+                with self._lock:
+                    self.timeouts += 1
+                self._restart(worker)
+                raise DecoderWorkerError(f"decoding took longer than {self.timeout:g}s")
+            except (EOFError, OSError):
+                worker.process.join(1)
+                code = worker.process.exitcode
+                with self._lock:
+                    self.crashes += 1
+                self._restart(worker)
+                raise DecoderWorkerError(f"decoder worker crashed (exit code {code})")
+        finally:
+            self._idle.put(worker)
+
+    def _watch(self):
+        """Health check: pings each idle worker every health_seconds, restarting dead or silent ones."""
+        while not self._closed.wait(self.health_seconds):
+            for _ in range(len(self._workers)):
+                try:
+                    worker = self._idle.get_nowait()
+                except queue.Empty:
+                    break  # the rest are busy decoding, which is its own check
+                try:
+                    if not worker.process.is_alive() or not worker.ping():
+                        print(f"Decoder worker {worker.index} failed its health check; restarting")
+                        self._restart(worker)
+                finally:
+                    self._idle.put(worker)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"workers": len(self._workers),
+                    "alive": sum(worker.process.is_alive() for worker in self._workers),
+                    "restarts": self.restarts, "crashes": self.crashes, "timeouts": self.timeouts}
+
+    def close(self):
+        self._closed.set()
+        for worker in self._workers:
+            worker.stop()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def decoder_pool() -> DecoderPool:
+    """The process-wide pool of settings.DECODER_WORKERS workers, started on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DecoderPool(settings.DECODER_WORKERS)
+        return _pool
+
+
+def close_pool():
+    """Stops the workers (application shutdown)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def pool_stats():
+    """Pool counters for the metrics endpoint (None while no pool is running)."""
+    return _pool.stats() if _pool is not None else None
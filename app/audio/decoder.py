@@ -1,22 +1,41 @@
 import base64
+import io
+import json
 import tempfile
 import os
 import shutil
+import subprocess
+import time
+from functools import partial
+import librosa
+import numpy as np
+import soundfile as sf
 from fastapi import HTTPException
+from app.audio.formats import read_head, resolve_format, sniff_format, decode_metrics
+from app.audio.decode_pool import decoder_pool
+from app.core.config import settings
+
+def decode_base64(base64_string: str) -> bytes:
+    """Decodes the audioBase64 field into the encoded file's bytes (400 on malformed input)."""
+    try:
+        return base64.b64decode(base64_string)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail={"status": "error", "message": f"Invalid value for 'audioBase64': {str(e)}"})
 
 def decode_audio(base64_string: str) -> tuple[str, str]:
     """
     Decodes a base64 string and saves it to a temporary file.
     Returns the path to the temporary file and the temp directory.
     Uses directory-based temp strategy for Windows compatibility.
+    
+    The API decodes in memory (load_audio accepts the bytes directly); this
+    is kept for tools that need a file on disk.
     """
+    audio_bytes = decode_base64(base64_string)
     try:
-        # Decode base64 audio
-        audio_bytes = base64.b64decode(base64_string)
-        
         # Create temporary directory (Windows-safe)
         tmp_dir = tempfile.mkdtemp(prefix="voice_input_")
-        tmp_path = os.path.join(tmp_dir, "input.mp3")
+        tmp_path = os.path.join(tmp_dir, _temp_name(audio_bytes))
         
         # Write audio to file
         with open(tmp_path, "wb") as f:
@@ -26,6 +45,10 @@ def decode_audio(base64_string: str) -> tuple[str, str]:
     except Exception as e:
         raise HTTPException(status_code=400, detail={"status": "error", "message": f"Invalid value for 'audioBase64': {str(e)}"})
 
+def _temp_name(data) -> str:
+    """Temporary file name with the extension of the sniffed container (mp3 when unknown)."""
+    return f"input.{sniff_format(read_head(data)) or 'mp3'}"
+
 def cleanup_temp_dir(tmp_dir: str):
     """
     Removes the temporary directory and all contents.
@@ -52,3 +75,344 @@ def cleanup_temp_dir(tmp_dir: str):
         # Silent fail - temp cleanup is best-effort
         pass
 
+
+def is_encoded(source) -> bool:
+    """True for an in-memory encoded file (bytes) rather than a path."""
+    return isinstance(source, (bytes, bytearray, memoryview))
+
+class _MemoryReader(io.RawIOBase):
+    """Read-only seekable stream over a bytearray / memoryview, without copying it."""
+
+    def __init__(self, view):
+        self._view = memoryview(view).cast("B")
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        n = max(0, min(len(b), len(self._view) - self._pos))
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._view)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+def open_source(source):
+    """soundfile / librosa input for a path or an in-memory encoded file (a fresh reader per call)."""
+    if isinstance(source, bytes):
+        # BytesIO shares an immutable bytes object instead of copying it
+        return io.BytesIO(source)
+    if is_encoded(source):
+        return io.BufferedReader(_MemoryReader(source))
+    return source
+
+def probe_duration(file_path):
+    """Clip duration in seconds from the container header, or None if it cannot be read."""
+    try:
+        return sf.info(open_source(file_path)).duration
+    except Exception:
+        pass
+    if is_encoded(file_path):
+        return None
+    try:
+        return librosa.get_duration(path=file_path)
+    except Exception:
+        return None
+
+def _energy_offsets(file_path, duration: float, window: float, n_windows: int) -> list:
+    """Start times of the n loudest non-overlapping windows, measured on 1 s blocks at the native rate."""
+    info = sf.info(open_source(file_path))
+    energy = np.array([np.mean(block ** 2) for block in
+                       sf.blocks(open_source(file_path), blocksize=info.samplerate, dtype="float32",
+                                 always_2d=True)])
+    k = max(1, min(int(round(window)), len(energy)))
+    window_energy = np.convolve(energy, np.ones(k), mode="valid")
+    
+    offsets = []
+    for _ in range(n_windows):
+        start = int(np.argmax(window_energy))
+        if window_energy[start] == -np.inf:
+            break
+        offsets.append(float(min(start, duration - window)))
+        window_energy[max(0, start - k + 1):start + k] = -np.inf
+    return sorted(offsets)
+
+def analysis_windows(file_path, max_seconds: float = None, strategy: str = None, duration: float = None):
+    """
+    Chooses which parts of a clip to analyse under the duration budget.
+    
+    Returns None when the whole clip fits (or the budget is disabled), else a
+    deterministic list of (offset, duration) windows in seconds whose total
+    is max_seconds: spread evenly from the start to the end of the clip, the
+    loudest ones when strategy is "energy", or the first max_seconds in one
+    piece when strategy is "head" (keeps the clip's time axis). duration
+    skips the header probe when the caller already knows it.
+    """
+    max_seconds = settings.MAX_ANALYSIS_SECONDS if max_seconds is None else max_seconds
+    strategy = strategy or settings.ANALYSIS_WINDOW_STRATEGY
+    if not max_seconds or max_seconds <= 0:
+        return None
+    duration = probe_duration(file_path) if duration is None else duration
+    if duration is None or duration <= max_seconds:
+        return None
+    
+    if strategy == "head":
+        return [(0.0, max_seconds)]
+    n_windows = max(1, int(max_seconds // settings.ANALYSIS_WINDOW_SECONDS))
+    window = max_seconds / n_windows
+    if strategy == "energy":
+        try:
+            return [(offset, window) for offset in _energy_offsets(file_path, duration, window, n_windows)]
+        except Exception:
+            pass  # not readable block-wise: fall back to evenly spread windows
+    if n_windows == 1:
+        return [(0.0, window)]
+    return [(float(offset), window) for offset in np.linspace(0.0, duration - window, n_windows)]
+
+# Resampling tiers (settings.RESAMPLE_QUALITY) -> librosa res_type / soxr stream quality.
+# "decoder" lets ffmpeg output the target rate directly and uses "hq" wherever
+# ffmpeg is not involved.
+RESAMPLE_TIERS = {"hq": "soxr_hq", "fast": "soxr_qq", "decoder": "soxr_hq"}
+STREAM_RESAMPLE_QUALITY = {"hq": "HQ", "fast": "QQ", "decoder": "HQ"}
+
+def resample_tier(quality: str = None) -> str:
+    """Validated resampling tier (default: settings.RESAMPLE_QUALITY)."""
+    quality = quality or settings.RESAMPLE_QUALITY
+    if quality not in RESAMPLE_TIERS:
+        raise ValueError(f"Unknown resample quality '{quality}'. Expected one of {tuple(RESAMPLE_TIERS)}.")
+    return quality
+
+def resample(y: np.ndarray, orig_sr: int, target_sr: int, quality: str = None) -> np.ndarray:
+    """Resamples with the configured tier; signals already at target_sr are returned as is."""
+    quality = resample_tier(quality)
+    if orig_sr == target_sr:
+        return y
+    return librosa.resample(y, orig_sr=orig_sr, target_sr=target_sr, res_type=RESAMPLE_TIERS[quality])
+
+def _load_ffmpeg(file_path, sr: int, offset: float = 0.0, duration: float = None, dtype=np.float32):
+    """Decodes with ffmpeg, which downmixes and resamples to `sr` in the same pass."""
+    cmd = ["ffmpeg", "-nostdin", "-v", "error"]
+    if offset:
+        cmd += ["-ss", str(offset)]
+    if duration is not None:
+        cmd += ["-t", str(duration)]
+    # In-memory files are fed through stdin
+    cmd += ["-i", "pipe:0" if is_encoded(file_path) else file_path,
+            "-ac", "1", "-ar", str(sr), "-f", "f32le", "pipe:1"]
+    result = subprocess.run(cmd, input=bytes(file_path) if is_encoded(file_path) else None, capture_output=True)
+    if result.returncode != 0:
+        raise ValueError(f"ffmpeg failed: {result.stderr.decode(errors='replace').strip()}")
+    return np.frombuffer(result.stdout, dtype=np.float32).astype(dtype)
+
+def _load_pcm16(file_path, sr: int, offset: float = 0.0, duration: float = None, dtype=np.float32,
+                quality: str = None):
+    """
+    librosa.load for 16-bit PCM files, keeping the samples as int16 until the
+    mono mixdown. The float conversion is exact (a power-of-two scale), so
+    the result is identical to librosa.load while the multichannel decode
+    buffer is half the size.
+    """
+    with sf.SoundFile(open_source(file_path)) as f:
+        sr_native = f.samplerate
+        if offset:
+            f.seek(int(offset * sr_native))
+        frames = int(duration * sr_native) if duration is not None else -1
+        pcm = f.read(frames=frames, dtype="int16", always_2d=True)
+    
+    y = pcm.mean(axis=1, dtype=dtype) if pcm.shape[1] > 1 else pcm[:, 0].astype(dtype)
+    del pcm
+    y *= 1.0 / 32768
+    return resample(y, sr_native, sr, quality)
+
+def _load_librosa(file_path, sr: int, offset: float = 0.0, duration: float = None, dtype=np.float32,
+                  quality: str = None):
+    y, sr_native = librosa.load(open_source(file_path), sr=None, mono=True, offset=offset, duration=duration,
+                                dtype=dtype)
+    return resample(y, sr_native, sr, quality)
+
+def _is_pcm16(file_path) -> bool:
+    try:
+        return sf.info(open_source(file_path)).subtype == "PCM_16"
+    except Exception:
+        return False
+
+def _is_soundfile(data) -> bool:
+    """True when libsndfile reads the encoded bytes (WAV, FLAC, OGG, MP3, ...)."""
+    try:
+        sf.info(open_source(data))
+        return True
+    except Exception:
+        return False
+
+def _probe_stream(data):
+    """
+    (sample_rate, channels) of the first audio stream of in-memory bytes, from
+    ffprobe's JSON output (stable across ffmpeg versions and locales).
+    """
+    cmd = ["ffprobe", "-v", "error", "-select_streams", "a:0", "-show_entries", "stream=sample_rate,channels",
+           "-of", "json", "-i", "pipe:0"]
+    result = subprocess.run(cmd, input=bytes(data), capture_output=True)
+    try:
+        stream = json.loads(result.stdout)["streams"][0]
+        return int(stream["sample_rate"]), int(stream["channels"])
+    except (ValueError, KeyError, IndexError, TypeError):
+        log = result.stderr.decode(errors="replace").strip()
+        raise ValueError(f"ffprobe found no audio stream: {log.splitlines()[-1] if log else result.returncode}")
+
+def _pipe_pcm16(data, dtype=np.float32):
+    """
+    Decodes in-memory bytes with ffmpeg through pipes at the native rate and
+    channel count (probed first, then pinned with -ar / -ac), as 16-bit PCM
+    like audioread's ffmpeg backend (which librosa.load uses for these
+    formats from a path). Returns (y, sr_native) mixed down to mono, or
+    raises ValueError (e.g. a container whose index sits at the end and
+    needs a seekable file).
+    """
+    sr_native, channels = _probe_stream(data)
+    cmd = ["ffmpeg", "-nostdin", "-v", "error", "-i", "pipe:0", "-map", "0:a:0",
+           "-ar", str(sr_native), "-ac", str(channels), "-f", "s16le", "pipe:1"]
+    result = subprocess.run(cmd, input=bytes(data), capture_output=True)
+    if result.returncode != 0:
+        raise ValueError(f"ffmpeg failed: {result.stderr.decode(errors='replace').strip() or result.returncode}")
+    pcm = np.frombuffer(result.stdout, dtype="<i2")
+    pcm = pcm[:len(pcm) // channels * channels].reshape(-1, channels)
+    y = pcm.mean(axis=1, dtype=dtype) if channels > 1 else pcm[:, 0].astype(dtype)
+    y *= 1.0 / 32768
+    return y, sr_native
+
+def _load_piped(data, sr: int, max_seconds: float, strategy: str, dtype, quality: str):
+    """
+    Samples of in-memory bytes libsndfile cannot read, decoded by ffmpeg
+    over pipes, else through a temporary file.
+    """
+    if shutil.which("ffmpeg") and shutil.which("ffprobe"):
+        try:
+            y, sr_native = _pipe_pcm16(data, dtype)
+        except ValueError:
+            y = None
+        if y is not None:
+            windows = analysis_windows(data, max_seconds, strategy, duration=len(y) / sr_native)
+            if windows is None:
+                return resample(y, sr_native, sr, quality)
+            return np.concatenate([resample(y[int(offset * sr_native):int((offset + duration) * sr_native)],
+                                            sr_native, sr, quality)
+                                   for offset, duration in windows])
+    
+    # Only formats that need a seekable file (or a host without ffmpeg) reach the disk
+    tmp_dir = tempfile.mkdtemp(prefix="voice_input_")
+    try:
+        tmp_path = os.path.join(tmp_dir, _temp_name(data))
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        return _decode(tmp_path, None, sr, max_seconds, strategy, dtype, quality)[0]
+    finally:
+        cleanup_temp_dir(tmp_dir)
+
+def _read_mono(f, frames: int, dtype) -> np.ndarray:
+    """Reads `frames` (-1 = to the end) from an open SoundFile and mixes them to mono, like librosa.load."""
+    if f.subtype == "PCM_16":
+        # int16 until the mixdown; the power-of-two scale keeps it identical (see _load_pcm16)
+        pcm = f.read(frames=frames, dtype="int16", always_2d=True)
+        y = pcm.mean(axis=1, dtype=dtype) if pcm.shape[1] > 1 else pcm[:, 0].astype(dtype)
+        y *= 1.0 / 32768
+        return y
+    data = f.read(frames=frames, dtype=dtype, always_2d=True)
+    return data.mean(axis=1, dtype=dtype) if data.shape[1] > 1 else data[:, 0]
+
+def _load_soundfile(source, sr: int, max_seconds: float, strategy: str, dtype, quality: str) -> np.ndarray:
+    """
+    load_audio() through libsndfile alone: one open for the header, the
+    window plan and every window, read in order so compressed streams only
+    ever seek forward. Same samples as the librosa.load / _load_pcm16 path.
+    """
+    with sf.SoundFile(open_source(source)) as f:
+        sr_native = f.samplerate
+        windows = analysis_windows(source, max_seconds, strategy, duration=f.frames / sr_native)
+        if windows is None:
+            # Header may be missing or wrong: still stop decoding at the budget
+            frames = int(max_seconds * sr_native) if max_seconds > 0 else -1
+            return resample(_read_mono(f, frames, dtype), sr_native, sr, quality)
+        pieces = []
+        for offset, duration in windows:
+            f.seek(int(offset * sr_native))
+            pieces.append(resample(_read_mono(f, int(duration * sr_native), dtype), sr_native, sr, quality))
+        return np.concatenate(pieces)
+
+# Sniffed formats libsndfile decodes itself (MP3 needs libsndfile >= 1.1, built with mpg123)
+SOUNDFILE_FORMATS = {"wav", "flac", "ogg"} | ({"mp3"} if "MP3" in sf.available_formats() else set())
+
+def _decode(file_path, audio_format, sr, max_seconds, strategy, dtype, quality):
+    """load_audio() dispatch; returns (y, name of the backend that decoded it)."""
+    if quality == "decoder" and shutil.which("ffmpeg"):
+        loader, backend = _load_ffmpeg, "ffmpeg"
+    else:
+        if audio_format in SOUNDFILE_FORMATS:
+            try:
+                return _load_soundfile(file_path, sr, max_seconds, strategy, dtype, quality), "soundfile"
+            except Exception:
+                pass  # wrong hint or damaged header: the probing path below decides
+        elif audio_format == "mp3" and is_encoded(file_path):
+            # libsndfile without MP3 support: straight to ffmpeg, no failed soundfile probe
+            return _load_piped(file_path, sr, max_seconds, strategy, dtype, quality), "ffmpeg-pipe"
+        if is_encoded(file_path) and not _is_soundfile(file_path):
+            return _load_piped(file_path, sr, max_seconds, strategy, dtype, quality), "ffmpeg-pipe"
+        if _is_pcm16(file_path):
+            loader, backend = partial(_load_pcm16, quality=quality), "pcm16"
+        else:
+            loader, backend = partial(_load_librosa, quality=quality), "librosa"
+    windows = analysis_windows(file_path, max_seconds, strategy)
+    load = lambda offset, duration: loader(file_path, sr, offset, duration, dtype)
+    if windows is None:
+        # Header may be missing or wrong: still stop decoding at the budget
+        return load(0.0, max_seconds if max_seconds > 0 else None), backend
+    
+    return np.concatenate([load(offset, duration) for offset, duration in windows]), backend
+
+def load_audio(file_path, sr: int = 22050, max_seconds: float = None, strategy: str = None, dtype=None,
+               quality: str = None, audio_format: str = None):
+    """
+    Decodes and resamples a clip to mono within the analysis budget.
+    
+    file_path is a path or the encoded file itself (bytes). The container is
+    sniffed from its first bytes (app.audio.formats; audio_format, the
+    request's audioFormat, is only used when the bytes are not recognised)
+    and sent to its backend directly: WAV, FLAC, OGG and MP3 are read by
+    libsndfile from one open file (in place for bytes), other formats go
+    through ffmpeg over pipes, and only containers that need a seekable file
+    are written to a temporary file. Decode latency is recorded per format
+    in formats.decode_metrics. With settings.DECODER_WORKERS the decode runs
+    in a long-lived worker process of app.audio.decode_pool instead of the
+    calling thread (same samples).
+    
+    Decoding stops after max_seconds; longer clips are decoded only over the
+    windows chosen by analysis_windows() and the windows are concatenated.
+    Samples come back as dtype (default: settings.AUDIO_DTYPE); 16-bit PCM
+    files are read as int16 and converted once after mixdown.
+    
+    quality (default: settings.RESAMPLE_QUALITY) picks the resampling tier;
+    clips already at `sr` are never resampled, and with "decoder" ffmpeg (if
+    installed) decodes straight to `sr`.
+    Returns (y, sr).
+    """
+    max_seconds = settings.MAX_ANALYSIS_SECONDS if max_seconds is None else max_seconds
+    dtype = np.dtype(dtype or settings.AUDIO_DTYPE)
+    quality = resample_tier(quality)
+    audio_format = resolve_format(file_path, audio_format)
+    start = time.perf_counter()
+    if settings.DECODER_WORKERS > 0:
+        y, backend = decoder_pool().decode(file_path, audio_format, sr, max_seconds, strategy, dtype, quality)
+        backend = f"worker/{backend}"
+    else:
+        y, backend = _decode(file_path, audio_format, sr, max_seconds, strategy, dtype, quality)
+    decode_metrics.record(audio_format, backend, time.perf_counter() - start)
+    return y, sr
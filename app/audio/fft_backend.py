@@ -0,0 +1,114 @@
+"""
+FFT backend for the spectral front end.
+
+With FFT_BACKEND=scipy every FFT librosa runs (STFT, iSTFT, CQT filters)
+goes through scipy.fft with a `workers=` count, and the numpy engine passes
+the same count to its own rfft. The worker budget (FFT_WORKERS, default:
+the CPUs this process may run on) is shared between the extractions in
+flight: each FFT call uses budget // running_extractions threads, so a lone
+long clip gets the whole box and a loaded server falls back to one thread
+per request instead of oversubscribing the CPU. The share is re-read on every
+call, so a long extraction adapts as requests come and go.
+
+Every STFT uses the same n_fft, so pocketfft's plan cache serves the real-FFT
+plan after the first call.
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+import librosa
+import scipy.fft
+
+from app.core.config import settings
+
+FFT_BACKENDS = ("numpy", "scipy")
+
+_lock = threading.Lock()
+_running = 0
+_backend = "numpy"
+# Per-thread cap set by fft_thread_limit()
+_local = threading.local()
+
+
+def fft_budget() -> int:
+    """Total FFT threads (settings.FFT_WORKERS, or every CPU available to the process)."""
+    if settings.FFT_WORKERS > 0:
+        return settings.FFT_WORKERS
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def thread_share() -> int:
+    """This extraction's share of the thread budget: the budget split over the running extractions."""
+    return max(1, fft_budget() // max(_running, 1))
+
+
+def fft_workers() -> int:
+    """Worker count for an FFT issued now: thread_share(), 1 unless scipy.fft is the backend."""
+    if _backend != "scipy":
+        return 1
+    share = thread_share()
+    limit = getattr(_local, "limit", None)
+    return min(share, limit) if limit else share
+
+
+@contextmanager
+def fft_thread_limit(workers: int):
+    """Caps fft_workers() in the current thread, e.g. in one of several threads of the same extraction."""
+    previous = getattr(_local, "limit", None)
+    _local.limit = workers
+    try:
+        yield
+    finally:
+        _local.limit = previous
+
+
+@contextmanager
+def extraction_slot():
+    """Counts the enclosed extraction as running while it shares the FFT budget."""
+    global _running
+    with _lock:
+        _running += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _running -= 1
+
+
+class ScipyFFT:
+    """numpy.fft-compatible namespace for librosa.set_fftlib() that runs scipy.fft with fft_workers()."""
+
+    @staticmethod
+    def rfft(a, n=None, axis=-1, norm=None):
+        return scipy.fft.rfft(a, n=n, axis=axis, norm=norm, workers=fft_workers())
+
+    @staticmethod
+    def irfft(a, n=None, axis=-1, norm=None):
+        return scipy.fft.irfft(a, n=n, axis=axis, norm=norm, workers=fft_workers())
+
+    @staticmethod
+    def fft(a, n=None, axis=-1, norm=None):
+        return scipy.fft.fft(a, n=n, axis=axis, norm=norm, workers=fft_workers())
+
+    @staticmethod
+    def ifft(a, n=None, axis=-1, norm=None):
+        return scipy.fft.ifft(a, n=n, axis=axis, norm=norm, workers=fft_workers())
+
+
+def configure_fft(backend: str = None) -> str:
+    """Installs the FFT backend (default: settings.FFT_BACKEND) for librosa; returns its name."""
+    global _backend
+    backend = backend or settings.FFT_BACKEND
+    if backend not in FFT_BACKENDS:
+        raise ValueError(f"Unknown FFT backend '{backend}'. Expected one of {FFT_BACKENDS}.")
+    _backend = backend
+    # None restores numpy.fft
+    librosa.set_fftlib(ScipyFFT() if backend == "scipy" else None)
+    return backend
+
+
+configure_fft()
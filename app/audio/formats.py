@@ -0,0 +1,129 @@
+"""
+Container sniffing and decode metrics for decoder.load_audio.
+
+The first bytes of an upload name its container (RIFF/WAVE, ID3 or an MPEG
+audio frame sync, OggS, fLaC) more reliably than the request's audioFormat
+field, which defaults to "mp3". The sniffed format picks the decode backend
+without trial and error; audioFormat is only a hint for content the sniffer
+does not recognise, and a disagreement between the two is logged and
+counted. Every decode is timed per format and backend; the API serves the
+figures at GET /api/metrics.
+"""
+import os
+import threading
+from collections import deque
+
+import numpy as np
+
+# audioFormat spellings (extensions and audio/* subtypes) -> sniffed format name
+FORMAT_ALIASES = {
+    "mp3": "mp3", "mpeg": "mp3", "mpga": "mp3", "mpeg3": "mp3", "x-mp3": "mp3",
+    "wav": "wav", "wave": "wav", "x-wav": "wav", "vnd.wave": "wav",
+    "flac": "flac", "x-flac": "flac",
+    "ogg": "ogg", "oga": "ogg", "opus": "ogg", "vorbis": "ogg",
+}
+SNIFF_BYTES = 12
+
+
+def normalize_format(name) -> str:
+    """Canonical name of an audioFormat value ("audio/x-wav" -> "wav"); unknown names are returned lowercased."""
+    if not name:
+        return None
+    name = str(name).strip().lower()
+    if name.startswith("audio/"):
+        name = name[len("audio/"):]
+    name = name.lstrip(".")
+    return FORMAT_ALIASES.get(name, name)
+
+
+def _is_mpeg_audio_frame(head: bytes) -> bool:
+    """MPEG-1/2/2.5 layer I-III frame header (11-bit sync, valid version, layer and bitrate)."""
+    if len(head) < 3 or head[0] != 0xFF or head[1] & 0xE0 != 0xE0:
+        return False
+    version, layer, bitrate = (head[1] >> 3) & 0x03, (head[1] >> 1) & 0x03, head[2] >> 4
+    # Layer 0 is AAC in an ADTS header, not MPEG audio
+    return version != 1 and layer != 0 and bitrate != 0x0F
+
+
+def sniff_format(head: bytes) -> str:
+    """Container of an encoded file from its first SNIFF_BYTES bytes: "wav", "mp3", "ogg", "flac" or None."""
+    head = bytes(head[:SNIFF_BYTES])
+    if head[:4] in (b"RIFF", b"RF64", b"BW64") and head[8:12] == b"WAVE":
+        return "wav"
+    if head[:4] == b"fLaC":
+        return "flac"
+    if head[:4] == b"OggS":
+        return "ogg"
+    if head[:3] == b"ID3" or _is_mpeg_audio_frame(head):
+        return "mp3"
+    return None
+
+
+def read_head(source) -> bytes:
+    """First SNIFF_BYTES bytes of a path or an in-memory encoded file (b"" if unreadable)."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(memoryview(source).cast("B")[:SNIFF_BYTES])
+    try:
+        with open(source, "rb") as f:
+            return f.read(SNIFF_BYTES)
+    except OSError:
+        return b""
+
+
+def resolve_format(source, declared: str = None) -> str:
+    """
+    Format to decode `source` as: the sniffed container, else the declared
+    audioFormat (normalised), else None. A declared format that contradicts
+    the bytes is logged and counted in decode_metrics; the bytes win.
+    """
+    sniffed = sniff_format(read_head(source))
+    declared = normalize_format(declared)
+    if sniffed and declared and sniffed != declared:
+        name = "upload" if isinstance(source, (bytes, bytearray, memoryview)) else os.path.basename(str(source))
+        print(f"audioFormat '{declared}' does not match the {sniffed} content of the {name}; decoding as {sniffed}")
+        decode_metrics.mismatch(declared, sniffed)
+    return sniffed or declared
+
+
+class DecodeMetrics:
+    """Thread-safe decode latency per format: counts, mean / max and percentiles of the recent decodes."""
+
+    def __init__(self, recent: int = 512):
+        self._lock = threading.Lock()
+        self._recent = recent
+        self._formats = {}
+        self._mismatches = {}
+
+    def record(self, audio_format: str, backend: str, seconds: float):
+        with self._lock:
+            entry = self._formats.setdefault(audio_format or "unknown", {
+                "count": 0, "total": 0.0, "max": 0.0, "recent": deque(maxlen=self._recent), "backends": {}})
+            entry["count"] += 1
+            entry["total"] += seconds
+            entry["max"] = max(entry["max"], seconds)
+            entry["recent"].append(seconds)
+            entry["backends"][backend] = entry["backends"].get(backend, 0) + 1
+
+    def mismatch(self, declared: str, sniffed: str):
+        key = f"{declared}->{sniffed}"
+        with self._lock:
+            self._mismatches[key] = self._mismatches.get(key, 0) + 1
+
+    def snapshot(self) -> dict:
+        """JSON-ready figures in milliseconds; percentiles cover the last `recent` decodes of each format."""
+        with self._lock:
+            formats = {}
+            for name, entry in self._formats.items():
+                recent = np.array(entry["recent"]) * 1e3
+                formats[name] = {
+                    "count": entry["count"],
+                    "meanMs": round(entry["total"] / entry["count"] * 1e3, 2),
+                    "p50Ms": round(float(np.percentile(recent, 50)), 2),
+                    "p95Ms": round(float(np.percentile(recent, 95)), 2),
+                    "maxMs": round(entry["max"] * 1e3, 2),
+                    "backends": dict(entry["backends"]),
+                }
+            return {"formats": formats, "formatMismatches": dict(self._mismatches)}
+
+
+decode_metrics = DecodeMetrics()
@@ -0,0 +1,66 @@
+"""
+Local-path input for callers running on the API host.
+
+A request may name a file by path (audioPath) instead of sending its bytes:
+no base64, no request body, no temporary file. Paths are accepted only when
+LOCAL_AUDIO_ROOT is set, and only if they resolve (symlinks and ".."
+included) to a regular file inside that directory; relative paths are
+taken from it.
+
+WAV files are memory-mapped and decoded straight from the mapping:
+libsndfile reads the sample pages in place, so nothing is copied before the
+int16 / float conversion. Other formats are decoded from the path, and so
+is everything when the decoder pool is on (a path is all a worker needs).
+The offline tools read the dataset the same way (app.audio.batch).
+"""
+import mmap
+import os
+from contextlib import contextmanager
+
+from app.audio.formats import read_head, sniff_format
+from app.core.config import settings
+
+
+def resolve_local_path(path: str, root: str = None) -> str:
+    """
+    Absolute path of `path` inside root (default: settings.LOCAL_AUDIO_ROOT).
+    Raises PermissionError when local paths are disabled or the path leaves
+    the root, FileNotFoundError when it is not a regular file.
+    """
+    root = settings.LOCAL_AUDIO_ROOT if root is None else root
+    if not root:
+        raise PermissionError("Local audio paths are disabled on this server (LOCAL_AUDIO_ROOT is not set)")
+    root = os.path.realpath(root)
+    full_path = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, full_path]) != root:
+        raise PermissionError(f"'{path}' is outside the allowed audio directory")
+    if not os.path.isfile(full_path):
+        raise FileNotFoundError(f"No audio file at '{path}'")
+    return full_path
+
+
+@contextmanager
+def mapped_audio(path: str):
+    """
+    Decoder source for a local file: a read-only memory map of a WAV file
+    (as a memoryview, valid inside the block), the path for anything else.
+    """
+    if settings.DECODER_WORKERS > 0 or sniff_format(read_head(path)) != "wav":
+        yield path
+        return
+    with open(path, "rb") as f:
+        try:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty file: nothing to map, let the decoder report it
+            yield path
+            return
+    view = memoryview(mapping)
+    try:
+        yield view
+    finally:
+        view.release()
+        try:
+            mapping.close()
+        except BufferError:
+            pass  # a reader still holds the pages (e.g. an exception traceback); unmapped once it is freed
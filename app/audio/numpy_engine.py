@@ -0,0 +1,250 @@
+"""
+NumPy/SciPy feature engine (FEATURE_ENGINE=numpy).
+
+Implements the spectral and frame features without librosa on the request
+path: the analysis window, mel, DCT, contrast band and tonnetz matrices are
+built once at import for the fixed 22050 Hz / n_fft 2048 configuration, and
+chroma filterbanks once per tuning offset (librosa quantises tuning to 0.01
+bins, so there are at most 100 of them). Each feature then reduces to a
+framing view, an FFT and a few matrix products.
+
+The formulas follow librosa 0.10 (the reference engine) step by step, so the
+vector matches it to float32 round-off. Only the HPSS tonnetz (CQT chroma) and
+the legacy piptrack pitch engine are still delegated to librosa.
+"""
+from functools import cached_property, lru_cache
+
+import numpy as np
+import scipy.fft
+import scipy.ndimage
+import scipy.signal
+
+from app.audio.contrast import AMIN, CONTRAST_BAND_BINS, band_quantile_means, power_to_db
+from app.audio.core_features import FeatureContext
+from app.audio.fft_backend import fft_workers
+from app.audio.pitch import voice_band_peaks, tuning_from_peaks
+from app.audio.spectrogram import Spectrogram, N_FFT, HOP_LENGTH, N_MELS
+from app.audio.tonnetz import HARMONIC_KERNEL
+
+SR = 22050
+N_MFCC = 13
+N_CHROMA = 12
+ROLL_PERCENT = 0.85
+
+
+def _hz_to_mel(frequencies):
+    """Slaney mel scale: linear below 1 kHz, logarithmic above."""
+    frequencies = np.asanyarray(frequencies, dtype=np.float64)
+    f_sp = 200.0 / 3
+    min_log_hz = 1000.0
+    min_log_mel = min_log_hz / f_sp
+    logstep = np.log(6.4) / 27.0
+    return np.where(frequencies >= min_log_hz,
+                    min_log_mel + np.log(np.maximum(frequencies, min_log_hz) / min_log_hz) / logstep,
+                    frequencies / f_sp)
+
+
+def _mel_to_hz(mels):
+    mels = np.asanyarray(mels, dtype=np.float64)
+    f_sp = 200.0 / 3
+    min_log_hz = 1000.0
+    min_log_mel = min_log_hz / f_sp
+    logstep = np.log(6.4) / 27.0
+    return np.where(mels >= min_log_mel, min_log_hz * np.exp(logstep * (mels - min_log_mel)), f_sp * mels)
+
+
+def _hz_to_octs(frequencies, tuning: float = 0.0, bins_per_octave: int = N_CHROMA):
+    a440 = 440.0 * 2.0 ** (tuning / bins_per_octave)
+    return np.log2(np.asanyarray(frequencies) / (a440 / 16))
+
+
+def mel_filterbank(sr: int = SR, n_fft: int = N_FFT, n_mels: int = N_MELS) -> np.ndarray:
+    """Slaney-normalised mel filterbank (librosa.filters.mel defaults), (n_mels, 1 + n_fft // 2)."""
+    fft_freqs = np.fft.rfftfreq(n_fft, 1.0 / sr)
+    mel_f = _mel_to_hz(np.linspace(_hz_to_mel(0.0), _hz_to_mel(sr / 2.0), n_mels + 2))
+    fdiff = np.diff(mel_f)
+    ramps = np.subtract.outer(mel_f, fft_freqs)
+    lower = -ramps[:-2] / fdiff[:-1, np.newaxis]
+    upper = ramps[2:] / fdiff[1:, np.newaxis]
+    weights = np.maximum(0, np.minimum(lower, upper))
+    weights *= (2.0 / (mel_f[2:] - mel_f[:-2]))[:, np.newaxis]
+    return weights.astype(np.float32)
+
+
+def dct_matrix(n_out: int = N_MFCC, n_in: int = N_MELS) -> np.ndarray:
+    """First n_out rows of the orthonormal DCT-II (scipy.fft.dct(norm="ortho"))."""
+    k = np.arange(n_out)[:, np.newaxis]
+    n = np.arange(n_in)[np.newaxis, :]
+    basis = np.cos(np.pi * k * (2 * n + 1) / (2 * n_in)) * np.sqrt(2.0 / n_in)
+    basis[0] /= np.sqrt(2.0)
+    return basis.astype(np.float32)
+
+
+@lru_cache(maxsize=None)
+def chroma_filterbank(tuning: float, sr: int = SR, n_fft: int = N_FFT) -> np.ndarray:
+    """librosa.filters.chroma (ctroct 5, octwidth 2, base C) for one tuning offset."""
+    frequencies = np.linspace(0, sr, n_fft, endpoint=False)[1:]
+    frqbins = N_CHROMA * _hz_to_octs(frequencies, tuning=tuning)
+    frqbins = np.concatenate(([frqbins[0] - 1.5 * N_CHROMA], frqbins))
+    binwidthbins = np.concatenate((np.maximum(frqbins[1:] - frqbins[:-1], 1.0), [1]))
+
+    D = np.subtract.outer(frqbins, np.arange(0, N_CHROMA, dtype="d")).T
+    n_chroma2 = np.round(float(N_CHROMA) / 2)
+    D = np.remainder(D + n_chroma2 + 10 * N_CHROMA, N_CHROMA) - n_chroma2
+    wts = np.exp(-0.5 * (2 * D / binwidthbins) ** 2)
+    wts /= np.sqrt(np.sum(wts ** 2, axis=0, keepdims=True))
+    wts *= np.exp(-0.5 * (((frqbins / N_CHROMA - 5.0) / 2) ** 2))
+    wts = np.roll(wts, -3, axis=0)
+    return np.ascontiguousarray(wts[:, :1 + n_fft // 2], dtype=np.float32)
+
+
+def tonnetz_projection() -> np.ndarray:
+    """(6, 12) tonal centroid basis: fifths, minor and major thirds."""
+    dim_map = np.linspace(0, 12, num=N_CHROMA, endpoint=False)
+    scale = np.asarray([7.0 / 6, 7.0 / 6, 3.0 / 2, 3.0 / 2, 2.0 / 3, 2.0 / 3])
+    V = np.multiply.outer(scale, dim_map)
+    V[::2] -= 0.5
+    R = np.array([1, 1, 1, 1, 0.5, 0.5])
+    return R[:, np.newaxis] * np.cos(np.pi * V)
+
+
+# Built once for the fixed serving configuration
+WINDOW = scipy.signal.get_window("hann", N_FFT, fftbins=True)
+FFT_FREQS = np.fft.rfftfreq(N_FFT, 1.0 / SR).astype(np.float32)
+MEL_BASIS = mel_filterbank()
+DCT_BASIS = dct_matrix()
+TONNETZ_PHI = tonnetz_projection()
+
+
+def frame_signal(y: np.ndarray, pad_mode: str = "constant", center: bool = True) -> np.ndarray:
+    """
+    (..., N_FFT, n_frames) strided view of the frames along the last axis;
+    centred frames get n_fft // 2 padding each side.
+    """
+    if center:
+        y = np.pad(y, [(0, 0)] * (y.ndim - 1) + [(N_FFT // 2, N_FFT // 2)], mode=pad_mode)
+    return np.swapaxes(np.lib.stride_tricks.sliding_window_view(y, N_FFT, axis=-1)[..., ::HOP_LENGTH, :], -1, -2)
+
+
+def _safe_length(length: np.ndarray) -> np.ndarray:
+    """Column norms with (near-)zero columns left unscaled, as librosa.util.normalize."""
+    return np.where(length < np.finfo(np.float32).tiny, 1.0, length).astype(length.dtype)
+
+
+def estimate_tuning(power: np.ndarray, sr: int = SR) -> float:
+    """librosa.estimate_tuning on a power spectrogram: histogram peak of the peak-pitch deviations."""
+    return tuning_from_peaks(*voice_band_peaks(power, sr))
+
+
+class NumpySpectrogram(Spectrogram):
+    """Spectrogram with the STFT, mel projection and dB scaling done in NumPy/SciPy."""
+
+    @cached_property
+    def stft(self) -> np.ndarray:
+        # Windowing and FFT in double precision like librosa (float64 window,
+        # numpy.fft): single precision shifts the near-silent bins that the
+        # spectral contrast valleys sit on. Frames run along the last axis so
+        # the (freq, frames) result is a Fortran-ordered view, the layout
+        # librosa's column reductions assume.
+        frames = frame_signal(self.y, center=self.center).T * WINDOW
+        return scipy.fft.rfft(frames, axis=-1, workers=fft_workers()).astype(np.complex64).T
+
+    @classmethod
+    def stacked_stft(cls, y: np.ndarray) -> np.ndarray:
+        frames = np.swapaxes(frame_signal(y), -1, -2) * WINDOW
+        return np.swapaxes(scipy.fft.rfft(frames, axis=-1, workers=fft_workers()).astype(np.complex64), -1, -2)
+
+    @cached_property
+    def mel(self) -> np.ndarray:
+        return MEL_BASIS @ self.power
+
+    @cached_property
+    def mel_db(self) -> np.ndarray:
+        return power_to_db(self.mel)
+
+
+class NumpyFeatureContext(FeatureContext):
+    """
+    FeatureContext whose intermediates are computed by this module. Always
+    uses a shared NumpySpectrogram; pitch (voiceband), the fused time-domain
+    kernel (ZCR, RMS, silence ratio) and the registry layout are inherited
+    unchanged.
+    """
+
+    spectrogram_class = NumpySpectrogram
+
+    def __init__(self, y: np.ndarray, sr: int, shared_spectrogram: bool = None,
+                 pitch_engine: str = None, tonnetz_mode: str = None, spec: Spectrogram = None,
+                 tuning: float = None):
+        if sr != SR:
+            raise ValueError(f"The numpy feature engine is configured for {SR} Hz, got {sr} Hz")
+        super().__init__(y, sr, pitch_engine=pitch_engine, tonnetz_mode=tonnetz_mode,
+                         spec=spec if spec is not None else NumpySpectrogram(y, sr), tuning=tuning)
+
+    @cached_property
+    def mfcc(self):
+        return DCT_BASIS @ self.spec.mel_db
+
+    @cached_property
+    def delta_mfcc(self):
+        return scipy.signal.savgol_filter(self.mfcc, 9, polyorder=1, deriv=1, axis=-1, mode="interp")
+
+    @cached_property
+    def _magnitude_norm(self):
+        # Per-frame L1 norm of the magnitude spectrum (centroid / bandwidth weights)
+        return _safe_length(self.spec.magnitude.sum(axis=0, keepdims=True))
+
+    @cached_property
+    def centroid(self):
+        return (FFT_FREQS @ self.spec.magnitude)[np.newaxis, :] / self._magnitude_norm
+
+    @cached_property
+    def rolloff(self):
+        total_energy = np.cumsum(self.spec.magnitude, axis=0)
+        first_bin = np.argmax(total_energy >= ROLL_PERCENT * total_energy[-1], axis=0)
+        return FFT_FREQS[first_bin][np.newaxis, :]
+
+    @cached_property
+    def flatness(self):
+        S_thresh = np.maximum(AMIN, self.spec.power)
+        gmean = np.exp(np.mean(np.log(S_thresh), axis=0, keepdims=True))
+        return gmean / np.mean(S_thresh, axis=0, keepdims=True)
+
+    @cached_property
+    def bandwidth(self):
+        deviation = (FFT_FREQS[:, np.newaxis] - self.centroid) ** 2
+        spread = np.einsum("ft,ft->t", self.spec.magnitude, deviation)[np.newaxis, :]
+        return np.sqrt(spread / self._magnitude_norm)
+
+    @cached_property
+    def contrast(self):
+        magnitude = self.spec.magnitude
+        valley = np.zeros((len(CONTRAST_BAND_BINS), magnitude.shape[1]))
+        peak = np.zeros_like(valley)
+        for k, (start, stop, n_quantile) in enumerate(CONTRAST_BAND_BINS):
+            valley[k], peak[k] = band_quantile_means(magnitude[start:stop], n_quantile)
+        return power_to_db(peak) - power_to_db(valley)
+
+    @cached_property
+    def chroma(self):
+        power = self.spec.power
+        tuning = estimate_tuning(power, self.sr) if self.tuning is None else self.tuning
+        raw_chroma = chroma_filterbank(tuning) @ power
+        return raw_chroma / _safe_length(np.max(np.abs(raw_chroma), axis=0, keepdims=True))
+
+    @cached_property
+    def onset_env(self):
+        mel_db = self.spec.mel_db
+        flux = np.mean(np.maximum(0.0, mel_db[:, 1:] - mel_db[:, :-1]), axis=0)
+        # Lag 1 plus librosa's centring shift of n_fft // (2 * hop) frames
+        lead = 1 + N_FFT // (2 * HOP_LENGTH)
+        return np.concatenate([np.zeros(lead, dtype=flux.dtype), flux])[:mel_db.shape[1]]
+
+    @cached_property
+    def tonnetz(self):
+        if self.tonnetz_mode != "fast":
+            # HPSS + CQT chroma stay on the librosa reference implementation
+            return super().tonnetz
+        harmonic_chroma = scipy.ndimage.median_filter(self.chroma, size=(1, HARMONIC_KERNEL), mode="reflect")
+        return TONNETZ_PHI @ (harmonic_chroma / _safe_length(np.sum(np.abs(harmonic_chroma), axis=0,
+                                                                    keepdims=True)))
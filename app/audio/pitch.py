@@ -0,0 +1,132 @@
+import numpy as np
+
+from app.audio.spectrogram import N_FFT
+
+# piptrack defaults: peaks are searched between 150 Hz and 4 kHz, in bins
+# louder than 10% of the frame's maximum magnitude
+PITCH_FMIN = 150.0
+PITCH_FMAX = 4000.0
+PITCH_THRESHOLD = 0.1
+# librosa.estimate_tuning resolution (fractions of a chroma bin)
+TUNING_RESOLUTION = 0.01
+TUNING_BINS = np.linspace(-0.5, 0.5, int(np.ceil(1.0 / TUNING_RESOLUTION)) + 1)
+N_CHROMA = 12
+
+
+def voice_band_peaks(magnitude: np.ndarray, sr: int, n_fft: int = N_FFT,
+                     fmin: float = PITCH_FMIN, fmax: float = PITCH_FMAX,
+                     threshold: float = PITCH_THRESHOLD, return_frames: bool = False):
+    """
+    Vectorized spectral peak picking over every frame of a magnitude
+    spectrogram, restricted to the [fmin, fmax) voice band.
+
+    Reproduces librosa.piptrack exactly (same local-maximum rule, parabolic
+    interpolation and magnitude correction) but only touches the band bins
+    plus a one-bin halo. Typically under 2% of the band cells are peaks, so
+    the interpolation is evaluated at the peak positions only and the result
+    is sparse.
+
+    Returns (pitches, mags): 1-D arrays with one entry per peak, in the
+    row-major (bin, frame) order of piptrack's matrices, i.e. what
+    piptrack_pitches[nonzero] would give for the band rows. With
+    return_frames the frame index of each peak is returned as a third array.
+    """
+    freqs = np.fft.rfftfreq(n_fft, 1.0 / sr)
+    band = np.flatnonzero((fmin <= freqs) & (freqs < min(fmax, sr / 2)))
+    # Bin 0 is never a local maximum and the Nyquist bin is outside the band,
+    # so the halo always exists
+    lo = max(int(band[0]), 1)
+    hi = min(int(band[-1]) + 1, magnitude.shape[0] - 1)
+
+    S = magnitude[lo - 1:hi + 1]
+    ref_value = threshold * np.max(magnitude, axis=0)
+    S_thresh = S * (S > ref_value)
+    centre = S_thresh[1:-1]
+    rows, cols = np.nonzero((centre > S_thresh[:-2]) & (centre >= S_thresh[2:]))
+
+    # Parabolic interpolation around each peak (piptrack's _pi_stencil)
+    below, peak, above = S[rows, cols], S[rows + 1, cols], S[rows + 2, cols]
+    a = above + below - 2 * peak
+    b = (above - below) / 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shift = np.where(np.abs(b) < np.abs(a), -b / a, 0).astype(S.dtype)
+    dskew = 0.5 * b * shift
+
+    bins = (rows + lo).astype(np.float64)
+    pitches = ((bins + shift) * float(sr) / n_fft).astype(S.dtype)
+    mags = peak + dskew
+    if return_frames:
+        return pitches, mags, cols
+    return pitches, mags
+
+
+def _median_with_zeros(values: np.ndarray, n_total: int) -> float:
+    """Median of `values` padded with zeros up to `n_total` elements, without materializing the padding."""
+    s = np.sort(values)
+    neg = s[s < 0]
+    pos = s[s > 0]
+    n_zero = n_total - len(neg) - len(pos)
+
+    def ranked(r):
+        if r < len(neg):
+            return neg[r]
+        r -= len(neg)
+        if r < n_zero:
+            return s.dtype.type(0)
+        return pos[r - n_zero]
+
+    return (ranked((n_total - 1) // 2) + ranked(n_total // 2)) / 2
+
+
+def pitch_statistics(magnitude: np.ndarray, sr: int, n_fft: int = N_FFT):
+    """
+    Pitch mean and std (feature indices 78/79) from a magnitude spectrogram.
+
+    Same statistic as the piptrack path in extract_features(): peak
+    frequencies whose corrected magnitude exceeds the median of the full
+    piptrack magnitude matrix (zeros included). Peaks are sparse, so that
+    median is taken from the band peaks plus a count of implicit zeros.
+    """
+    pitches, mags = voice_band_peaks(magnitude, sr, n_fft=n_fft)
+    return peak_pitch_statistics(pitches, mags, magnitude.size)
+
+
+def peak_pitch_statistics(pitches: np.ndarray, mags: np.ndarray, n_total: int):
+    """
+    pitch_statistics() from voice_band_peaks() output; n_total is the size of
+    the magnitude matrix the peaks were picked from (or the summed size, for
+    the concatenated peaks of several segments).
+    """
+    median = _median_with_zeros(mags[mags != 0], n_total)
+
+    pitch_values = pitches[mags > median]
+    pitch_values = pitch_values[pitch_values > 0]
+
+    if len(pitch_values) == 0:
+        return 0, 0
+    return np.mean(pitch_values), np.std(pitch_values)
+
+
+def voiced_peaks(magnitude: np.ndarray, sr: int, n_fft: int = N_FFT):
+    """
+    (pitch_values, frames): the peaks pitch_statistics() averages, i.e. those
+    above the median of the whole piptrack magnitude matrix, with the frame
+    each one was picked in. Used to take the same statistic over frame ranges.
+    """
+    pitches, mags, frames = voice_band_peaks(magnitude, sr, n_fft=n_fft, return_frames=True)
+    median = _median_with_zeros(mags[mags != 0], magnitude.size)
+    voiced = (mags > median) & (pitches > 0)
+    return pitches[voiced], frames[voiced]
+
+
+def tuning_from_peaks(pitches: np.ndarray, mags: np.ndarray) -> float:
+    """librosa.estimate_tuning() from the voice_band_peaks() of a power spectrogram (or of its segments, concatenated)."""
+    pitch_mask = pitches > 0
+    threshold = np.median(mags[pitch_mask]) if pitch_mask.any() else 0.0
+    frequencies = pitches[(mags >= threshold) & pitch_mask]
+    if not np.any(frequencies):
+        return 0.0
+    residual = np.mod(N_CHROMA * np.log2(frequencies / (440.0 / 16)), 1.0)
+    residual[residual >= 0.5] -= 1.0
+    counts, edges = np.histogram(residual, TUNING_BINS)
+    return float(edges[np.argmax(counts)])
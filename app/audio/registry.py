@@ -0,0 +1,130 @@
+"""
+Declarative layout of the 92-element feature vector.
+
+Each FeatureGroup is defined once here: its name, the names of its columns
+(which fix its width), the intermediate arrays it reads from the extraction
+context, and how it reduces them to values. Slices and per-feature indices
+are derived from the order of FEATURE_GROUPS, so the extractor, the model
+metadata and the explanation code all share one source of truth.
+"""
+from dataclasses import dataclass
+from typing import Callable, Iterable
+import numpy as np
+
+
+@dataclass(frozen=True)
+class FeatureGroup:
+    name: str
+    columns: tuple
+    # Context intermediates this group reads (computed lazily on first access)
+    requires: tuple
+    compute: Callable
+
+    @property
+    def width(self) -> int:
+        return len(self.columns)
+
+
+def _mean_std(name):
+    return lambda ctx: np.hstack([np.mean(getattr(ctx, name), axis=1), np.std(getattr(ctx, name), axis=1)])
+
+
+def _scalar_mean_std(name):
+    return lambda ctx: [np.mean(getattr(ctx, name)), np.std(getattr(ctx, name))]
+
+
+def _mean_var(name):
+    return lambda ctx: [np.mean(getattr(ctx, name)), np.var(getattr(ctx, name))]
+
+
+def _numbered(prefix, n):
+    return tuple(f"{prefix}_{i}" for i in range(n))
+
+
+FEATURE_GROUPS = (
+    # 1. MFCCs (Mean + Std) - 13 coefficients
+    FeatureGroup("mfcc", _numbered("mfcc_mean", 13) + _numbered("mfcc_std", 13),
+                 ("mfcc",), _mean_std("mfcc")),
+    # 2. Delta MFCCs (1st order) - temporal dynamics
+    FeatureGroup("delta_mfcc", _numbered("delta_mfcc_mean", 13) + _numbered("delta_mfcc_std", 13),
+                 ("delta_mfcc",), _mean_std("delta_mfcc")),
+    # 3-6. Spectral shape
+    FeatureGroup("spectral_centroid", ("centroid_mean", "centroid_std"),
+                 ("centroid",), _scalar_mean_std("centroid")),
+    FeatureGroup("spectral_rolloff", ("rolloff_mean", "rolloff_std"),
+                 ("rolloff",), _scalar_mean_std("rolloff")),
+    FeatureGroup("spectral_flatness", ("flatness_mean",),
+                 ("flatness",), lambda ctx: [np.mean(ctx.flatness)]),
+    FeatureGroup("spectral_bandwidth", ("bandwidth_mean", "bandwidth_std"),
+                 ("bandwidth",), _scalar_mean_std("bandwidth")),
+    # 7. Spectral Contrast (7 bands)
+    FeatureGroup("spectral_contrast", _numbered("contrast_mean", 7),
+                 ("contrast",), lambda ctx: np.mean(ctx.contrast, axis=1)),
+    # 8. Chroma STFT (12 bins)
+    FeatureGroup("chroma", _numbered("chroma_mean", 12),
+                 ("chroma",), lambda ctx: np.mean(ctx.chroma, axis=1)),
+    # 9. Pitch (F0) Analysis
+    FeatureGroup("pitch", ("pitch_mean", "pitch_std"),
+                 ("pitch",), lambda ctx: ctx.pitch),
+    # 10. Zero Crossing Rate (Jitter proxy)
+    FeatureGroup("zcr", ("zcr_mean", "zcr_var"),
+                 ("zcr",), _mean_var("zcr")),
+    # 11. RMSE (Energy/Amplitude - Shimmer proxy)
+    FeatureGroup("rmse", ("rmse_mean", "rmse_var"),
+                 ("rmse",), _mean_var("rmse")),
+    # 12. Silence Ratio
+    FeatureGroup("silence_ratio", ("silence_ratio",),
+                 ("rmse",), lambda ctx: [ctx.silence_ratio]),
+    # 13. Spectral Smoothness
+    FeatureGroup("spectral_smoothness", ("spectral_smoothness",),
+                 ("onset_env",), lambda ctx: [np.mean(np.diff(ctx.onset_env))]),
+    # 14. Tonnetz (tonal centroid features) - 6 dimensions
+    FeatureGroup("tonnetz", _numbered("tonnetz_mean", 6),
+                 ("tonnetz",), lambda ctx: ctx.tonnetz_mean),
+)
+
+GROUPS_BY_NAME = {group.name: group for group in FEATURE_GROUPS}
+
+
+def _layout():
+    slices, index, owner = {}, {}, {}
+    offset = 0
+    for group in FEATURE_GROUPS:
+        slices[group.name] = slice(offset, offset + group.width)
+        for i, column in enumerate(group.columns):
+            index[column] = offset + i
+            owner[column] = group.name
+        offset += group.width
+    return slices, index, owner, offset
+
+
+GROUP_SLICES, FEATURE_INDEX, FEATURE_GROUP_OF, N_FEATURES = _layout()
+
+FEATURE_NAMES = tuple(column for group in FEATURE_GROUPS for column in group.columns)
+
+
+def feature_index(name: str) -> int:
+    """Position of a named feature (e.g. "pitch_std") in the feature vector."""
+    return FEATURE_INDEX[name]
+
+
+def groups_for(feature_names: Iterable[str]) -> set:
+    """Names of the groups that produce the given features."""
+    return {FEATURE_GROUP_OF[name] for name in feature_names}
+
+
+def mask_groups(features: np.ndarray, group_names: Iterable[str]) -> np.ndarray:
+    """Copy of a feature vector (or matrix of rows) with the groups outside group_names zeroed."""
+    masked = np.zeros_like(features)
+    for name in group_names:
+        masked[..., GROUP_SLICES[name]] = features[..., GROUP_SLICES[name]]
+    return masked
+
+
+def validate_groups(group_names: Iterable[str]) -> list:
+    """Returns the group names in vector order; raises ValueError on unknown names."""
+    group_names = set(group_names)
+    unknown = group_names - GROUPS_BY_NAME.keys()
+    if unknown:
+        raise ValueError(f"Unknown feature groups: {sorted(unknown)}")
+    return [group.name for group in FEATURE_GROUPS if group.name in group_names]
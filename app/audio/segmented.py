@@ -0,0 +1,191 @@
+"""
+Segmented extraction: one long clip split across a thread pool.
+
+The clip's STFT frames are divided into contiguous ranges. Each segment is
+cut from the zero-padded signal together with the n_fft - hop samples its
+frames share with the neighbouring segments, so an un-centred STFT of the
+segment reproduces the whole-clip frames of its range. NumPy, scipy.fft and
+BLAS release the GIL, so segments run concurrently on separate cores; the
+pool is shared by all requests and sized to the FFT thread budget
+(app.audio.fft_backend), and FFTs inside a segment stay single-threaded.
+This holds with either FFT backend: numpy.fft releases the GIL as well.
+
+Frame-local features (centroid, rolloff, flatness, bandwidth, chroma) are
+folded into per-segment RunningStats and merged. The whole-clip quantities
+are formed once from the merged pieces, so the result matches
+extract_features() on the whole clip to float round-off:
+  - the spectral contrast band peaks / valleys are concatenated before the
+    dB conversion, whose 80 dB floor follows the clip's loudest band;
+  - the mel power is concatenated: the log-mel 80 dB floor, MFCCs, deltas and
+    spectral smoothness are computed exactly as for the whole clip;
+  - the voice-band peaks are concatenated for the pitch median and for the
+    chroma tuning, which a second parallel pass then applies per segment;
+  - ZCR / RMS / silence ratio use the fused time-domain kernel on the clip;
+  - the fast tonnetz median-filters the concatenated chroma, and the HPSS
+    tonnetz runs on the whole clip as one more pool task.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from app.audio.core_features import context_class, assemble_features
+from app.audio.contrast import band_quantile_means, contrast_bands, power_to_db
+from app.audio.fft_backend import fft_budget, fft_thread_limit, thread_share
+from app.audio.pitch import voice_band_peaks, peak_pitch_statistics, tuning_from_peaks
+from app.audio.registry import GROUP_SLICES
+from app.audio.spectrogram import N_FFT, HOP_LENGTH
+from app.audio.stats import RunningStats
+from app.core.config import settings
+
+# Registry group -> FeatureContext property of the frame-local features merged from segment stats
+FRAME_LOCAL = {
+    "spectral_centroid": "centroid",
+    "spectral_rolloff": "rolloff",
+    "spectral_flatness": "flatness",
+    "spectral_bandwidth": "bandwidth",
+    "chroma": "chroma",
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+_warned = set()
+
+
+def _warn_once(message: str):
+    if message not in _warned:
+        _warned.add(message)
+        print(f"WARNING: {message}")
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=fft_budget(), thread_name_prefix="segment")
+        return _pool
+
+
+def segment_frames(n_frames: int, n_segments: int) -> list:
+    """Splits frame indices 0..n_frames into n_segments contiguous [start, stop) ranges."""
+    edges = np.linspace(0, n_frames, n_segments + 1).astype(int)
+    return [(int(start), int(stop)) for start, stop in zip(edges[:-1], edges[1:])]
+
+
+def _cut(y: np.ndarray, start_frame: int, stop_frame: int) -> np.ndarray:
+    """Samples of whole-clip frames [start_frame, stop_frame), zero-padded like center=True framing."""
+    start = start_frame * HOP_LENGTH - N_FFT // 2
+    stop = (stop_frame - 1) * HOP_LENGTH + N_FFT // 2
+    segment = np.zeros(stop - start, dtype=y.dtype)
+    lo, hi = max(start, 0), min(stop, len(y))
+    segment[lo - start:hi - start] = y[lo:hi]
+    return segment
+
+
+class _Segment:
+    """One segment's context between the two parallel passes."""
+
+    def __init__(self, context, y: np.ndarray, sr: int, frames: tuple, groups: set, with_chroma: bool):
+        self.frames = frames
+        self.groups = groups
+        self.with_chroma = with_chroma
+        samples = _cut(y, *frames)
+        self.ctx = context(samples, sr, spec=context.spectrogram_class(samples, sr, center=False))
+        self.stats = {}
+
+    def analyse(self):
+        """First pass: spectrogram, mel power, peaks and the tuning-independent frame stats."""
+        with fft_thread_limit(1):
+            spec = self.ctx.spec
+            self.mel = spec.mel
+            self.pitch_peaks = voice_band_peaks(spec.magnitude, self.ctx.sr)
+            self.n_cells = spec.magnitude.size
+            self.tuning_peaks = voice_band_peaks(spec.power, self.ctx.sr) if self.with_chroma else None
+            if "spectral_contrast" in self.groups:
+                bands = [band_quantile_means(spec.magnitude[start:stop], n_quantile)
+                         for start, stop, n_quantile in contrast_bands(self.ctx.sr)]
+                self.valley = np.array([valley for valley, _ in bands])
+                self.peak = np.array([peak for _, peak in bands])
+            for group, name in FRAME_LOCAL.items():
+                if group in self.groups and name != "chroma":
+                    values = getattr(self.ctx, name)
+                    self.stats[group] = RunningStats(values.shape[0]).update(values)
+        return self
+
+    def chroma(self, tuning: float):
+        """Second pass: chroma with the clip's tuning; releases the spectrogram."""
+        self.ctx.tuning = tuning
+        chroma = self.ctx.chroma
+        self.stats["chroma"] = RunningStats(chroma.shape[0]).update(chroma)
+        self.ctx = None
+        return chroma
+
+
+def _hpss_tonnetz(context, y: np.ndarray, sr: int) -> np.ndarray:
+    with fft_thread_limit(1):
+        return context(y, sr, tonnetz_mode="hpss").tonnetz_mean
+
+
+def extract_features_segmented(y: np.ndarray, sr: int, workers: int = None, engine: str = None,
+                               pitch_engine: str = None, tonnetz_mode: str = None, groups=None) -> np.ndarray:
+    """
+    Feature vector of a decoded clip, computed over up to `workers` segments
+    (default: this request's share of the thread budget, whatever the FFT
+    backend) of at least settings.SEGMENT_SECONDS each. Clips too short to
+    split take the whole-clip path. Segments always pick pitch from the
+    voiceband peaks: pitch_engine="piptrack" gives the same values but is
+    not run, which is logged once.
+    """
+    context = context_class(engine)
+    tonnetz_mode = tonnetz_mode or settings.TONNETZ_MODE
+    if (pitch_engine or settings.PITCH_ENGINE) == "piptrack":
+        _warn_once("segmented extraction computes pitch from the voiceband peaks; "
+                   "pitch_engine 'piptrack' only applies to clips too short to split")
+    workers = workers or thread_share()
+    n_segments = min(workers, int(len(y) / sr // max(settings.SEGMENT_SECONDS, 1e-3)))
+    if n_segments < 2:
+        ctx = context(y, sr, pitch_engine=pitch_engine, tonnetz_mode=tonnetz_mode)
+        return assemble_features(ctx, groups)
+
+    wanted = set(GROUP_SLICES) if groups is None else set(groups)
+    pool = _executor()
+    hpss = None
+    if "tonnetz" in wanted and tonnetz_mode == "hpss":
+        hpss = pool.submit(_hpss_tonnetz, context, y, sr)
+    with_chroma = "chroma" in wanted or ("tonnetz" in wanted and tonnetz_mode == "fast")
+
+    n_frames = 1 + len(y) // HOP_LENGTH
+    segments = [_Segment(context, y, sr, frames, wanted, with_chroma)
+                for frames in segment_frames(n_frames, n_segments)]
+    segments = [future.result() for future in [pool.submit(segment.analyse) for segment in segments]]
+
+    # Whole-clip context fed with the merged pieces; the remaining groups read from it
+    spec = context.spectrogram_class.from_arrays(y, sr, mel=np.concatenate([s.mel for s in segments], axis=1))
+    ctx = context(y, sr, tonnetz_mode=tonnetz_mode, spec=spec)
+    ctx.pitch = peak_pitch_statistics(np.concatenate([s.pitch_peaks[0] for s in segments]),
+                                      np.concatenate([s.pitch_peaks[1] for s in segments]),
+                                      sum(s.n_cells for s in segments))
+    if with_chroma:
+        tuning = tuning_from_peaks(np.concatenate([s.tuning_peaks[0] for s in segments]),
+                                   np.concatenate([s.tuning_peaks[1] for s in segments]))
+        chroma = [future.result() for future in [pool.submit(s.chroma, tuning) for s in segments]]
+        ctx.chroma = np.concatenate(chroma, axis=1)
+    if hpss is not None:
+        ctx.tonnetz_mean = hpss.result()
+
+    if "spectral_contrast" in wanted:
+        ctx.contrast = (power_to_db(np.concatenate([s.peak for s in segments], axis=1))
+                        - power_to_db(np.concatenate([s.valley for s in segments], axis=1)))
+
+    features = assemble_features(ctx, wanted - FRAME_LOCAL.keys())
+    for group in FRAME_LOCAL:
+        if group not in wanted:
+            continue
+        merged = RunningStats(segments[0].stats[group].mean.shape[0])
+        for segment in segments:
+            merged.merge(segment.stats[group])
+        if group in ("spectral_flatness", "chroma"):
+            features[GROUP_SLICES[group]] = merged.mean
+        else:
+            features[GROUP_SLICES[group]] = [merged.mean[0], merged.std[0]]
+    return features
@@ -0,0 +1,73 @@
+from functools import cached_property
+
+import librosa
+import numpy as np
+
+# STFT parameters shared by every spectral feature (librosa defaults)
+N_FFT = 2048
+HOP_LENGTH = 512
+N_MELS = 128
+
+
+class Spectrogram:
+    """
+    Computes the complex STFT of a signal once and derives the magnitude,
+    power and mel representations from it on first use.
+
+    Every librosa feature in extract_features() accepts a precomputed
+    spectrogram through its `S=` argument, so feeding them from one of these
+    objects replaces ~10 independent STFTs per request with a single one.
+    """
+
+    def __init__(self, y: np.ndarray, sr: int, n_fft: int = N_FFT, hop_length: int = HOP_LENGTH,
+                 center: bool = True):
+        self.y = y
+        self.sr = sr
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        # center=False frames y as given (a segment already cut with its padding)
+        self.center = center
+
+    @classmethod
+    def from_arrays(cls, y: np.ndarray, sr: int, **arrays) -> "Spectrogram":
+        """
+        Wraps representations computed elsewhere (e.g. one slice of a batched
+        STFT); keys are property names such as stft, magnitude, power or mel.
+        Anything not given is still derived lazily.
+        """
+        spec = cls(y, sr)
+        for name, value in arrays.items():
+            setattr(spec, name, value)
+        return spec
+
+    @classmethod
+    def stacked_stft(cls, y: np.ndarray) -> np.ndarray:
+        """
+        (clips, freq, frames) STFT of the equal-length rows of `y`, framed
+        like the stft property. Rows are Fortran-ordered views here, so take
+        np.asfortranarray of a row to get the layout the property returns.
+        """
+        return librosa.stft(y, n_fft=N_FFT, hop_length=HOP_LENGTH)
+
+    @cached_property
+    def stft(self) -> np.ndarray:
+        # Complex STFT (center=True, zero padding) - same framing as librosa.feature.*
+        return librosa.stft(self.y, n_fft=self.n_fft, hop_length=self.hop_length, center=self.center)
+
+    @cached_property
+    def magnitude(self) -> np.ndarray:
+        return np.abs(self.stft)
+
+    @cached_property
+    def power(self) -> np.ndarray:
+        return self.magnitude ** 2
+
+    @cached_property
+    def mel(self) -> np.ndarray:
+        # Mel power spectrogram (n_mels=128), as librosa.feature.melspectrogram
+        return librosa.feature.melspectrogram(S=self.power, sr=self.sr, n_mels=N_MELS)
+
+    @cached_property
+    def mel_db(self) -> np.ndarray:
+        # Log-mel spectrogram consumed by both MFCC and onset strength
+        return librosa.power_to_db(self.mel)
@@ -0,0 +1,52 @@
+import numpy as np
+
+
+class RunningStats:
+    """
+    Per-row count / mean / sum of squared deviations over the frames of a
+    (rows, frames) feature matrix, accumulated block by block.
+
+    Two accumulators over disjoint frame ranges merge exactly (Chan et al.'s
+    parallel variance update), so whole-clip means, stds and variances can be
+    built from blocks, segments or windows without keeping the frames.
+    """
+
+    def __init__(self, n_rows: int = 1):
+        self.n = 0
+        self.mean = np.zeros(n_rows)
+        self.m2 = np.zeros(n_rows)
+
+    def update(self, frames: np.ndarray):
+        """Adds the columns of a (rows, frames) matrix (1D input = one row)."""
+        frames = np.asarray(frames, dtype=np.float64)
+        if frames.ndim == 1:
+            frames = frames[np.newaxis, :]
+        if frames.shape[1] == 0:
+            return self
+        block = RunningStats(frames.shape[0])
+        block.n = frames.shape[1]
+        block.mean = frames.mean(axis=1)
+        block.m2 = ((frames - block.mean[:, np.newaxis]) ** 2).sum(axis=1)
+        return self.merge(block)
+
+    def merge(self, other: "RunningStats"):
+        """Folds another accumulator (over different frames) into this one."""
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.n, self.mean, self.m2 = other.n, other.mean.copy(), other.m2.copy()
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * (other.n / n)
+        self.m2 = self.m2 + other.m2 + delta ** 2 * (self.n * other.n / n)
+        self.n = n
+        return self
+
+    @property
+    def var(self) -> np.ndarray:
+        return self.m2 / self.n if self.n else np.zeros_like(self.m2)
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.var)
@@ -0,0 +1,267 @@
+"""
+Streaming feature extraction: reads audio in fixed blocks and folds frame
+features into mergeable running statistics, so peak memory stays roughly
+constant whatever the clip length.
+
+Frames are cut exactly as librosa does with center=True (n_fft // 2 zeros
+before the first and after the last sample), so frame-local features match
+the whole-clip extractor frame for frame. Features that look at neighbouring
+frames (delta MFCC, the harmonic chroma median) keep HALO frames of context
+across block boundaries. Streaming always uses the fast pitch and tonnetz
+paths and cannot run the voice-activity gate (it needs the whole signal);
+options asking otherwise raise ValueError. Two quantities are whole-clip properties and are approximated:
+  - the 80 dB log-mel floor under the MFCCs follows the running peak
+    instead of the clip's final peak;
+  - the chroma tuning offset is estimated on the first block.
+"""
+import numpy as np
+import librosa
+import scipy.fft
+import scipy.ndimage
+import soundfile as sf
+import soxr
+
+from app.audio.spectrogram import N_FFT, HOP_LENGTH, N_MELS
+from app.audio.pitch import voice_band_peaks
+from app.audio.tonnetz import HARMONIC_KERNEL
+from app.audio.time_domain import frame_zcr_rms, rms_silence_ratio
+from app.audio.registry import GROUP_SLICES, N_FEATURES
+from app.audio.stats import RunningStats
+from app.audio.decoder import analysis_windows, load_audio, open_source, STREAM_RESAMPLE_QUALITY, resample_tier
+from app.core.config import settings
+
+TARGET_SR = 22050
+# Context frames kept around block edges: delta MFCC (width 9) needs 4 on
+# each side, the harmonic chroma median HARMONIC_KERNEL // 2
+HALO = max(4, HARMONIC_KERNEL // 2)
+DELTA_WIDTH = 9
+TOP_DB = 80.0
+AMIN = 1e-10
+
+
+class StreamingFeatureExtractor:
+    """
+    Accepts consecutive blocks of a mono signal via push() and returns the
+    92-feature vector from finish(). Only the current block's frames, a few
+    context frames and one RMS value per frame are kept in memory.
+    """
+
+    def __init__(self, sr: int = TARGET_SR):
+        self.sr = sr
+        self.mel_basis = librosa.filters.mel(sr=sr, n_fft=N_FFT, n_mels=N_MELS)
+        self.n_samples = 0
+        self.n_frames = 0
+        self.tuning = None
+        self.db_max = -np.inf
+
+        # Padded sample buffer; the first sample sits at signal index _buffer_start
+        self._buffer = np.zeros(N_FFT // 2, dtype=np.float32)
+        self._buffer_start = -(N_FFT // 2)
+
+        # Frames whose delta / tonnetz still need right-hand context
+        self._mfcc_ctx = np.empty((13, 0), dtype=np.float32)
+        self._chroma_ctx = np.empty((12, 0), dtype=np.float32)
+        self._ctx_halo = 0
+        # Last four raw log-mel frames (spectral smoothness) and the RMS trace (silence ratio)
+        self._mel_tail = np.empty((N_MELS, 0), dtype=np.float32)
+        self._rms = []
+
+        self.stats = {name: RunningStats(n) for name, n in (
+            ("mfcc", 13), ("delta_mfcc", 13), ("centroid", 1), ("rolloff", 1),
+            ("flatness", 1), ("bandwidth", 1), ("contrast", 7), ("chroma", 12),
+            ("pitch", 1), ("zcr", 1), ("rmse", 1), ("tonnetz", 6),
+        )}
+
+    def push(self, samples: np.ndarray):
+        """Feeds the next block of the signal (mono, at self.sr)."""
+        samples = np.asarray(samples, dtype=np.float32)
+        self.n_samples += len(samples)
+        self._buffer = np.concatenate([self._buffer, samples])
+        self._consume(final=False)
+
+    def finish(self) -> np.ndarray:
+        """Flushes the trailing frames and returns the feature vector."""
+        if self.n_samples == 0:
+            raise ValueError("Audio file is empty.")
+        duration_sec = self.n_samples / self.sr
+        if duration_sec < 0.5:
+            raise ValueError(f"Audio too short ({duration_sec:.2f}s). Minimum 0.5 seconds required.")
+
+        self._buffer = np.concatenate([self._buffer, np.zeros(N_FFT // 2, dtype=np.float32)])
+        self._consume(final=True)
+        return self._feature_vector()
+
+    # ------------------------------------------------------------------ frames
+
+    def _consume(self, final: bool):
+        n = 1 + (len(self._buffer) - N_FFT) // HOP_LENGTH if len(self._buffer) >= N_FFT else 0
+        if n > 0:
+            segment = self._buffer[:(n - 1) * HOP_LENGTH + N_FFT]
+            self._process(segment, self._buffer_start)
+            self._buffer = self._buffer[n * HOP_LENGTH:]
+            self._buffer_start += n * HOP_LENGTH
+        self._emit_context(final)
+
+    def _process(self, segment: np.ndarray, start: int):
+        # Time domain: the fused kernel, told which segment samples are padding
+        zcr, rms = frame_zcr_rms(segment, valid_start=max(-start, 0), valid_stop=self.n_samples - start)
+        self.n_frames += len(rms)
+        self._rms.append(rms)
+        self.stats["rmse"].update(rms)
+        self.stats["zcr"].update(zcr)
+
+        # Spectral
+        magnitude = np.abs(librosa.stft(segment, n_fft=N_FFT, hop_length=HOP_LENGTH, center=False))
+        power = magnitude ** 2
+        mel_db_raw = 10.0 * np.log10(np.maximum(AMIN, self.mel_basis @ power))
+        self.db_max = max(self.db_max, float(mel_db_raw.max()))
+        mel_db = np.maximum(mel_db_raw, self.db_max - TOP_DB)
+        self._mel_tail = np.hstack([self._mel_tail, mel_db_raw])[:, -4:]
+
+        mfcc = scipy.fft.dct(mel_db, axis=0, type=2, norm="ortho")[:13]
+        self.stats["mfcc"].update(mfcc)
+        self.stats["centroid"].update(librosa.feature.spectral_centroid(S=magnitude, sr=self.sr))
+        self.stats["rolloff"].update(librosa.feature.spectral_rolloff(S=magnitude, sr=self.sr))
+        self.stats["flatness"].update(librosa.feature.spectral_flatness(S=magnitude))
+        self.stats["bandwidth"].update(librosa.feature.spectral_bandwidth(S=magnitude, sr=self.sr))
+        self.stats["contrast"].update(librosa.feature.spectral_contrast(S=magnitude, sr=self.sr))
+
+        if self.tuning is None:
+            self.tuning = librosa.estimate_tuning(S=power, sr=self.sr, bins_per_octave=12)
+        chroma = librosa.feature.chroma_stft(S=power, sr=self.sr, tuning=self.tuning)
+        self.stats["chroma"].update(chroma)
+
+        pitches, mags = voice_band_peaks(magnitude, self.sr)
+        pitch_values = pitches[mags > 0]
+        self.stats["pitch"].update(pitch_values[pitch_values > 0])
+
+        self._mfcc_ctx = np.hstack([self._mfcc_ctx, mfcc])
+        self._chroma_ctx = np.hstack([self._chroma_ctx, chroma])
+
+    def _emit_context(self, final: bool):
+        """Delta MFCC and tonnetz for frames that now have full context on both sides."""
+        ctx_len = self._mfcc_ctx.shape[1]
+        stop = ctx_len if final else ctx_len - HALO
+        if stop <= self._ctx_halo or ctx_len < DELTA_WIDTH:
+            return
+
+        delta = librosa.feature.delta(self._mfcc_ctx, width=DELTA_WIDTH)
+        self.stats["delta_mfcc"].update(delta[:, self._ctx_halo:stop])
+        harmonic_chroma = scipy.ndimage.median_filter(self._chroma_ctx, size=(1, HARMONIC_KERNEL), mode="reflect")
+        self.stats["tonnetz"].update(librosa.feature.tonnetz(chroma=harmonic_chroma[:, self._ctx_halo:stop]))
+
+        keep = min(HALO, stop)
+        self._mfcc_ctx = self._mfcc_ctx[:, stop - keep:]
+        self._chroma_ctx = self._chroma_ctx[:, stop - keep:]
+        self._ctx_halo = keep
+
+    # ------------------------------------------------------------------ output
+
+    def _feature_vector(self) -> np.ndarray:
+        stats = self.stats
+        features = np.zeros(N_FEATURES)
+
+        def put(group, values):
+            features[GROUP_SLICES[group]] = np.hstack(values)
+
+        put("mfcc", [stats["mfcc"].mean, stats["mfcc"].std])
+        put("delta_mfcc", [stats["delta_mfcc"].mean, stats["delta_mfcc"].std])
+        put("spectral_centroid", [stats["centroid"].mean, stats["centroid"].std])
+        put("spectral_rolloff", [stats["rolloff"].mean, stats["rolloff"].std])
+        put("spectral_flatness", [stats["flatness"].mean])
+        put("spectral_bandwidth", [stats["bandwidth"].mean, stats["bandwidth"].std])
+        put("spectral_contrast", [stats["contrast"].mean])
+        put("chroma", [stats["chroma"].mean])
+        put("pitch", [stats["pitch"].mean, stats["pitch"].std] if stats["pitch"].n else [0, 0])
+        put("zcr", [stats["zcr"].mean, stats["zcr"].var])
+        put("rmse", [stats["rmse"].mean, stats["rmse"].var])
+        put("tonnetz", [stats["tonnetz"].mean])
+
+        put("silence_ratio", [rms_silence_ratio(np.concatenate(self._rms))])
+
+        # mean(diff(onset_strength)) telescopes to its last value over (T - 1);
+        # with librosa's 3-frame lead-in that is the log-mel flux between frames T-4 and T-3
+        smoothness = 0.0
+        if self.n_frames >= 4:
+            mel_db = np.maximum(self._mel_tail, self.db_max - TOP_DB)
+            smoothness = np.mean(np.maximum(0.0, mel_db[:, 1] - mel_db[:, 0])) / (self.n_frames - 1)
+        put("spectral_smoothness", [smoothness])
+        return features
+
+
+def iter_audio_blocks(file_path, sr: int = TARGET_SR, block_seconds: float = None, quality: str = None,
+                      audio_format: str = None):
+    """
+    Yields mono float32 blocks of the file (a path or its bytes) resampled to
+    `sr`. Files soundfile can read are decoded block by block (with a
+    streaming soxr resampler); anything else falls back to decoder.load_audio
+    cut into blocks. Both honour the analysis budget: over-long clips yield
+    their windows back to back. audio_format is the declared container, as
+    in decoder.load_audio.
+    """
+    block_seconds = block_seconds or settings.STREAM_BLOCK_SECONDS
+    try:
+        info = sf.info(open_source(file_path))
+    except Exception:
+        try:
+            y, _ = load_audio(file_path, sr=sr, quality=quality, audio_format=audio_format)
+        except Exception as e:
+            raise ValueError(f"Cannot decode audio file: {str(e)}")
+        step = int(block_seconds * sr)
+        for i in range(0, len(y), step):
+            yield y[i:i + step]
+        return
+
+    windows = analysis_windows(file_path)
+    spans = [(None, None)] if windows is None else [
+        (int(offset * info.samplerate), int(duration * info.samplerate)) for offset, duration in windows
+    ]
+    blocksize = max(int(block_seconds * info.samplerate), 1)
+    for start, frames in spans:
+        resampler = None
+        if info.samplerate != sr:
+            resampler = soxr.ResampleStream(info.samplerate, sr, 1, dtype="float32",
+                                            quality=STREAM_RESAMPLE_QUALITY[resample_tier(quality)])
+        for block in sf.blocks(open_source(file_path), blocksize=blocksize, dtype="float32", always_2d=True,
+                               start=start or 0, frames=-1 if frames is None else frames):
+            mono = block.mean(axis=1)
+            yield resampler.resample_chunk(mono) if resampler else mono
+        if resampler:
+            yield resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True)
+
+
+def check_streaming_options(pitch_engine: str = None, tonnetz_mode: str = None, vad: bool = None):
+    """
+    Raises ValueError when the options (None = the settings default) ask for
+    something the streaming extractor does not compute, e.g. a model trained
+    on the HPSS tonnetz or with the voice-activity gate.
+    """
+    pitch_engine = pitch_engine or settings.PITCH_ENGINE
+    tonnetz_mode = tonnetz_mode or settings.TONNETZ_MODE
+    if pitch_engine != "voiceband":
+        raise ValueError(f"Streaming extraction computes the voiceband pitch, not '{pitch_engine}'")
+    if tonnetz_mode != "fast":
+        raise ValueError(f"Streaming extraction computes the fast tonnetz, not '{tonnetz_mode}'")
+    if settings.VAD_ENABLED if vad is None else vad:
+        raise ValueError("Streaming extraction cannot run the voice-activity gate")
+
+
+def extract_features_streaming(file_path, block_seconds: float = None, quality: str = None, groups=None,
+                               pitch_engine: str = None, tonnetz_mode: str = None, vad: bool = None,
+                               audio_format: str = None) -> np.ndarray:
+    """
+    Streaming counterpart of core_features.extract_features (fast pitch/tonnetz
+    paths). Every group is accumulated; those outside `groups` are zeroed, as
+    assemble_features() leaves them. Options it cannot honour raise ValueError
+    (see check_streaming_options).
+    """
+    check_streaming_options(pitch_engine, tonnetz_mode, vad)
+    extractor = StreamingFeatureExtractor(TARGET_SR)
+    for block in iter_audio_blocks(file_path, TARGET_SR, block_seconds, quality, audio_format):
+        extractor.push(block)
+    features = extractor.finish()
+    if groups is not None:
+        for name, group_slice in GROUP_SLICES.items():
+            if name not in groups:
+                features[group_slice] = 0.0
+    return features
@@ -0,0 +1,80 @@
+"""
+Fused time-domain kernel for the ZCR, RMS and silence-ratio features.
+
+librosa frames the signal twice for these (edge padding for
+zero_crossing_rate, zero padding for rms), materialising two
+(2048, n_frames) matrices that hold every sample four times over. Here the
+zero-padded signal is viewed once as hop-sized blocks: each frame is exactly
+N_FFT // HOP_LENGTH consecutive blocks, so per-block energy and sign-change
+counts are computed once and every frame value is a sum of four block values
+taken through a sliding-window view. Crossing pairs that touch the padding
+are dropped, which reproduces the edge-padded ZCR from the same zero-padded
+blocks.
+
+The kernel takes any run of frames whose valid samples are known, so the
+streaming extractor feeds it block by block with the same results.
+"""
+import numpy as np
+
+from app.audio.spectrogram import N_FFT, HOP_LENGTH
+
+BLOCKS_PER_FRAME = N_FFT // HOP_LENGTH
+# librosa.zero_crossings threshold: smaller magnitudes count as 0 (positive)
+ZERO_THRESHOLD = 1e-10
+SILENCE_THRESHOLD_DB = -40
+AMIN = 1e-5
+
+
+def frame_zcr_rms(segment: np.ndarray, valid_start: int = 0, valid_stop: int = None):
+    """
+    Per-frame zero-crossing rate and RMS of a zero-padded sample run.
+
+    `segment` holds (n_frames - 1) * HOP_LENGTH + N_FFT samples with frames
+    starting every HOP_LENGTH samples; samples outside [valid_start,
+    valid_stop) are padding (zeros). Returns (zcr, rms), both of length
+    n_frames, equal to librosa's zero_crossing_rate and rms frame values.
+    """
+    valid_stop = len(segment) if valid_stop is None else valid_stop
+    n_blocks = len(segment) // HOP_LENGTH
+    if n_blocks < BLOCKS_PER_FRAME or n_blocks * HOP_LENGTH != len(segment):
+        raise ValueError(f"Segment of {len(segment)} samples does not hold whole frames")
+    blocks = segment.reshape(n_blocks, HOP_LENGTH)
+
+    energy = np.einsum("ij,ij->i", blocks, blocks)
+    frame_energy = np.lib.stride_tricks.sliding_window_view(energy, BLOCKS_PER_FRAME).sum(axis=1)
+    rms = np.sqrt(frame_energy / N_FFT)
+
+    # changed[i]: samples i - 1 and i lie on different sides of zero
+    negative = np.signbit(segment) & (np.abs(segment) > ZERO_THRESHOLD)
+    changed = np.empty(len(segment), dtype=bool)
+    changed[0] = False
+    np.not_equal(negative[1:], negative[:-1], out=changed[1:])
+    # Pairs straddling the padding never cross (librosa pads with edge values)
+    for edge in (valid_start, valid_stop):
+        if 0 < edge < len(segment):
+            changed[edge] = False
+
+    block_crossings = np.count_nonzero(changed.reshape(n_blocks, HOP_LENGTH), axis=1)
+    crossings = np.lib.stride_tricks.sliding_window_view(block_crossings, BLOCKS_PER_FRAME).sum(axis=1)
+    # The pair ending on a frame's first sample belongs to the previous frame
+    crossings -= changed[:len(crossings) * HOP_LENGTH:HOP_LENGTH]
+    # float64 like librosa's mean over boolean crossings
+    return crossings / N_FFT, rms
+
+
+def clip_zcr_rms(y: np.ndarray):
+    """frame_zcr_rms() over a whole clip with librosa's centred framing (1 + len(y) // HOP_LENGTH frames)."""
+    n_frames = 1 + len(y) // HOP_LENGTH
+    padded = np.zeros((n_frames - 1) * HOP_LENGTH + N_FFT, dtype=y.dtype)
+    padded[N_FFT // 2:N_FFT // 2 + len(y)] = y
+    return frame_zcr_rms(padded, N_FFT // 2, N_FFT // 2 + len(y))
+
+
+def rms_silence_ratio(rms: np.ndarray) -> float:
+    """Share of frames more than 40 dB below the loudest one (librosa.amplitude_to_db(rms, ref=np.max))."""
+    if len(rms) == 0:
+        return 0
+    power = np.square(rms)
+    rms_db = 10.0 * np.log10(np.maximum(AMIN ** 2, power))
+    rms_db -= 10.0 * np.log10(np.maximum(AMIN ** 2, np.max(rms) ** 2))
+    return np.sum(rms_db < SILENCE_THRESHOLD_DB) / len(rms)
@@ -0,0 +1,220 @@
+"""
+Per-window feature vectors for scoring a long clip along its time axis.
+
+The clip is analysed once: every feature group's frame trace (MFCCs, deltas,
+spectral shape, chroma, ZCR/RMS, onset envelope, tonnetz, voiced pitch peaks)
+comes from a single FeatureContext. Window vectors are then read from prefix
+sums of those traces, so a window's mean and std cost O(1) per feature
+whatever its length and overlapping windows never recompute an STFT. Each
+window vector uses the registry layout of the clip vector:
+
+  - means / stds / variances come from cumulative sums of x and x^2 (taken
+    about the clip mean to keep the difference well conditioned);
+  - pitch averages the voiced peaks of the window's frames, with the voicing
+    threshold of the whole clip (pitch.voiced_peaks);
+  - the silence ratio is measured against the window's own loudest frame;
+  - spectral smoothness (mean first difference of the onset envelope)
+    telescopes to (last - first) / (frames - 1).
+
+Frame traces keep their whole-clip context (log-mel and contrast 80 dB
+floors, chroma tuning, delta and median-filter edges), so a window vector is
+close to, not identical with, the vector of the window cut out and analysed
+alone. A window spanning the whole clip reproduces the clip vector.
+"""
+import numpy as np
+
+from app.audio.core_features import context_class, assemble_features, validate_signal
+from app.audio.decoder import load_audio
+from app.audio.fft_backend import extraction_slot
+from app.audio.pitch import voiced_peaks
+from app.audio.registry import GROUP_SLICES, N_FEATURES
+from app.audio.spectrogram import HOP_LENGTH
+from app.audio.time_domain import AMIN, SILENCE_THRESHOLD_DB
+from app.audio.vad import gate_speech, NoSpeechError
+from app.core.config import settings
+
+
+def window_starts(n_frames: int, window_frames: int, hop_frames: int) -> np.ndarray:
+    """First frame of each window; the last window ends on the clip's last frame."""
+    if n_frames <= window_frames:
+        return np.array([0])
+    starts = np.arange(0, n_frames - window_frames + 1, hop_frames)
+    if starts[-1] != n_frames - window_frames:
+        starts = np.append(starts, n_frames - window_frames)
+    return starts
+
+
+def _prefix(x: np.ndarray) -> np.ndarray:
+    """Cumulative sums along frames with a leading zero column."""
+    out = np.zeros(x.shape[:-1] + (x.shape[-1] + 1,))
+    np.cumsum(x, axis=-1, out=out[..., 1:])
+    return out
+
+
+def window_moments(x: np.ndarray, starts: np.ndarray, width: int):
+    """
+    Mean and variance of every row of a (rows, n_frames) trace over the
+    windows [start, start + width). Returns two (n_windows, rows) arrays.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    shift = x.mean(axis=1, keepdims=True)
+    centred = x - shift
+    first, second = _prefix(centred), _prefix(centred ** 2)
+    stops = starts + width
+    mean = (first[:, stops] - first[:, starts]) / width
+    var = (second[:, stops] - second[:, starts]) / width - mean ** 2
+    return (mean + shift).T, np.maximum(var, 0).T
+
+
+def _mean_std(trace, starts, width):
+    mean, var = window_moments(trace, starts, width)
+    return np.hstack([mean, np.sqrt(var)])
+
+
+def _mean(trace, starts, width):
+    return window_moments(trace, starts, width)[0]
+
+
+def _mean_var(trace, starts, width):
+    return np.hstack(window_moments(trace, starts, width))
+
+
+def _pitch(ctx, starts, width):
+    n_frames = ctx.spec.magnitude.shape[1]
+    values, frames = voiced_peaks(ctx.spec.magnitude, ctx.sr)
+    values = values.astype(np.float64)
+    shift = values.mean() if len(values) else 0.0
+    count = _prefix(np.bincount(frames, minlength=n_frames).astype(np.float64))
+    first = _prefix(np.bincount(frames, values - shift, minlength=n_frames))
+    second = _prefix(np.bincount(frames, (values - shift) ** 2, minlength=n_frames))
+    stops = starts + width
+    n = count[stops] - count[starts]
+    safe = np.maximum(n, 1)
+    mean = (first[stops] - first[starts]) / safe
+    var = np.maximum((second[stops] - second[starts]) / safe - mean ** 2, 0)
+    # Windows without voiced peaks get (0, 0), like a clip without any
+    return np.where(n > 0, [mean + shift, np.sqrt(var)], 0).T
+
+
+def _silence_ratio(ctx, starts, width):
+    rms = ctx.rmse[0]
+    level_db = 10.0 * np.log10(np.maximum(AMIN ** 2, np.square(rms)))
+    windows = np.lib.stride_tricks.sliding_window_view(level_db, width)[starts]
+    quiet = windows - windows.max(axis=1, keepdims=True) < SILENCE_THRESHOLD_DB
+    return (np.count_nonzero(quiet, axis=1) / width)[:, np.newaxis]
+
+
+def _smoothness(ctx, starts, width):
+    env = ctx.onset_env.astype(np.float64)
+    if width < 2:
+        return np.zeros((len(starts), 1))
+    return ((env[starts + width - 1] - env[starts]) / (width - 1))[:, np.newaxis]
+
+
+def _tonnetz(ctx, starts, width):
+    try:
+        tonnetz = ctx.tonnetz
+    except Exception:
+        return np.zeros((len(starts), 6))
+    return _mean(tonnetz, starts, width)
+
+
+# Registry group -> window reducer (context, starts, width) -> (n_windows, group width)
+WINDOW_REDUCERS = {
+    "mfcc": lambda ctx, s, w: _mean_std(ctx.mfcc, s, w),
+    "delta_mfcc": lambda ctx, s, w: _mean_std(ctx.delta_mfcc, s, w),
+    "spectral_centroid": lambda ctx, s, w: _mean_std(ctx.centroid, s, w),
+    "spectral_rolloff": lambda ctx, s, w: _mean_std(ctx.rolloff, s, w),
+    "spectral_flatness": lambda ctx, s, w: _mean(ctx.flatness, s, w),
+    "spectral_bandwidth": lambda ctx, s, w: _mean_std(ctx.bandwidth, s, w),
+    "spectral_contrast": lambda ctx, s, w: _mean(ctx.contrast, s, w),
+    "chroma": lambda ctx, s, w: _mean(ctx.chroma, s, w),
+    "pitch": _pitch,
+    "zcr": lambda ctx, s, w: _mean_var(ctx.zcr, s, w),
+    "rmse": lambda ctx, s, w: _mean_var(ctx.rmse, s, w),
+    "silence_ratio": _silence_ratio,
+    "spectral_smoothness": _smoothness,
+    "tonnetz": _tonnetz,
+}
+
+
+def window_features(ctx, window_frames: int, hop_frames: int, groups=None):
+    """
+    (starts, features): first frame of each window and the (n_windows,
+    N_FEATURES) matrix of their feature vectors, computing only the requested
+    groups (None = all; skipped groups stay 0, as in assemble_features).
+    """
+    n_frames = ctx.spec.magnitude.shape[1]
+    starts = window_starts(n_frames, window_frames, hop_frames)
+    width = min(window_frames, n_frames)
+    features = np.zeros((len(starts), N_FEATURES))
+    for group, reduce in WINDOW_REDUCERS.items():
+        if groups is None or group in groups:
+            features[:, GROUP_SLICES[group]] = reduce(ctx, starts, width)
+    return starts, features
+
+
+def extract_timeline(file_path, window_seconds: float = None, hop_seconds: float = None,
+                     groups=None, window_groups=None, engine: str = None, pitch_engine: str = None,
+                     tonnetz_mode: str = None, resample_quality: str = None, vad: bool = None,
+                     audio_format: str = None):
+    """
+    Clip feature vector plus per-window vectors from one analysis pass.
+
+    Decodes up to settings.TIMELINE_MAX_SECONDS from the start of the clip
+    (in one piece, so window times are clip times) and returns
+    (features, start_seconds, window_features): the extract_features() vector
+    for `groups` and one row per window of window_seconds (default:
+    settings.TIMELINE_WINDOW_SECONDS) every hop_seconds (default:
+    settings.TIMELINE_HOP_SECONDS) for `window_groups` (default: `groups`).
+
+    The clip vector must not depend on the timeline flag, so it reuses the
+    windows' analysis only when extract_features() would see the same
+    signal: for clips longer than settings.MAX_ANALYSIS_SECONDS it is
+    computed from a second decode with the regular analysis budget and
+    window strategy. The voice-activity gate would shift the time axis, so
+    windows are always taken on the decoded clip; with vad the clip vector
+    is computed from the gated signal (likewise a second analysis, only for
+    models trained with it).
+    audio_format is the declared container, as in extract_features().
+    """
+    window_seconds = window_seconds or settings.TIMELINE_WINDOW_SECONDS
+    hop_seconds = hop_seconds or settings.TIMELINE_HOP_SECONDS
+    window_groups = groups if window_groups is None else window_groups
+    with extraction_slot():
+        try:
+            try:
+                y, sr = load_audio(file_path, sr=22050, max_seconds=settings.TIMELINE_MAX_SECONDS,
+                                   strategy="head", quality=resample_quality, audio_format=audio_format)
+            except Exception as e:
+                raise ValueError(f"Cannot decode audio file: {str(e)}")
+            validate_signal(y, sr)
+
+            context = context_class(engine)
+            ctx = context(y, sr, shared_spectrogram=True, pitch_engine=pitch_engine, tonnetz_mode=tonnetz_mode)
+            window_frames = max(1, int(round(window_seconds * sr / HOP_LENGTH)))
+            hop_frames = max(1, int(round(hop_seconds * sr / HOP_LENGTH)))
+            starts, windows = window_features(ctx, window_frames, hop_frames, window_groups)
+
+            # Both budgets decode the whole clip: extract_features() would analyse y itself
+            timeline_budget, analysis_budget = settings.TIMELINE_MAX_SECONDS, settings.MAX_ANALYSIS_SECONDS
+            whole_clip = ((timeline_budget <= 0 or len(y) < timeline_budget * sr)
+                          and (analysis_budget <= 0 or len(y) <= analysis_budget * sr))
+            if not whole_clip:
+                try:
+                    y, sr = load_audio(file_path, sr=22050, quality=resample_quality, audio_format=audio_format)
+                except Exception as e:
+                    raise ValueError(f"Cannot decode audio file: {str(e)}")
+                validate_signal(y, sr)
+            if settings.VAD_ENABLED if vad is None else vad:
+                y = gate_speech(y, sr)
+                validate_signal(y, sr)
+            if y is not ctx.y:
+                ctx = context(y, sr, pitch_engine=pitch_engine, tonnetz_mode=tonnetz_mode)
+            return assemble_features(ctx, groups), starts * HOP_LENGTH / sr, windows
+
+        except NoSpeechError:
+            raise
+        except Exception as e:
+            print(f"Error extracting timeline: {type(e).__name__}: {e}")
+            raise ValueError(str(e) if str(e) else f"Audio processing error: {type(e).__name__}")
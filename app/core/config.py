@@ -6,6 +6,66 @@ class Settings(BaseSettings):
     MODEL_PATH: str = os.getenv("MODEL_PATH", "app/ml/voice_auth_model.pkl")
     # Threshold for AI classification (>= threshold means AI)
     AI_PROBABILITY_THRESHOLD: float = float(os.getenv("AI_PROBABILITY_THRESHOLD", "0.6"))
+    # Compute one STFT per request and feed every spectral feature from it
+    SHARED_SPECTROGRAM: bool = os.getenv("SHARED_SPECTROGRAM", "true").lower() == "true"
+    # Pitch statistics engine: "voiceband" (vectorized, piptrack-exact) or "piptrack"
+    PITCH_ENGINE: str = os.getenv("PITCH_ENGINE", "voiceband")
+    # Tonnetz path: "hpss" (harmonic separation + CQT chroma) or "fast" (STFT chroma).
+    # A model's metadata file overrides this for that model.
+    TONNETZ_MODE: str = os.getenv("TONNETZ_MODE", "hpss")
+    # Block-wise extraction with running statistics (constant memory for long clips)
+    STREAMING_EXTRACTION: bool = os.getenv("STREAMING_EXTRACTION", "false").lower() == "true"
+    STREAM_BLOCK_SECONDS: float = float(os.getenv("STREAM_BLOCK_SECONDS", "10"))
+    # Split long clips into frame segments extracted in parallel (app/audio/segmented.py);
+    # each segment covers at least SEGMENT_SECONDS
+    SEGMENTED_EXTRACTION: bool = os.getenv("SEGMENTED_EXTRACTION", "false").lower() == "true"
+    SEGMENT_SECONDS: float = float(os.getenv("SEGMENT_SECONDS", "15"))
+    # Timeline mode (app/audio/timeline.py): windows scored along the clip, decoded from
+    # its start up to TIMELINE_MAX_SECONDS
+    TIMELINE_WINDOW_SECONDS: float = float(os.getenv("TIMELINE_WINDOW_SECONDS", "2"))
+    TIMELINE_HOP_SECONDS: float = float(os.getenv("TIMELINE_HOP_SECONDS", "1"))
+    TIMELINE_MAX_SECONDS: float = float(os.getenv("TIMELINE_MAX_SECONDS", "600"))
+    # Analysis budget: clips longer than this are reduced to representative windows (0 = no limit)
+    MAX_ANALYSIS_SECONDS: float = float(os.getenv("MAX_ANALYSIS_SECONDS", "60"))
+    ANALYSIS_WINDOW_SECONDS: float = float(os.getenv("ANALYSIS_WINDOW_SECONDS", "10"))
+    # Window selection for long clips: "spread" (evenly from start to end) or "energy" (loudest)
+    ANALYSIS_WINDOW_STRATEGY: str = os.getenv("ANALYSIS_WINDOW_STRATEGY", "spread")
+    # Voice-activity gate before feature extraction: trims leading/trailing silence,
+    # caps internal pauses and rejects clips without speech. A model's metadata file
+    # overrides VAD_ENABLED for that model (the gate changes the features).
+    VAD_ENABLED: bool = os.getenv("VAD_ENABLED", "false").lower() == "true"
+    VAD_THRESHOLD_DB: float = float(os.getenv("VAD_THRESHOLD_DB", "-40"))
+    VAD_MAX_PAUSE_SECONDS: float = float(os.getenv("VAD_MAX_PAUSE_SECONDS", "0.5"))
+    # Resampling to 22050 Hz: "hq" (soxr HQ, matches training), "fast" (soxr quick) or
+    # "decoder" (ffmpeg outputs 22050 Hz directly when installed, else "hq")
+    RESAMPLE_QUALITY: str = os.getenv("RESAMPLE_QUALITY", "hq")
+    # Long-lived decoder worker processes shared by the requests (app/audio/decode_pool.py);
+    # 0 decodes in the request thread. A decode over DECODER_TIMEOUT_SECONDS kills its worker,
+    # and idle workers are health-checked every DECODER_HEALTH_SECONDS.
+    DECODER_WORKERS: int = int(os.getenv("DECODER_WORKERS", "0"))
+    DECODER_TIMEOUT_SECONDS: float = float(os.getenv("DECODER_TIMEOUT_SECONDS", "60"))
+    DECODER_HEALTH_SECONDS: float = float(os.getenv("DECODER_HEALTH_SECONDS", "30"))
+    # Directory whose files requests may name with audioPath (app/audio/local_input.py);
+    # empty disables local paths
+    LOCAL_AUDIO_ROOT: str = os.getenv("LOCAL_AUDIO_ROOT", "")
+    # Request limits (app/api/ingest.py, app/api/admission.py): encoded audio per request
+    # (JSON, upload or audioUrl download; 0 = no limit) and clip duration from its header
+    # (0 = no limit), both answered with 413
+    MAX_UPLOAD_MB: float = float(os.getenv("MAX_UPLOAD_MB", "50"))
+    MAX_AUDIO_SECONDS: float = float(os.getenv("MAX_AUDIO_SECONDS", "3600"))
+    # Estimated extraction memory all requests in flight may hold (0 = half of physical
+    # memory); a request waits up to ADMISSION_TIMEOUT_SECONDS for room, then gets 503
+    MEMORY_BUDGET_MB: float = float(os.getenv("MEMORY_BUDGET_MB", "0"))
+    ADMISSION_TIMEOUT_SECONDS: float = float(os.getenv("ADMISSION_TIMEOUT_SECONDS", "30"))
+    # Feature implementation: "librosa" (reference) or "numpy" (app/audio/numpy_engine.py,
+    # precomputed filterbanks, same vector within float32 round-off)
+    FEATURE_ENGINE: str = os.getenv("FEATURE_ENGINE", "librosa")
+    # FFT library for the spectral front end: "scipy" (multithreaded scipy.fft) or "numpy"
+    FFT_BACKEND: str = os.getenv("FFT_BACKEND", "scipy")
+    # FFT threads shared by the concurrent extractions (0 = every CPU available to the process)
+    FFT_WORKERS: int = int(os.getenv("FFT_WORKERS", "0"))
+    # Sample / spectrogram precision: "float32" (default) or "float64" for reference runs
+    AUDIO_DTYPE: str = os.getenv("AUDIO_DTYPE", "float32")
     
     class Config:
         env_file = ".env"
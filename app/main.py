@@ -3,6 +3,9 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.api import routes
 from app.core.config import settings
 from app.ml.model import model_loader
+from app.audio.core_features import context_class
+from app.audio.fft_backend import fft_budget
+from app.audio.decode_pool import decoder_pool, close_pool
 
 app = FastAPI(
     title="Voice AI Detector API",
@@ -28,14 +31,18 @@ from fastapi import Request
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
     # Handle auth errors and other HTTP exceptions
+    # Keep the exception's headers (e.g. Retry-After on 503)
+    headers = getattr(exc, "headers", None)
     if isinstance(exc.detail, dict):
         return JSONResponse(
             status_code=exc.status_code,
-            content=exc.detail
+            content=exc.detail,
+            headers=headers
         )
     return JSONResponse(
         status_code=exc.status_code,
-        content={"status": "error", "message": str(exc.detail)}
+        content={"status": "error", "message": str(exc.detail)},
+        headers=headers
     )
 
 @app.exception_handler(RequestValidationError)
@@ -59,6 +66,18 @@ async def startup_event():
     print("----------------------------------------------------------------")
     if model_loader.model is None:
         print("WARNING: Model not loaded. API will return errors for predictions.")
+    # Resolve the feature engine now so its filterbanks are built before the first request
+    context_class()
+    print(f"Feature engine: {settings.FEATURE_ENGINE}")
+    print(f"FFT backend: {settings.FFT_BACKEND} (up to {fft_budget()} threads, shared by concurrent requests)")
+    if settings.DECODER_WORKERS > 0:
+        # Workers boot in the background; the first decode waits for its worker to be ready
+        decoder_pool()
+        print(f"Decoder pool: {settings.DECODER_WORKERS} worker processes")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    close_pool()
 
 app.include_router(routes.router, prefix="/api", tags=["Voice Detection"])
 
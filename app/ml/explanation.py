@@ -1,36 +1,27 @@
 import numpy as np
+from app.audio.registry import feature_index, groups_for
+
+# Features read below; their groups are always extracted, whatever the model needs
+EXPLANATION_FEATURES = ("pitch_std", "zcr_var", "silence_ratio", "spectral_smoothness", "flatness_mean")
+EXPLANATION_GROUPS = groups_for(EXPLANATION_FEATURES)
+
+def _feature(features: np.ndarray, name: str) -> float:
+    idx = feature_index(name)
+    return features[idx] if len(features) > idx else 0
 
 def generate_explanation(features: np.ndarray, prediction_prob: float, threshold: float) -> str:
     """
     Generates a technical explanation based on feature values and classification.
-    Updated for 92-feature vector layout.
-    
-    Feature indices (must match core_features.py):
-      0-12:  MFCC Mean (13)
-      13-25: MFCC Std (13)
-      26-38: Delta MFCC Mean (13)
-      39-51: Delta MFCC Std (13)
-      52: Centroid Mean, 53: Centroid Std
-      54: Rolloff Mean, 55: Rolloff Std
-      56: Flatness Mean
-      57: Bandwidth Mean, 58: Bandwidth Std
-      59-65: Spectral Contrast Mean (7)
-      66-77: Chroma Mean (12)
-      78: Pitch Mean, 79: Pitch Std
-      80: ZCR Mean, 81: ZCR Var
-      82: RMSE Mean, 83: RMSE Var
-      84: Silence Ratio
-      85: Spectral Smoothness
-      86-91: Tonnetz Mean (6)
+    Features are looked up by name in the app.audio.registry layout.
     """
     if prediction_prob < threshold:
         # HUMAN classification
         reasons = []
         
         # Check for natural voice indicators
-        pitch_std = features[79] if len(features) > 79 else 0
-        zcr_var = features[81] if len(features) > 81 else 0
-        silence_ratio = features[84] if len(features) > 84 else 0
+        pitch_std = _feature(features, "pitch_std")
+        zcr_var = _feature(features, "zcr_var")
+        silence_ratio = _feature(features, "silence_ratio")
         
         if pitch_std > 15.0:
             reasons.append("natural pitch variation")
@@ -52,11 +43,11 @@ def generate_explanation(features: np.ndarray, prediction_prob: float, threshold
     reasons = []
     
     # Extract key metrics safely
-    pitch_std = features[79] if len(features) > 79 else 0
-    zcr_var = features[81] if len(features) > 81 else 0
-    silence_ratio = features[84] if len(features) > 84 else 0
-    spectral_smoothness = features[85] if len(features) > 85 else 0
-    flatness = features[56] if len(features) > 56 else 0
+    pitch_std = _feature(features, "pitch_std")
+    zcr_var = _feature(features, "zcr_var")
+    silence_ratio = _feature(features, "silence_ratio")
+    spectral_smoothness = _feature(features, "spectral_smoothness")
+    flatness = _feature(features, "flatness_mean")
     
     # 1. Robotic Pitch Consistency
     if pitch_std < 10.0: 
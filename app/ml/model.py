@@ -1,11 +1,21 @@
 import joblib
+import json
 import numpy as np
 import os
 from app.core.config import settings
+from app.audio.tonnetz import TONNETZ_MODES
+from app.audio.registry import validate_groups
+from app.audio.decoder import RESAMPLE_TIERS
+
+def metadata_path(model_path: str) -> str:
+    """Feature metadata lives next to the model: voice_auth_model.pkl -> voice_auth_model.json"""
+    return os.path.splitext(model_path)[0] + ".json"
 
 class ModelLoader:
     _instance = None
     model = None
+    # extract_features() keyword options the model was trained with
+    feature_options = {}
     
     def __new__(cls):
         if cls._instance is None:
@@ -24,27 +34,66 @@ class ModelLoader:
         except Exception as e:
             print(f"Error loading model: {e}")
             self.model = None
+        self.feature_options = self.load_metadata(metadata_path(settings.MODEL_PATH))
+    
+    def load_metadata(self, path: str) -> dict:
+        """Reads the feature options recorded at training time (missing file = defaults)."""
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path) as f:
+                metadata = json.load(f)
+        except Exception as e:
+            print(f"Error loading model metadata: {e}")
+            return {}
+        
+        options = {}
+        tonnetz_mode = metadata.get("tonnetz_mode")
+        if tonnetz_mode in TONNETZ_MODES:
+            options["tonnetz_mode"] = tonnetz_mode
+        elif tonnetz_mode is not None:
+            print(f"WARNING: Unknown tonnetz_mode '{tonnetz_mode}' in {path}, using default.")
+        
+        # Resampling tier the training clips went through (it shifts the high bands)
+        resample_quality = metadata.get("resample_quality")
+        if resample_quality in RESAMPLE_TIERS:
+            options["resample_quality"] = resample_quality
+        elif resample_quality is not None:
+            print(f"WARNING: Unknown resample_quality '{resample_quality}' in {path}, using default.")
+        
+        # Whether training clips went through the voice-activity gate
+        vad = metadata.get("vad")
+        if isinstance(vad, bool):
+            options["vad"] = vad
+        elif vad is not None:
+            print(f"WARNING: Invalid vad '{vad}' in {path}, using default.")
+        
+        # Feature groups the model was trained on; the rest are never computed
+        feature_groups = metadata.get("feature_groups")
+        if feature_groups is not None:
+            try:
+                options["groups"] = validate_groups(feature_groups)
+            except ValueError as e:
+                print(f"WARNING: {e} in {path}, extracting all groups.")
+        return options
             
     def predict(self, features: np.ndarray):
+        # Reshape for single sample
+        return float(self.predict_batch(features.reshape(1, -1))[0])
+    
+    def predict_batch(self, features: np.ndarray) -> np.ndarray:
+        """AI probabilities of the rows of an (n_samples, n_features) matrix, in one model call."""
         if self.model is None:
             raise RuntimeError("Model is not loaded.")
         
-        # Reshape for single sample
-        features_reshaped = features.reshape(1, -1)
-        
-        # Get probability
         # XGBoost/Sklearn classes_: [0, 1] where 1 is AI
         try:
             # Check if model supports predict_proba
             if hasattr(self.model, "predict_proba"):
-                probs = self.model.predict_proba(features_reshaped)
                 # Assuming index 1 is positive class (AI)
-                score = float(probs[0][1])  # Convert numpy float32 -> Python float
-            else:
-                # Fallback for models without probability (shouldn't happen with XGB/Logistic)
-                score = float(self.model.predict(features_reshaped)[0])
-                
-            return score
+                return np.asarray(self.model.predict_proba(features)[:, 1], dtype=float)
+            # Fallback for models without probability (shouldn't happen with XGB/Logistic)
+            return np.asarray(self.model.predict(features), dtype=float)
         except Exception as e:
             raise RuntimeError(f"Prediction error: {e}")
 
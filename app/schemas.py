@@ -1,16 +1,20 @@
 from typing import Optional
-from pydantic import BaseModel, Field, model_validator
+from pydantic import BaseModel, Field, ValidationInfo, model_validator
 
 class VoiceAnalysisRequest(BaseModel):
     language: str = "English"
     audioFormat: str = "mp3"
     audioBase64: Optional[str] = Field(None, description="Base64 encoded audio string")
     audioUrl: Optional[str] = Field(None, description="URL to download audio file from")
+    audioPath: Optional[str] = Field(None, description="Path of an audio file on the API host, under LOCAL_AUDIO_ROOT")
+    timeline: bool = Field(False, description="Also score overlapping windows along the clip")
 
     @model_validator(mode='after')
-    def check_audio_source(self):
-        if not self.audioBase64 and not self.audioUrl:
-            raise ValueError('Either audioBase64 or audioUrl must be provided')
+    def check_audio_source(self, info: ValidationInfo):
+        # Streamed ingestion (app/api/ingest.py) decodes audioBase64 outside the model
+        streamed = bool(info.context and info.context.get("audio_streamed"))
+        if not self.audioBase64 and not self.audioUrl and not self.audioPath and not streamed:
+            raise ValueError('Either audioBase64, audioUrl or audioPath must be provided')
         return self
 
 class VoiceClassification:
@@ -22,3 +26,4 @@ class VoiceAnalysisResponse(BaseModel):
     classification: str
     confidenceScore: float = Field(..., ge=0.0, le=1.0)
     explanation: str = ""
+    timeline: Optional[dict] = None
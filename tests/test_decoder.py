@@ -0,0 +1,61 @@
+"""
+In-memory ffmpeg decoding (app/audio/decoder.py). Skipped on hosts without
+ffmpeg / ffprobe, which the Docker image installs.
+"""
+import io
+import os
+import shutil
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.audio.decoder import _pipe_pcm16, load_audio
+
+pytestmark = pytest.mark.skipif(not (shutil.which("ffmpeg") and shutil.which("ffprobe")),
+                                reason="ffmpeg / ffprobe not installed")
+
+
+def pcm_wav(sr: int, channels: int, seconds: float = 2.0) -> tuple:
+    """(WAV bytes, int16 samples) of a tone with a different level per channel."""
+    t = np.arange(int(sr * seconds)) / sr
+    tone = np.sin(2 * np.pi * 440 * t)
+    pcm = (np.outer(tone, np.linspace(0.2, 0.8, channels)) * 32767).astype(np.int16)
+    buffer = io.BytesIO()
+    sf.write(buffer, pcm, sr, format="WAV", subtype="PCM_16")
+    return buffer.getvalue(), pcm
+
+
+def transcode(data: bytes, *args) -> bytes:
+    cmd = ["ffmpeg", "-nostdin", "-v", "error", "-i", "pipe:0", *args, "pipe:1"]
+    return subprocess.run(cmd, input=data, capture_output=True, check=True).stdout
+
+
+@pytest.mark.parametrize("sr, channels", [(44100, 2), (48000, 1), (22050, 6)])
+def test_pipe_keeps_native_rate_and_channels(sr, channels):
+    data, pcm = pcm_wav(sr, channels)
+    y, sr_native = _pipe_pcm16(data)
+    assert sr_native == sr
+    # Same mono mixdown as librosa.load on the int16 samples
+    expected = pcm.mean(axis=1, dtype=np.float32) / 32768
+    np.testing.assert_array_equal(y, expected)
+
+
+def test_format_libsndfile_cannot_read():
+    data, _ = pcm_wav(44100, 2)
+    aac = transcode(data, "-c:a", "aac", "-b:a", "128k", "-f", "adts")
+    y, sr_native = _pipe_pcm16(aac)
+    assert sr_native == 44100
+    assert abs(len(y) - 2 * 44100) < 4096  # encoder priming / padding only
+
+    y, sr = load_audio(aac, sr=22050, max_seconds=0)
+    assert sr == 22050 and abs(len(y) - 2 * 22050) < 2048
+
+
+def test_undecodable_bytes():
+    with pytest.raises(ValueError):
+        _pipe_pcm16(b"\x00" * 4096)
@@ -0,0 +1,104 @@
+"""
+Streaming request-body ingestion (app/api/ingest.py), without a running server.
+
+Bodies are fed to the readers through a hand-built Starlette Request in
+chunks, the way uvicorn delivers them.
+"""
+import asyncio
+import base64
+import gzip
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from fastapi.exceptions import RequestValidationError
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.requests import Request
+
+from app.api.ingest import read_voice_request, read_upload_request
+
+CHUNK = 64 * 1024
+
+
+def make_request(body: bytes, content_type: str = "application/json", encoding: str = None) -> Request:
+    headers = [(b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode())]
+    if encoding:
+        headers.append((b"content-encoding", encoding.encode()))
+    chunks = iter([body[i:i + CHUNK] for i in range(0, len(body), CHUNK)])
+
+    async def receive():
+        chunk = next(chunks, None)
+        return {"type": "http.request", "body": chunk or b"", "more_body": chunk is not None}
+    return Request({"type": "http", "method": "POST", "path": "/api/voice-detection", "headers": headers,
+                    "query_string": b""}, receive)
+
+
+def pcm_tone(seconds: float, sr: int = 16000) -> bytes:
+    """int16 PCM of a 440 Hz tone: compresses well, like the WAV bodies sent in practice."""
+    t = np.arange(int(seconds * sr)) / sr
+    return (np.sin(2 * np.pi * 440 * t) * 12000).astype(np.int16).tobytes()
+
+
+def voice_document(audio: bytes) -> bytes:
+    return json.dumps({"language": "English", "audioFormat": "wav",
+                       "audioBase64": base64.b64encode(audio).decode()}).encode()
+
+
+def test_plain_body():
+    audio = os.urandom(200_000)
+    _, decoded = asyncio.run(read_voice_request(make_request(voice_document(audio))))
+    assert bytes(decoded) == audio
+
+
+def test_invalid_utf8_is_a_json_error():
+    body = b'{"language": "\xff\xfe", "audioBase64": "QUJD"}'
+    with pytest.raises(RequestValidationError) as error:
+        asyncio.run(read_voice_request(make_request(body)))
+    assert error.value.errors()[0]["type"] == "json_invalid"
+
+
+def test_fields_outside_audio_are_capped():
+    body = json.dumps({"language": "English", "pad": [0] * 100_000, "audioBase64": "QUJD"}).encode()
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(read_voice_request(make_request(body)))
+    assert error.value.status_code == 413
+
+
+def test_gzip_multiple_members():
+    # Two large members: the second must follow the first once, not repeat
+    audio = pcm_tone(20)
+    document = voice_document(audio)
+    half = len(document) // 2
+    body = gzip.compress(document[:half]) + gzip.compress(document[half:])
+    _, decoded = asyncio.run(read_voice_request(make_request(body, encoding="gzip")))
+    assert bytes(decoded) == audio
+
+
+def test_gzip_zero_padding():
+    # Trailing NUL padding is ignored, as gzip.decompress() does
+    audio = pcm_tone(10)
+    body = gzip.compress(voice_document(audio)) + b"\0" * 3 * CHUNK
+    _, decoded = asyncio.run(read_voice_request(make_request(body, encoding="gzip")))
+    assert bytes(decoded) == audio
+
+
+def test_gzip_raw_upload():
+    audio = pcm_tone(10)
+    body = gzip.compress(audio[:100_000]) + gzip.compress(audio[100_000:])
+    _, decoded = asyncio.run(read_upload_request(make_request(body, "audio/wav", "gzip")))
+    assert bytes(decoded) == audio
+
+
+def test_zstd_multiple_frames():
+    zstandard = pytest.importorskip("zstandard")
+    audio = pcm_tone(20)
+    document = voice_document(audio)
+    half = len(document) // 2
+    body = zstandard.compress(document[:half]) + zstandard.compress(document[half:])
+    _, decoded = asyncio.run(read_voice_request(make_request(body, encoding="zstd")))
+    assert bytes(decoded) == audio
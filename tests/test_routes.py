@@ -0,0 +1,82 @@
+"""
+run_detection (app/api/routes.py) on in-memory clips, without a running server.
+"""
+import io
+import json
+import os
+import sys
+
+import numpy as np
+import soundfile as sf
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.api import routes
+from app.api.routes import run_detection
+from app.audio.registry import GROUP_SLICES
+from app.core.config import settings
+from app.ml.explanation import EXPLANATION_GROUPS
+from app.ml.model import model_loader
+from app.schemas import VoiceAnalysisRequest
+
+SR = 22050
+
+
+def wav_bytes(y: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    sf.write(buffer, y.astype(np.float32), SR, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
+
+
+def two_part_clip(seconds: float) -> np.ndarray:
+    """Low harmonic voice, then a higher and noisier one: the analysed windows matter."""
+    t = np.arange(int(seconds * SR)) / SR
+    f0 = np.where(t < seconds / 2, 120.0, 260.0)
+    phase = 2 * np.pi * np.cumsum(f0) / SR
+    y = sum(np.sin(k * phase) / k for k in range(1, 6))
+    y += np.random.default_rng(0).normal(0, 0.01, len(t)) + (t >= seconds / 2) * 0.05 * np.sin(7919 * t)
+    return 0.3 * y
+
+
+def detect(audio: bytes, timeline: bool, monkeypatch) -> tuple:
+    """(response body, feature vector the model scored for the clip)."""
+    scored = []
+    predict = type(model_loader).predict
+    monkeypatch.setattr(model_loader, "predict",
+                        lambda features: scored.append(features) or predict(model_loader, features))
+    # As app.api.ingest builds it: the audio travels next to the request
+    request = VoiceAnalysisRequest.model_validate({"audioFormat": "wav", "timeline": timeline},
+                                                  context={"audio_streamed": True})
+    response = run_detection(request, audio)
+    assert response.status_code == 200
+    return json.loads(response.body), scored[0]
+
+
+def test_timeline_keeps_the_clip_verdict(monkeypatch):
+    # Over the analysis budget: the regular path scores three spread windows
+    monkeypatch.setattr(settings, "MAX_ANALYSIS_SECONDS", 3.0)
+    monkeypatch.setattr(settings, "ANALYSIS_WINDOW_SECONDS", 1.0)
+    audio = wav_bytes(two_part_clip(8.0))
+    plain, plain_features = detect(audio, False, monkeypatch)
+    timeline, timeline_features = detect(audio, True, monkeypatch)
+    np.testing.assert_array_equal(timeline_features, plain_features)
+    assert timeline["classification"] == plain["classification"]
+    assert timeline["confidenceScore"] == plain["confidenceScore"]
+    assert timeline["timeline"]["start"][-1] > 5  # windows still cover the whole clip
+
+
+def test_groups_restricted_model_sees_zeros_elsewhere(monkeypatch):
+    model_groups = ["mfcc", "pitch"]
+    monkeypatch.setattr(model_loader, "feature_options", {"groups": model_groups})
+    explained = []
+    explain = routes.generate_explanation
+    monkeypatch.setattr(routes, "generate_explanation",
+                        lambda features, *args: explained.append(features) or explain(features, *args))
+    _, features = detect(wav_bytes(two_part_clip(3.0)), False, monkeypatch)
+    for name, group_slice in GROUP_SLICES.items():
+        if name not in model_groups:
+            assert not features[group_slice].any(), name
+    assert features[GROUP_SLICES["mfcc"]].any()
+    # The explanation still reads the groups extracted for it
+    assert {"zcr", "spectral_flatness"} <= EXPLANATION_GROUPS
+    assert explained[0][GROUP_SLICES["zcr"]].any() and explained[0][GROUP_SLICES["spectral_flatness"]].any()
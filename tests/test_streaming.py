@@ -0,0 +1,48 @@
+"""
+Streaming extraction (app/audio/streaming.py) through extract_features().
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.audio.core_features import extract_features
+from app.audio.registry import GROUP_SLICES
+
+SR = 22050
+STREAMING = {"streaming": True, "pitch_engine": "voiceband", "tonnetz_mode": "fast", "vad": False}
+
+
+@pytest.fixture
+def clip_path(tmp_path):
+    t = np.arange(3 * SR) / SR
+    y = sum(np.sin(2 * np.pi * 150 * k * t) / k for k in range(1, 6))
+    y += np.random.default_rng(0).normal(0, 0.01, len(t))
+    path = tmp_path / "clip.wav"
+    sf.write(path, (0.3 * y).astype(np.float32), SR)
+    return str(path)
+
+
+def test_frame_features_match_whole_clip(clip_path):
+    whole = extract_features(clip_path, **{**STREAMING, "streaming": False, "engine": "librosa"})
+    streamed = extract_features(clip_path, **STREAMING)
+    for group in ("spectral_centroid", "spectral_rolloff", "spectral_bandwidth", "zcr", "rmse"):
+        np.testing.assert_allclose(streamed[GROUP_SLICES[group]], whole[GROUP_SLICES[group]], rtol=1e-4)
+
+
+def test_groups_outside_the_model_are_zero(clip_path):
+    full = extract_features(clip_path, **STREAMING)
+    restricted = extract_features(clip_path, groups={"mfcc", "pitch"}, **STREAMING)
+    for name, group_slice in GROUP_SLICES.items():
+        expected = full[group_slice] if name in ("mfcc", "pitch") else 0.0
+        np.testing.assert_array_equal(restricted[group_slice], expected)
+
+
+@pytest.mark.parametrize("option", [{"tonnetz_mode": "hpss"}, {"pitch_engine": "piptrack"}, {"vad": True}])
+def test_options_streaming_cannot_honour(clip_path, option):
+    with pytest.raises(ValueError):
+        extract_features(clip_path, **{**STREAMING, **option})
@@ -0,0 +1,73 @@
+import os
+import sys
+import glob
+import time
+import numpy as np
+
+# Add parent dir to path to import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.audio.decoder import load_audio
+from app.audio.core_features import context_class, assemble_features
+from app.audio.registry import FEATURE_GROUPS, GROUP_SLICES
+from app.core.config import settings
+
+DATASET_ROOT = "dataset"
+# Max per-feature error, in units of that feature's spread across the dataset
+FEATURE_TOLERANCE = 1e-3
+
+
+def run_parity(root_path=DATASET_ROOT, tonnetz_mode=None):
+    tonnetz_mode = tonnetz_mode or settings.TONNETZ_MODE
+    print("=" * 60)
+    print(f"FEATURE ENGINE PARITY REPORT (librosa vs numpy, tonnetz={tonnetz_mode})")
+    print("=" * 60)
+
+    files = sorted(glob.glob(os.path.join(root_path, "**", "*.mp3"), recursive=True) +
+                   glob.glob(os.path.join(root_path, "**", "*.wav"), recursive=True))
+
+    signals = []
+    for file_path in files:
+        try:
+            y, sr = load_audio(file_path, sr=22050)
+        except Exception as e:
+            print(f"Skipping {file_path}: {type(e).__name__}: {e}")
+            continue
+        if len(y) / sr >= 0.5:
+            signals.append(y)
+
+    if not signals:
+        print("❌ No clips could be decoded.")
+        sys.exit(1)
+
+    results, timings = {}, {}
+    for engine in ("librosa", "numpy"):
+        context = context_class(engine)
+        # Warm-up: librosa's numba kernels compile on first use
+        assemble_features(context(signals[0], 22050, tonnetz_mode=tonnetz_mode))
+        start = time.perf_counter()
+        results[engine] = np.array([assemble_features(context(y, 22050, tonnetz_mode=tonnetz_mode))
+                                    for y in signals])
+        timings[engine] = time.perf_counter() - start
+
+    reference = results["librosa"]
+    err = np.abs(results["numpy"] - reference) / np.maximum(reference.std(axis=0), 1e-12)
+
+    print(f"\nClips compared: {len(signals)}")
+    print(f"\n{'Group':22s} | max err / feature std")
+    print("-" * 45)
+    for group in FEATURE_GROUPS:
+        print(f"{group.name:22s} | {err[:, GROUP_SLICES[group.name]].max():.2e}")
+
+    print(f"\nlibrosa engine: {timings['librosa']:.2f}s")
+    print(f"numpy engine:   {timings['numpy']:.2f}s "
+          f"({timings['librosa'] / max(timings['numpy'], 1e-9):.1f}x faster)")
+
+    if err.max() > FEATURE_TOLERANCE:
+        print(f"\n❌ PARITY FAILED: error {err.max():.2e} exceeds {FEATURE_TOLERANCE:.0e}")
+        sys.exit(1)
+    print("\n✅ numpy engine matches the librosa reference")
+
+
+if __name__ == "__main__":
+    run_parity()
@@ -0,0 +1,100 @@
+import os
+import sys
+import glob
+import time
+import librosa
+import numpy as np
+import scipy.sparse
+
+# Add parent dir to path to import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.audio.decoder import load_audio
+from app.audio.contrast import CONTRAST_BAND_BINS, SIMD_SORT
+from app.audio.numpy_engine import NumpyFeatureContext, NumpySpectrogram, chroma_filterbank
+
+DATASET_ROOT = "dataset"
+DURATIONS = (1, 5, 15, 30, 60)
+REPEATS = 5
+SR = 22050
+
+
+def best_time(fn, repeats=REPEATS):
+    """Fastest of `repeats` runs in milliseconds (after one warm-up call)."""
+    fn()
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return 1e3 * min(times)
+
+
+def contrast_selection(magnitude, select):
+    for start, stop, n_quantile in CONTRAST_BAND_BINS:
+        band = magnitude[start:stop]
+        if select == "sort":
+            np.sort(band, axis=0)
+        else:
+            np.partition(band, [n_quantile - 1, band.shape[0] - n_quantile], axis=0)
+
+
+def run_benchmark(root_path=DATASET_ROOT):
+    print("=" * 60)
+    print("SPECTRAL CONTRAST / CHROMA KERNEL BENCHMARK")
+    print("=" * 60)
+    print(f"Contrast quantile selection: {'np.sort (SIMD)' if SIMD_SORT else 'np.partition'}")
+
+    # Long test signals are built by chaining dataset clips
+    signals, total = [], 0
+    for file_path in sorted(glob.glob(os.path.join(root_path, "**", "*.wav"), recursive=True)):
+        try:
+            y, _ = load_audio(file_path, sr=SR, max_seconds=0)
+        except Exception as e:
+            print(f"Skipping {file_path}: {type(e).__name__}: {e}")
+            continue
+        signals.append(y)
+        total += len(y)
+        if total >= max(DURATIONS) * SR:
+            break
+    if total < max(DURATIONS) * SR:
+        print(f"❌ Need {max(DURATIONS)}s of audio, found {total / SR:.1f}s.")
+        sys.exit(1)
+    audio = np.concatenate(signals)
+
+    print(f"\n{'Clip':>5s} | {'contrast ms':^23s} | {'chroma ms':^23s} | {'selection ms':^15s} | {'projection ms':^15s}")
+    print(f"{'':>5s} | {'librosa':>7s} {'numpy':>7s} {'err':>7s} | {'librosa':>7s} {'numpy':>7s} {'err':>7s} | "
+          f"{'sort':>7s} {'part.':>7s} | {'dense':>7s} {'sparse':>7s}")
+    print("-" * 100)
+    for seconds in DURATIONS:
+        y = audio[:seconds * SR]
+        spec = NumpySpectrogram(y, SR)
+        magnitude, power = spec.magnitude, spec.power
+
+        def engine(name):
+            return getattr(NumpyFeatureContext(y, SR, spec=spec), name)
+
+        lib_contrast = librosa.feature.spectral_contrast(S=magnitude, sr=SR)
+        lib_chroma = librosa.feature.chroma_stft(S=power, sr=SR)
+        contrast_err = np.abs(engine("contrast") - lib_contrast).max()
+        chroma_err = np.abs(engine("chroma") - lib_chroma).max()
+
+        filterbank = chroma_filterbank(0.0)
+        sparse_bank = scipy.sparse.csr_matrix(
+            np.where(np.abs(filterbank) >= 1e-7 * np.abs(filterbank).max(), filterbank, 0))
+
+        print(f"{seconds:4d}s | "
+              f"{best_time(lambda: librosa.feature.spectral_contrast(S=magnitude, sr=SR)):7.2f} "
+              f"{best_time(lambda: engine('contrast')):7.2f} {contrast_err:7.1e} | "
+              f"{best_time(lambda: librosa.feature.chroma_stft(S=power, sr=SR)):7.2f} "
+              f"{best_time(lambda: engine('chroma')):7.2f} {chroma_err:7.1e} | "
+              f"{best_time(lambda: contrast_selection(magnitude, 'sort')):7.2f} "
+              f"{best_time(lambda: contrast_selection(magnitude, 'partition')):7.2f} | "
+              f"{best_time(lambda: filterbank @ power):7.2f} {best_time(lambda: sparse_bank @ power):7.2f}")
+
+    print("\nerr = max abs difference to librosa (contrast in dB, chroma normalised to 1)")
+    print("sparse = chroma filterbank as CSR with weights below 1e-7 of the peak dropped")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,257 @@
+"""
+Feature-parity gate for the accelerated extraction modes.
+
+  python training/parity.py golden              # reference vectors -> training/golden_features.npz
+  python training/parity.py compare numpy       # one mode against them
+  python training/parity.py compare --all       # every mode in MODES
+  python training/parity.py list                # available modes
+
+`golden` runs core_features.extract_features with the reference options
+(librosa engine, whole-clip path, pinned settings, the model's metadata
+options) over every dataset clip and stores the vectors. `compare` extracts
+the same clips in another mode and reports, per feature index, the max
+relative error and the max error in units of the golden feature's spread
+across the dataset (the scale the model's StandardScaler sees), checked
+against TOLERANCE. It also scores both sets with the trained model and
+counts the decisions that flip at AI_PROBABILITY_THRESHOLD. Exit status is
+1 when any check fails, so the script can run offline as a deployment gate.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import numpy as np
+import librosa
+
+# Add parent dir to path to import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.audio.core_features import extract_features
+from app.audio.fft_backend import configure_fft
+from app.audio.registry import FEATURE_NAMES, FEATURE_GROUP_OF, N_FEATURES
+from app.ml.model import model_loader
+from app.core.config import settings
+
+DATASET_ROOT = "dataset"
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden_features.npz")
+
+# The reference: today's whole-clip librosa path. Options and settings are both
+# pinned so the golden vectors do not depend on the environment of whoever
+# extracts them; the model's metadata options (tonnetz mode, resampling tier,
+# VAD) are passed as options and so take precedence over the settings
+REFERENCE_OPTIONS = {"engine": "librosa", "streaming": False, "segmented": False,
+                     "shared_spectrogram": True, "pitch_engine": "voiceband"}
+REFERENCE_SETTINGS = {"FFT_BACKEND": "scipy", "AUDIO_DTYPE": "float32", "MAX_ANALYSIS_SECONDS": 60.0,
+                      "TONNETZ_MODE": "hpss", "RESAMPLE_QUALITY": "hq", "VAD_ENABLED": False}
+
+# Mode name -> (extract_features() options, settings overrides) applied on top of the reference ones
+MODES = {
+    "reference": ({}, {}),
+    "per-call-stft": ({"shared_spectrogram": False}, {}),
+    "piptrack": ({"pitch_engine": "piptrack"}, {}),
+    "numpy": ({"engine": "numpy"}, {}),
+    "numpy-fft": ({}, {"FFT_BACKEND": "numpy"}),
+    "float64": ({}, {"AUDIO_DTYPE": "float64"}),
+    # Four segments even on a single-CPU box, so the merge is exercised everywhere
+    "segmented": ({"segmented": True}, {"SEGMENT_SECONDS": 2.0, "FFT_WORKERS": 4}),
+    "segmented-numpy": ({"segmented": True, "engine": "numpy"}, {"SEGMENT_SECONDS": 2.0, "FFT_WORKERS": 4}),
+    # The modes below change the features by design (fast pitch/tonnetz, another
+    # resampler): expected to fail, they show what switching would cost
+    "streaming": ({"streaming": True, "tonnetz_mode": "fast"}, {"STREAM_BLOCK_SECONDS": 2.0}),
+    "fast-tonnetz": ({"tonnetz_mode": "fast"}, {}),
+    "resample-fast": ({"resample_quality": "fast"}, {}),
+}
+
+# Max error in units of the golden feature std across the dataset. Keys are
+# feature names or registry group names; the most specific entry wins.
+DEFAULT_TOLERANCE = 1e-3
+TOLERANCE = {
+    # The HPSS tonnetz goes through librosa.feature.chroma_cqt, whose tuning
+    # estimate is a histogram argmax: float rounding moves it by one bin on a
+    # few clips, shifting the tonnetz means by up to ~0.5 std in any mode
+    # that changes the arithmetic (0.52 measured for float64). Flips are still
+    # checked for those clips.
+    "tonnetz": 0.6,
+}
+# Decisions allowed to change at AI_PROBABILITY_THRESHOLD
+MAX_FLIPS = 0
+
+
+def tolerance_table() -> np.ndarray:
+    """Per-index tolerances resolved from TOLERANCE (feature name > group name > default)."""
+    return np.array([TOLERANCE.get(name, TOLERANCE.get(FEATURE_GROUP_OF[name], DEFAULT_TOLERANCE))
+                     for name in FEATURE_NAMES])
+
+
+def dataset_files(root_path=DATASET_ROOT) -> list:
+    return sorted(glob.glob(os.path.join(root_path, "**", "*.mp3"), recursive=True) +
+                  glob.glob(os.path.join(root_path, "**", "*.wav"), recursive=True))
+
+
+def model_options() -> dict:
+    """Feature options the deployed model was trained with (its metadata file)."""
+    return dict(model_loader.feature_options)
+
+
+def apply_settings(overrides: dict) -> dict:
+    """Sets settings attributes; returns the previous values for restore."""
+    previous = {name: getattr(settings, name) for name in overrides}
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    if "FFT_BACKEND" in overrides:
+        configure_fft()
+    return previous
+
+
+def extract_all(files: list, options: dict, overrides: dict = None):
+    """Feature matrix of `files` in one mode; returns (features, errors, seconds)."""
+    previous = apply_settings(overrides or {})
+    try:
+        # Warm-up: librosa's numba kernels compile on first use
+        for file_path in files:
+            try:
+                extract_features(file_path, **options)
+                break
+            except Exception:
+                continue
+        rows, errors = [], {}
+        start = time.perf_counter()
+        for file_path in files:
+            try:
+                rows.append(extract_features(file_path, **options))
+            except Exception as e:
+                errors[file_path] = f"{type(e).__name__}: {e}"
+                rows.append(np.full(N_FEATURES, np.nan))
+        return np.array(rows), errors, time.perf_counter() - start
+    finally:
+        apply_settings(previous)
+
+
+def make_golden(root_path=DATASET_ROOT, path=GOLDEN_PATH):
+    print("=" * 60)
+    print("PARITY GOLDEN VECTORS (reference extract_features)")
+    print("=" * 60)
+    files = dataset_files(root_path)
+    if not files:
+        print(f"❌ No clips found under {root_path}/")
+        sys.exit(1)
+    options = {**model_options(), **REFERENCE_OPTIONS}
+    features, errors, seconds = extract_all(files, options, REFERENCE_SETTINGS)
+    for file_path, error in errors.items():
+        print(f"Skipping {file_path}: {error}")
+
+    kept = [i for i, file_path in enumerate(files) if file_path not in errors]
+    np.savez_compressed(path, features=features[kept], files=np.array([files[i] for i in kept]),
+                        feature_names=np.array(FEATURE_NAMES),
+                        info=json.dumps({"options": sorted(map(str, options.items())),
+                                         "settings": sorted(map(str, REFERENCE_SETTINGS.items())),
+                                         "librosa": librosa.__version__, "numpy": np.__version__,
+                                         "seconds": seconds}))
+    print(f"\nClips: {len(kept)} ({len(errors)} skipped) in {seconds:.1f}s")
+    print(f"✅ Golden vectors written to {path}")
+
+
+def load_golden(path=GOLDEN_PATH):
+    if not os.path.exists(path):
+        print(f"❌ No golden vectors at {path}. Run 'python training/parity.py golden' first.")
+        sys.exit(1)
+    golden = np.load(path)
+    if tuple(golden["feature_names"]) != FEATURE_NAMES:
+        print("❌ Golden vectors use a different feature layout. Regenerate them.")
+        sys.exit(1)
+    return golden["features"], list(golden["files"]), json.loads(str(golden["info"]))
+
+
+def compare_mode(mode: str, golden, model, verbose: bool = True) -> list:
+    """Runs one mode against the golden vectors; returns the list of failed checks."""
+    reference, files, info = golden
+    options, overrides = MODES[mode]
+    options = {**model_options(), **REFERENCE_OPTIONS, **options}
+    overrides = {**REFERENCE_SETTINGS, **overrides}
+    print("=" * 60)
+    print(f"PARITY: {mode}  options={options}  settings={overrides}")
+    print("=" * 60)
+
+    features, errors, seconds = extract_all(files, options, overrides)
+    issues = [f"{file_path}: {error}" for file_path, error in errors.items()]
+    ok = ~np.isnan(features).any(axis=1)
+
+    diff = np.abs(features[ok] - reference[ok])
+    rel_err = (diff / np.maximum(np.abs(reference[ok]), 1e-12)).max(axis=0)
+    std_err = (diff / np.maximum(reference.std(axis=0), 1e-12)).max(axis=0)
+    tolerance = tolerance_table()
+    failed = std_err > tolerance
+
+    if verbose:
+        print(f"\n{'#':>3s} {'Feature':22s} | {'max rel err':>11s} | {'max err/std':>11s} | {'tolerance':>9s}")
+        print("-" * 66)
+        for i, name in enumerate(FEATURE_NAMES):
+            flag = "  ❌" if failed[i] else ""
+            print(f"{i:3d} {name:22s} | {rel_err[i]:11.2e} | {std_err[i]:11.2e} | {tolerance[i]:9.0e}{flag}")
+    issues += [f"{FEATURE_NAMES[i]}: error {std_err[i]:.2e} std exceeds {tolerance[i]:.0e}"
+               for i in np.flatnonzero(failed)]
+
+    if model is not None:
+        p_ref = model.predict_proba(reference[ok])[:, 1]
+        p_mode = model.predict_proba(features[ok])[:, 1]
+        threshold = settings.AI_PROBABILITY_THRESHOLD
+        flips = int(np.sum((p_ref >= threshold) != (p_mode >= threshold)))
+        print(f"\nMax AI probability change: {np.abs(p_mode - p_ref).max():.2e}")
+        print(f"Decision flips at {threshold}:  {flips}")
+        if flips > MAX_FLIPS:
+            issues.append(f"{flips} decision(s) flipped (allowed: {MAX_FLIPS})")
+    else:
+        print("\n⚠️  No model loaded: flip check skipped")
+
+    print(f"\nClips: {int(ok.sum())} | worst error {std_err.max():.2e} std | "
+          f"{seconds:.1f}s vs {info['seconds']:.1f}s reference")
+    if issues:
+        print(f"❌ {mode}: PARITY FAILED")
+        for issue in issues:
+            print(f"  {issue}")
+    else:
+        print(f"✅ {mode}: matches the golden vectors")
+    return issues
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Feature parity against golden reference vectors.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    golden = commands.add_parser("golden", help="extract the reference vectors")
+    golden.add_argument("--dataset", default=DATASET_ROOT)
+    compare = commands.add_parser("compare", help="compare modes against the reference vectors")
+    compare.add_argument("modes", nargs="*", metavar="MODE", help=f"one of {', '.join(MODES)}")
+    compare.add_argument("--all", action="store_true", help="every mode in MODES")
+    compare.add_argument("--quiet", action="store_true", help="summary only, no per-feature table")
+    commands.add_parser("list", help="list the modes")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for name, (options, overrides) in MODES.items():
+            print(f"{name:16s} options={options} settings={overrides}")
+        return
+    if args.command == "golden":
+        make_golden(args.dataset)
+        return
+
+    modes = list(MODES) if args.all else args.modes
+    if not modes:
+        parser.error("name at least one mode or pass --all")
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        parser.error(f"unknown mode(s) {unknown}; see 'python training/parity.py list'")
+    golden = load_golden()
+    failed = [mode for mode in modes
+              if compare_mode(mode, golden, model_loader.model, verbose=not args.quiet)]
+    if len(modes) > 1:
+        print("\n" + "=" * 60)
+        for mode in modes:
+            print(f"{'❌' if mode in failed else '✅'} {mode}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import os
+import sys
+import glob
+import time
+import numpy as np
+import librosa
+
+# Add parent dir to path to import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.audio.spectrogram import Spectrogram
+from app.audio.pitch import pitch_statistics
+
+DATASET_ROOT = "dataset"
+
+
+def piptrack_statistics(magnitude, sr):
+    """The original feature-9 computation from core_features.extract_features."""
+    pitches, magnitudes = librosa.piptrack(S=magnitude, sr=sr)
+    pitch_values = pitches[magnitudes > np.median(magnitudes)]
+    pitch_values = pitch_values[pitch_values > 0]
+    if len(pitch_values) == 0:
+        return 0, 0
+    return np.mean(pitch_values), np.std(pitch_values)
+
+
+def run_parity(root_path=DATASET_ROOT):
+    print("=" * 60)
+    print("PITCH ENGINE PARITY REPORT (piptrack vs voiceband)")
+    print("=" * 60)
+
+    files = sorted(glob.glob(os.path.join(root_path, "**", "*.mp3"), recursive=True) +
+                   glob.glob(os.path.join(root_path, "**", "*.wav"), recursive=True))
+
+    max_err = np.zeros(2)
+    t_ref = t_fast = 0.0
+    compared = 0
+
+    for file_path in files:
+        try:
+            y, sr = librosa.load(file_path, sr=22050, mono=True)
+        except Exception as e:
+            print(f"Skipping {file_path}: {e}")
+            continue
+        if len(y) == 0:
+            continue
+        magnitude = Spectrogram(y, sr).magnitude
+
+        t0 = time.perf_counter()
+        ref = piptrack_statistics(magnitude, sr)
+        t1 = time.perf_counter()
+        fast = pitch_statistics(magnitude, sr)
+        t2 = time.perf_counter()
+        t_ref += t1 - t0
+        t_fast += t2 - t1
+
+        err = np.abs(np.array(ref, dtype=np.float64) - np.array(fast, dtype=np.float64))
+        rel = err / np.maximum(np.abs(np.array(ref, dtype=np.float64)), 1e-9)
+        max_err = np.maximum(max_err, rel)
+        compared += 1
+        print(f"{os.path.basename(file_path)[:40]:40s} | mean {ref[0]:9.3f} vs {fast[0]:9.3f} | "
+              f"std {ref[1]:9.3f} vs {fast[1]:9.3f}")
+
+    print("\n" + "-" * 60)
+    print(f"Files compared:          {compared}")
+    print(f"Max rel. error (mean):   {max_err[0]:.2e}")
+    print(f"Max rel. error (std):    {max_err[1]:.2e}")
+    print(f"piptrack time:           {t_ref:.3f}s")
+    print(f"voiceband time:          {t_fast:.3f}s ({t_ref / max(t_fast, 1e-9):.1f}x faster)")
+    return max_err
+
+
+if __name__ == "__main__":
+    run_parity()
@@ -0,0 +1,106 @@
+import os
+import sys
+import glob
+import tracemalloc
+import joblib
+import numpy as np
+
+# Add parent dir to path to import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.audio.decoder import load_audio
+from app.audio.core_features import FeatureContext, assemble_features
+from app.audio.registry import FEATURE_GROUPS, GROUP_SLICES
+from app.core.config import settings
+
+DATASET_ROOT = "dataset"
+# Max per-feature error, in units of that feature's spread across the dataset
+# (the scale the model's StandardScaler sees)
+FEATURE_TOLERANCE = 1e-3
+# The HPSS tonnetz goes through librosa.feature.chroma_cqt, whose tuning
+# estimate is a histogram argmax: on a few clips float rounding moves it by
+# one bin, which shifts the tonnetz means by up to ~0.5 std in either
+# precision. Those clips are still covered by the probability check below.
+GROUP_TOLERANCE = {"tonnetz": 1.0}
+# Max change of the AI probability for any clip
+PROBA_TOLERANCE = 1e-3
+
+
+def extract(file_path, dtype):
+    """Decode + features at one precision; returns (features, peak traced bytes)."""
+    tracemalloc.start()
+    y, sr = load_audio(file_path, sr=22050, dtype=dtype)
+    features = assemble_features(FeatureContext(y, sr))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return features, peak
+
+
+def run_parity(root_path=DATASET_ROOT):
+    print("=" * 60)
+    print("PRECISION PARITY REPORT (float32 vs float64 pipeline)")
+    print("=" * 60)
+
+    files = sorted(glob.glob(os.path.join(root_path, "**", "*.mp3"), recursive=True) +
+                   glob.glob(os.path.join(root_path, "**", "*.wav"), recursive=True))
+
+    X32, X64, peaks32, peaks64 = [], [], [], []
+    for file_path in files:
+        try:
+            f64, p64 = extract(file_path, np.float64)
+            f32, p32 = extract(file_path, np.float32)
+        except Exception as e:
+            print(f"Skipping {file_path}: {type(e).__name__}: {e}")
+            continue
+        X32.append(f32)
+        X64.append(f64)
+        peaks32.append(p32)
+        peaks64.append(p64)
+
+    if not X32:
+        print("❌ No clips could be decoded.")
+        sys.exit(1)
+    X32, X64 = np.array(X32), np.array(X64)
+
+    scale = np.maximum(X64.std(axis=0), 1e-12)
+    err = np.abs(X32 - X64) / scale
+
+    print(f"\nClips compared: {len(X32)}")
+    print(f"\n{'Group':22s} | max err / feature std | tolerance")
+    print("-" * 58)
+    issues = []
+    for group in FEATURE_GROUPS:
+        group_err = err[:, GROUP_SLICES[group.name]].max()
+        tolerance = GROUP_TOLERANCE.get(group.name, FEATURE_TOLERANCE)
+        print(f"{group.name:22s} | {group_err:21.2e} | {tolerance:.0e}")
+        if group_err > tolerance:
+            issues.append(f"{group.name}: error {group_err:.2e} exceeds {tolerance:.0e}")
+
+    try:
+        model = joblib.load(settings.MODEL_PATH)
+        p32 = model.predict_proba(X32)[:, 1]
+        p64 = model.predict_proba(X64)[:, 1]
+        threshold = settings.AI_PROBABILITY_THRESHOLD
+        flips = int(np.sum((p32 >= threshold) != (p64 >= threshold)))
+        print(f"\nMax AI probability change: {np.abs(p32 - p64).max():.2e}")
+        print(f"Decision flips at {threshold}:  {flips}")
+        if np.abs(p32 - p64).max() > PROBA_TOLERANCE:
+            issues.append(f"AI probability changed by more than {PROBA_TOLERANCE:.0e}")
+        if flips:
+            issues.append(f"{flips} decision(s) flipped")
+    except Exception as e:
+        print(f"\n⚠️  Model comparison skipped: {e}")
+
+    print(f"\nMedian peak memory per clip: float32 {np.median(peaks32) / 2**20:.1f} MB | "
+          f"float64 {np.median(peaks64) / 2**20:.1f} MB")
+
+    if issues:
+        print("\n❌ PARITY FAILED:")
+        for issue in issues:
+            print(f"  {issue}")
+        sys.exit(1)
+    print("\n✅ float32 pipeline matches the float64 reference")
+
+
+if __name__ == "__main__":
+    run_parity()
@@ -0,0 +1,90 @@
+import os
+import sys
+import glob
+import time
+import numpy as np
+import joblib
+from sklearn.model_selection import StratifiedKFold, cross_val_score
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.ensemble import RandomForestClassifier
+
+# Add parent dir to path to import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.audio.core_features import extract_features
+from app.core.config import settings
+
+DATASET_ROOT = "dataset"
+TONNETZ_SLICE = slice(86, 92)
+
+
+def load_both(root_path):
+    """Extracts every dataset clip with the hpss and fast tonnetz paths."""
+    X_hpss, X_fast, labels = [], [], []
+    t_hpss = t_fast = 0.0
+    for cls_name, label in (("human", 0), ("ai_generated", 1)):
+        files = sorted(glob.glob(os.path.join(root_path, cls_name, "**", "*.mp3"), recursive=True) +
+                       glob.glob(os.path.join(root_path, cls_name, "**", "*.wav"), recursive=True))
+        for file_path in files:
+            try:
+                t0 = time.perf_counter()
+                ref = extract_features(file_path, tonnetz_mode="hpss")
+                t1 = time.perf_counter()
+                fast = extract_features(file_path, tonnetz_mode="fast")
+                t2 = time.perf_counter()
+            except Exception as e:
+                print(f"Skipping {file_path}: {e}")
+                continue
+            t_hpss += t1 - t0
+            t_fast += t2 - t1
+            X_hpss.append(ref)
+            X_fast.append(fast)
+            labels.append(label)
+    return np.array(X_hpss), np.array(X_fast), np.array(labels), t_hpss, t_fast
+
+
+def model_accuracy(model, X, y, threshold):
+    return np.mean((model.predict_proba(X)[:, 1] >= threshold).astype(int) == y)
+
+
+def retrained_accuracy(X, y):
+    """5-fold CV accuracy of a fresh model trained on the given features."""
+    pipeline = Pipeline([
+        ("scaler", StandardScaler()),
+        ("classifier", RandomForestClassifier(n_estimators=300, random_state=42, n_jobs=-1)),
+    ])
+    cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=42)
+    return cross_val_score(pipeline, X, y, cv=cv, scoring="accuracy").mean()
+
+
+def evaluate():
+    print("=" * 60)
+    print("TONNETZ PATH EVALUATION (hpss vs fast)")
+    print("=" * 60)
+
+    X_hpss, X_fast, y, t_hpss, t_fast = load_both(DATASET_ROOT)
+    if len(y) == 0:
+        print("ERROR: No clips found in 'dataset/'.")
+        sys.exit(1)
+
+    deviation = np.abs(X_fast[:, TONNETZ_SLICE] - X_hpss[:, TONNETZ_SLICE])
+    print(f"\nClips: {len(y)}")
+    print(f"Mean |fast - hpss| per tonnetz dim: {np.round(deviation.mean(axis=0), 4)}")
+    print(f"Max  |fast - hpss| per tonnetz dim: {np.round(deviation.max(axis=0), 4)}")
+    print(f"Extraction time: hpss {t_hpss:.1f}s, fast {t_fast:.1f}s ({t_hpss / max(t_fast, 1e-9):.2f}x)")
+
+    threshold = settings.AI_PROBABILITY_THRESHOLD
+    if os.path.exists(settings.MODEL_PATH):
+        model = joblib.load(settings.MODEL_PATH)
+        print(f"\nDeployed model ({settings.MODEL_PATH}), threshold {threshold}:")
+        print(f"  accuracy with hpss features: {model_accuracy(model, X_hpss, y, threshold):.4f}")
+        print(f"  accuracy with fast features: {model_accuracy(model, X_fast, y, threshold):.4f}")
+
+    print("\nRetrained model (5-fold CV):")
+    print(f"  hpss features: {retrained_accuracy(X_hpss, y):.4f}")
+    print(f"  fast features: {retrained_accuracy(X_fast, y):.4f}")
+
+
+if __name__ == "__main__":
+    evaluate()
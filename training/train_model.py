@@ -2,6 +2,7 @@ import os
 import glob
 import numpy as np
 import joblib
+import json
 import sys
 from collections import Counter
 from sklearn.model_selection import train_test_split, StratifiedKFold, RandomizedSearchCV
@@ -15,23 +16,33 @@ from scipy.stats import randint, uniform
 # Add parent dir to path to import app modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.audio.features import extract_features
+from app.audio.batch import load_signals, extract_features_batch
+from app.core.config import settings
+from app.audio.registry import FEATURE_GROUPS as REGISTRY_GROUPS, validate_groups
 
 # Configuration
 DATASET_ROOT = "dataset"
 MODEL_OUTPUT_PATH = "app/ml/voice_auth_model.pkl"
+# Feature options are recorded next to the model so the API extracts the same way
+MODEL_METADATA_PATH = os.path.splitext(MODEL_OUTPUT_PATH)[0] + ".json"
+TONNETZ_MODE = settings.TONNETZ_MODE
+RESAMPLE_QUALITY = settings.RESAMPLE_QUALITY
+VAD = settings.VAD_ENABLED
+# Comma-separated registry group names to train on (default: all groups)
+FEATURE_GROUPS = validate_groups(
+    os.getenv("FEATURE_GROUPS").split(",") if os.getenv("FEATURE_GROUPS")
+    else [group.name for group in REGISTRY_GROUPS]
+)
 
 def load_dataset(root_path):
-    features_list = []
-    labels_list = []
+    file_paths = []
+    labels_of = {}
     
     # Structure: dataset/human/lang/*.mp3, dataset/ai_generated/lang/*.mp3
     # Mappings: human -> 0, ai_generated -> 1
     
     classes = {"human": 0, "ai_generated": 1}
     
-    total_files = 0
-    
     if not os.path.exists(root_path):
         print(f"Error: Dataset root {root_path} does not exist.")
         return np.array([]), np.array([])
@@ -52,21 +63,23 @@ def load_dataset(root_path):
         print(f"Found {len(audio_files)} files for class {cls_name}")
         
         for file_path in audio_files:
-            try:
-                # Extract Features (using the enhanced 92-feature extractor)
-                feat = extract_features(file_path)
-                features_list.append(feat)
-                labels_list.append(label)
-                total_files += 1
-                
-                # Progress logging
-                if total_files % 10 == 0:
-                    print(f"Processed {total_files} files...", end='\r')
-            except Exception as e:
-                print(f"Skipping {file_path}: {e}")
+            file_paths.append(file_path)
+            labels_of[file_path] = label
+    
+    # Decode everything first, then extract the (n_clips, 92) matrix in length-bucketed batches
+    signals, kept, errors = load_signals(file_paths, quality=RESAMPLE_QUALITY, vad=VAD)
+    for file_path, reason in errors.items():
+        print(f"Skipping {file_path}: {reason}")
+    
+    if not signals:
+        print("\nTotal files processed: 0")
+        return np.array([]), np.array([])
+    
+    features = extract_features_batch(signals, tonnetz_mode=TONNETZ_MODE, groups=FEATURE_GROUPS)
+    labels = np.array([labels_of[file_path] for file_path in kept])
                 
-    print(f"\nTotal files processed: {total_files}")
-    return np.array(features_list), np.array(labels_list)
+    print(f"\nTotal files processed: {len(kept)}")
+    return features, labels
 
 def check_imbalance(y):
     if len(y) == 0:
@@ -281,6 +294,12 @@ def train():
     os.makedirs(os.path.dirname(MODEL_OUTPUT_PATH), exist_ok=True)
     joblib.dump(final_pipeline, MODEL_OUTPUT_PATH)
     print(f"\nModel saved to {MODEL_OUTPUT_PATH}")
+    
+    with open(MODEL_METADATA_PATH, "w") as f:
+        json.dump({"tonnetz_mode": TONNETZ_MODE, "resample_quality": RESAMPLE_QUALITY,
+                   "vad": VAD, "feature_groups": FEATURE_GROUPS}, f, indent=2)
+    print(f"Feature metadata saved to {MODEL_METADATA_PATH} "
+          f"(tonnetz_mode={TONNETZ_MODE}, resample_quality={RESAMPLE_QUALITY}, vad={VAD})")
     print(f"Model type: {best_name}")
     print("Training complete! 🚀")
 
@@ -8,7 +8,7 @@ from app.core.config import settings
 # Add parent dir to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.audio.features import extract_features
+from app.audio.batch import load_signals, extract_features_batch
 
 def validate_model():
     print("--- STEP 3: MODEL SANITY CHECK (OFFLINE) ---")
@@ -46,9 +46,18 @@ def validate_model():
     # 3. Run Predictions
     threshold = settings.AI_PROBABILITY_THRESHOLD
     
+    # Extract both samples in one batch; rows line up with the kept paths
+    signals, kept, errors = load_signals([human_sample, ai_sample])
+    features = dict(zip(kept, extract_features_batch(signals))) if signals else {}
+    
+    def sample_features(file_path):
+        if file_path in errors:
+            raise ValueError(errors[file_path])
+        return features[file_path].reshape(1, -1)
+    
     # Test Human
     try:
-        h_feat = extract_features(human_sample).reshape(1, -1)
+        h_feat = sample_features(human_sample)
         if hasattr(model, "predict_proba"):
             h_score = model.predict_proba(h_feat)[0][1]
         else:
@@ -66,7 +75,7 @@ def validate_model():
 
     # Test AI
     try:
-        a_feat = extract_features(ai_sample).reshape(1, -1)
+        a_feat = sample_features(ai_sample)
         if hasattr(model, "predict_proba"):
             a_score = model.predict_proba(a_feat)[0][1]
         else:
@@ -8,7 +8,7 @@ import numpy as np
 # Add parent to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from app.audio.features import extract_features
+from app.audio.batch import load_signals, extract_features_batch
 
 print("=" * 60)
 print("PHASE 3: OFFLINE PREDICTION CONSISTENCY")
@@ -51,6 +51,15 @@ print(f"\nTesting with {len(human_sample)} human + {len(ai_sample)} AI samples")
 # Default threshold
 THRESHOLD = 0.5
 
+# Extract all samples as one (n_clips, 92) matrix
+signals, kept, decode_errors = load_signals(human_sample + ai_sample)
+batch_features = dict(zip(kept, extract_features_batch(signals))) if signals else {}
+
+def sample_features(file_path):
+    if file_path in decode_errors:
+        raise ValueError(decode_errors[file_path])
+    return batch_features[file_path]
+
 # Test predictions
 results = []
 
@@ -60,7 +69,7 @@ print("-" * 60)
 
 for i, file_path in enumerate(human_sample, 1):
     try:
-        features = extract_features(file_path)
+        features = sample_features(file_path)
         features_array = np.array(features).reshape(1, -1)
         
         # Get probability of being AI (class 1)
@@ -89,7 +98,7 @@ print("-" * 60)
 
 for i, file_path in enumerate(ai_sample, 1):
     try:
-        features = extract_features(file_path)
+        features = sample_features(file_path)
         features_array = np.array(features).reshape(1, -1)
         
         # Get probability of being AI (class 1)